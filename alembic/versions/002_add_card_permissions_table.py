@@ -0,0 +1,96 @@
+"""add card_permissions table
+
+Revision ID: 002_card_permissions
+Revises: 001, add_feature_permissions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_card_permissions'
+down_revision = ('001', 'add_feature_permissions')  # 合并之前的两个迁移分支
+branch_labels = None
+depends_on = None
+
+# 回填时每批处理的卡密数量
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _granted_keys(raw_permissions):
+    """
+    解析 cards.permissions（list / dict / JSON 字符串）为授予的权限标识集合
+
+    与 app.services.permission_service.granted_permission_keys 的规则保持一致：
+    dict 中值为 false 的权限标识不授予
+    """
+    if isinstance(raw_permissions, str):
+        try:
+            raw_permissions = json.loads(raw_permissions)
+        except json.JSONDecodeError:
+            return set()
+    if isinstance(raw_permissions, list):
+        return {str(key) for key in raw_permissions}
+    if isinstance(raw_permissions, dict):
+        return {
+            key for key, value in raw_permissions.items()
+            if not isinstance(value, bool) or value
+        }
+    return set()
+
+
+def upgrade():
+    # 创建 card_permissions 表
+    op.create_table(
+        'card_permissions',
+        sa.Column('id', sa.Integer(), nullable=False, comment='关联ID'),
+        sa.Column('card_id', sa.Integer(), nullable=False, comment='卡密ID'),
+        sa.Column('permission_key', sa.String(length=100), nullable=False, comment='权限标识'),
+        sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_charset='utf8mb4',
+        mysql_collate='utf8mb4_unicode_ci'
+    )
+    op.create_index(op.f('ix_card_permissions_id'), 'card_permissions', ['id'], unique=False)
+    op.create_index(op.f('ix_card_permissions_permission_key'), 'card_permissions', ['permission_key'], unique=False)
+    op.create_index('idx_card_permission', 'card_permissions', ['card_id', 'permission_key'], unique=True)
+
+    # 从 cards.permissions 回填，按主键分批读取，避免一次加载全部卡密
+    conn = op.get_bind()
+    cards = sa.table('cards', sa.column('id', sa.Integer), sa.column('permissions', sa.JSON))
+    card_permissions = sa.table(
+        'card_permissions',
+        sa.column('card_id', sa.Integer),
+        sa.column('permission_key', sa.String)
+    )
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(cards.c.id, cards.c.permissions)
+            .where(cards.c.id > last_id)
+            .order_by(cards.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        values = [
+            {"card_id": card_id, "permission_key": key}
+            for card_id, raw_permissions in rows
+            for key in sorted(_granted_keys(raw_permissions))
+        ]
+        if values:
+            conn.execute(card_permissions.insert(), values)
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    # 删除 card_permissions 表（cards.permissions 仍保留完整数据）
+    op.drop_index('idx_card_permission', table_name='card_permissions')
+    op.drop_index(op.f('ix_card_permissions_permission_key'), table_name='card_permissions')
+    op.drop_index(op.f('ix_card_permissions_id'), table_name='card_permissions')
+    op.drop_table('card_permissions')
@@ -0,0 +1,63 @@
+"""add card_generate_jobs table
+
+Revision ID: 003_card_generate_jobs
+Revises: 002_card_permissions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_card_generate_jobs'
+down_revision = '002_card_permissions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 创建 card_generate_jobs 表
+    op.create_table(
+        'card_generate_jobs',
+        sa.Column('id', sa.Integer(), nullable=False, comment='任务ID'),
+        sa.Column('app_id', sa.Integer(), nullable=False, comment='所属应用ID'),
+        sa.Column('created_by', sa.Integer(), nullable=True, comment='创建任务的管理员ID'),
+        sa.Column('count', sa.Integer(), nullable=False, comment='计划生成数量'),
+        sa.Column('generated', sa.Integer(), nullable=False, server_default='0', comment='已生成数量'),
+        sa.Column('status', sa.Enum('pending', 'running', 'completed', 'failed', name='cardjobstatus'), nullable=False, comment='任务状态: pending-等待中, running-生成中, completed-已完成, failed-失败'),
+        sa.Column('expire_time', sa.DateTime(), nullable=False, comment='卡密过期时间'),
+        sa.Column('max_device_count', sa.Integer(), nullable=False, comment='最大可绑定设备数'),
+        sa.Column('permissions', sa.JSON(), nullable=True, comment='权限配置 JSON'),
+        sa.Column('remark', sa.String(length=255), nullable=True, comment='备注（套餐名称等）'),
+        sa.Column('error', sa.Text(), nullable=True, comment='失败原因'),
+        sa.Column('owner', sa.String(length=64), nullable=True, comment='执行任务的进程标识'),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True, comment='执行进程最近一次心跳时间，超过租约时间视为进程已退出'),
+        sa.Column('started_at', sa.DateTime(), nullable=True, comment='开始时间'),
+        sa.Column('finished_at', sa.DateTime(), nullable=True, comment='结束时间'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, comment='更新时间'),
+        sa.ForeignKeyConstraint(['app_id'], ['apps.id'], ),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_charset='utf8mb4',
+        mysql_collate='utf8mb4_unicode_ci'
+    )
+    op.create_index(op.f('ix_card_generate_jobs_id'), 'card_generate_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_card_generate_jobs_app_id'), 'card_generate_jobs', ['app_id'], unique=False)
+    op.create_index(op.f('ix_card_generate_jobs_status'), 'card_generate_jobs', ['status'], unique=False)
+
+    # cards 表增加生成任务ID
+    op.add_column('cards', sa.Column('job_id', sa.Integer(), nullable=True, comment='生成任务ID（后台任务生成的卡密）'))
+    op.create_index(op.f('ix_cards_job_id'), 'cards', ['job_id'], unique=False)
+    op.create_foreign_key('fk_cards_job_id', 'cards', 'card_generate_jobs', ['job_id'], ['id'])
+
+
+def downgrade():
+    op.drop_constraint('fk_cards_job_id', 'cards', type_='foreignkey')
+    op.drop_index(op.f('ix_cards_job_id'), table_name='cards')
+    op.drop_column('cards', 'job_id')
+
+    op.drop_index(op.f('ix_card_generate_jobs_status'), table_name='card_generate_jobs')
+    op.drop_index(op.f('ix_card_generate_jobs_app_id'), table_name='card_generate_jobs')
+    op.drop_index(op.f('ix_card_generate_jobs_id'), table_name='card_generate_jobs')
+    op.drop_table('card_generate_jobs')
@@ -0,0 +1,27 @@
+"""add keyset pagination indexes
+
+Revision ID: 004_keyset_indexes
+Revises: 003_card_generate_jobs
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_keyset_indexes'
+down_revision = '003_card_generate_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 管理后台游标分页按 (排序时间, id) 倒序定位下一页
+    op.create_index('idx_user_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('idx_card_created_at_id', 'cards', ['created_at', 'id'], unique=False)
+    op.create_index('idx_card_device_bind_time_id', 'card_devices', ['bind_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_card_device_bind_time_id', table_name='card_devices')
+    op.drop_index('idx_card_created_at_id', table_name='cards')
+    op.drop_index('idx_user_created_at_id', table_name='users')
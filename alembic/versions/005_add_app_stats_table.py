@@ -0,0 +1,101 @@
+"""add app_stats table
+
+Revision ID: 005_app_stats
+Revises: 004_keyset_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_app_stats'
+down_revision = '004_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+# cards.status 取值 -> 计数列（与 app.services.app_stats_service.CARD_STATUS_COUNTERS 保持一致）
+CARD_STATUS_COUNTERS = {
+    'UNUSED': 'cards_unused',
+    'USED': 'cards_used',
+    'DISABLED': 'cards_disabled',
+}
+
+
+def upgrade():
+    # 创建 app_stats 表
+    op.create_table(
+        'app_stats',
+        sa.Column('app_id', sa.Integer(), nullable=False, comment='应用ID'),
+        sa.Column('cards_unused', sa.Integer(), nullable=False, server_default='0', comment='未使用卡密数'),
+        sa.Column('cards_used', sa.Integer(), nullable=False, server_default='0', comment='已使用卡密数'),
+        sa.Column('cards_disabled', sa.Integer(), nullable=False, server_default='0', comment='禁用卡密数'),
+        sa.Column('active_bindings', sa.Integer(), nullable=False, server_default='0', comment='激活的用户-卡密绑定数'),
+        sa.Column('active_devices', sa.Integer(), nullable=False, server_default='0', comment='激活的设备绑定数'),
+        sa.Column('registered_users', sa.Integer(), nullable=False, server_default='0', comment='绑定了该应用卡密的用户数'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.ForeignKeyConstraint(['app_id'], ['apps.id'], ),
+        sa.PrimaryKeyConstraint('app_id'),
+        mysql_charset='utf8mb4',
+        mysql_collate='utf8mb4_unicode_ci'
+    )
+
+    # 按应用分组统计现有数据并回填
+    conn = op.get_bind()
+    apps = sa.table('apps', sa.column('id', sa.Integer))
+    cards = sa.table('cards', sa.column('id', sa.Integer), sa.column('app_id', sa.Integer), sa.column('status', sa.String))
+    user_cards = sa.table('user_cards', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                          sa.column('card_id', sa.Integer), sa.column('status', sa.String))
+    card_devices = sa.table('card_devices', sa.column('id', sa.Integer), sa.column('card_id', sa.Integer),
+                            sa.column('status', sa.String))
+    app_stats = sa.table('app_stats', *[sa.column(name) for name in (
+        'app_id', 'cards_unused', 'cards_used', 'cards_disabled',
+        'active_bindings', 'active_devices', 'registered_users', 'updated_at'
+    )])
+
+    stats = defaultdict(lambda: defaultdict(int))
+    for app_id, status, count in conn.execute(
+        sa.select(cards.c.app_id, cards.c.status, sa.func.count()).group_by(cards.c.app_id, cards.c.status)
+    ):
+        column = CARD_STATUS_COUNTERS.get(str(status).upper())
+        if column:
+            stats[app_id][column] = count
+
+    for app_id, bindings, users in conn.execute(
+        sa.select(cards.c.app_id, sa.func.count(user_cards.c.id), sa.func.count(sa.distinct(user_cards.c.user_id)))
+        .select_from(user_cards.join(cards, user_cards.c.card_id == cards.c.id))
+        .where(sa.func.upper(user_cards.c.status) == 'ACTIVE')
+        .group_by(cards.c.app_id)
+    ):
+        stats[app_id]['active_bindings'] = bindings
+        stats[app_id]['registered_users'] = users
+
+    for app_id, devices in conn.execute(
+        sa.select(cards.c.app_id, sa.func.count(card_devices.c.id))
+        .select_from(card_devices.join(cards, card_devices.c.card_id == cards.c.id))
+        .where(sa.func.upper(card_devices.c.status) == 'ACTIVE')
+        .group_by(cards.c.app_id)
+    ):
+        stats[app_id]['active_devices'] = devices
+
+    rows = [
+        {
+            'app_id': app_id,
+            'cards_unused': stats[app_id]['cards_unused'],
+            'cards_used': stats[app_id]['cards_used'],
+            'cards_disabled': stats[app_id]['cards_disabled'],
+            'active_bindings': stats[app_id]['active_bindings'],
+            'active_devices': stats[app_id]['active_devices'],
+            'registered_users': stats[app_id]['registered_users'],
+            'updated_at': sa.func.now(),
+        }
+        for (app_id,) in conn.execute(sa.select(apps.c.id))
+    ]
+    for row in rows:
+        conn.execute(app_stats.insert().values(**row))
+
+
+def downgrade():
+    op.drop_table('app_stats')
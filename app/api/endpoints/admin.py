@@ -2,49 +2,72 @@
 管理员 API 路由
 提供管理后台的各种接口
 """
+from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from app.utils.dependencies import get_current_admin, get_db
-from app.services.admin_service import AdminService
+from app.utils.dependencies import get_current_admin, get_async_db
+from app.services.admin_service import AsyncAdminService, CARD_EXPORT_MEDIA_TYPES, stream_cards_export
 from app.schemas.admin import (
     CardGenerateRequest,
     CardGenerateResponse,
+    CardGenerateJobRequest,
+    CardGenerateJobInfo,
+    CardGenerateJobResponse,
+    CardGenerateJobListResponse,
     AdminCardListResponse,
     AdminCardInfo,
     UpdateCardStatusRequest,
     UpdateCardPermissionsRequest,
     UpdateCardResponse,
+    BulkUpdateCardStatusRequest,
+    BulkUpdateStatusResponse,
     AdminDeviceListResponse,
     AdminDeviceInfo,
     UpdateDeviceStatusRequest,
     UpdateDeviceStatusResponse,
+    BulkUpdateDeviceStatusRequest,
     AdminUserListResponse,
     AdminUserInfo,
-    StatisticsResponse
+    BulkUpdateUserStatusRequest,
+    StatisticsResponse,
+    AppStatsInfo,
+    AppStatsListResponse,
+    SystemMetricsResponse
 )
 from app.schemas.user import UserInfo
 from app.schemas.common_data import CommonResponse, ApiResponseData
+from app.utils.token_cache import token_cache
+from app.utils.token_revocation import token_revocation
+from app.utils.permission_cache import permission_cache
+from app.db.sqlalchemy_db import database
+from app.services.heartbeat_service import device_heartbeat
+from app.services.card_job_service import AsyncCardJobService, card_job_worker
+from app.services.statistics_service import statistics_snapshot
+from app.utils.password_hasher import password_hasher
+from app.utils.cache_backend import cache_backend, invalidation_bus
+from app.middleware.response_validator import ApiResponseRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 
 
 @router.post("/card/generate", response_model=ApiResponseData)
 async def generate_cards(
     request: CardGenerateRequest,
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     批量生成卡密（管理员）
     
     需要管理员权限
     """
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    cards, error = admin_service.generate_cards(
+    cards, error = await admin_service.generate_cards(
         app_id=request.app_id,
         count=request.count,
         expire_time=request.expire_time,
@@ -70,22 +93,37 @@ async def get_users_list(
     size: int = Query(20, ge=1, le=100, description="每页数量"),
     status: Optional[str] = Query(None, description="状态筛选: normal-正常, banned-封禁"),
     keyword: Optional[str] = Query(None, description="关键词搜索（用户名）"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="分页方式：offset-页码分页，cursor-游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的 next_cursor，传入时自动使用游标分页"),
+    with_total: bool = Query(False, description="游标分页时是否返回总数（按筛选条件缓存）"),
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询用户列表（管理员）
     
-    支持分页、状态筛选、关键词搜索
+    支持页码分页和游标分页、状态筛选、关键词搜索；
+    游标分页按 (created_at, id) 定位，深翻页不做 OFFSET 扫描
     """
-    admin_service = AdminService(db)
-    
-    users, total, error = admin_service.get_users_list(
-        page=page,
-        size=size,
-        status=status,
-        keyword=keyword
-    )
+    admin_service = AsyncAdminService(db)
+    
+    next_cursor = None
+    if pagination == "cursor" or cursor:
+        page = None
+        users, next_cursor, total, error = await admin_service.get_users_list_by_cursor(
+            size=size,
+            cursor=cursor,
+            status=status,
+            keyword=keyword,
+            with_total=with_total
+        )
+    else:
+        users, total, error = await admin_service.get_users_list(
+            page=page,
+            size=size,
+            status=status,
+            keyword=keyword
+        )
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -108,6 +146,7 @@ async def get_users_list(
         total=total,
         page=page,
         size=size,
+        next_cursor=next_cursor,
         users=user_infos
     ).model_dump(mode='json', exclude_none=True)
 
@@ -117,16 +156,16 @@ async def update_user_status(
     user_id: int,
     status: str = Query(..., description="状态: normal-正常, banned-封禁"),
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     更新用户状态（管理员）
     
     可以封禁或解封用户
     """
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    success, error = admin_service.update_user_status(user_id, status)
+    success, error = await admin_service.update_user_status(user_id, status)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -137,6 +176,33 @@ async def update_user_status(
     ).model_dump(mode='json', exclude_none=True)
 
 
+@router.post("/users/status", response_model=ApiResponseData)
+async def bulk_update_user_status(
+    request: BulkUpdateUserStatusRequest,
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    批量更新用户状态（管理员）
+    
+    按用户ID列表和/或筛选条件批量封禁或解封用户，分块执行，管理员账户不受影响
+    """
+    admin_service = AsyncAdminService(db)
+    
+    affected_count, error = await admin_service.bulk_update_user_status(
+        request.status, request.user_ids, request.app_id, request.created_from, request.created_to
+    )
+    
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    return BulkUpdateStatusResponse(
+        success=True,
+        message=f"批量更新用户状态成功: {request.status}",
+        affected_count=affected_count
+    ).model_dump(mode='json', exclude_none=True)
+
+
 @router.get("/cards", response_model=ApiResponseData)
 async def get_cards_list(
     page: int = Query(1, ge=1, description="页码"),
@@ -144,23 +210,42 @@ async def get_cards_list(
     app_id: Optional[int] = Query(None, description="应用ID筛选"),
     status: Optional[str] = Query(None, description="状态筛选: unused-未使用, used-已使用, disabled-禁用"),
     keyword: Optional[str] = Query(None, description="关键词搜索（卡密、备注）"),
+    permission: Optional[str] = Query(None, description="权限标识筛选，如 wechat"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="分页方式：offset-页码分页，cursor-游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的 next_cursor，传入时自动使用游标分页"),
+    with_total: bool = Query(False, description="游标分页时是否返回总数（按筛选条件缓存）"),
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询卡密列表（管理员）
     
-    支持分页、应用筛选、状态筛选、关键词搜索
+    支持页码分页和游标分页、应用筛选、状态筛选、关键词搜索、权限筛选；
+    游标分页按 (created_at, id) 定位，深翻页不做 OFFSET 扫描
     """
-    admin_service = AdminService(db)
-    
-    cards, total, error = admin_service.get_cards_list(
-        page=page,
-        size=size,
-        app_id=app_id,
-        status=status,
-        keyword=keyword
-    )
+    admin_service = AsyncAdminService(db)
+    
+    next_cursor = None
+    if pagination == "cursor" or cursor:
+        page = None
+        cards, next_cursor, total, error = await admin_service.get_cards_list_by_cursor(
+            size=size,
+            cursor=cursor,
+            app_id=app_id,
+            status=status,
+            keyword=keyword,
+            permission=permission,
+            with_total=with_total
+        )
+    else:
+        cards, total, error = await admin_service.get_cards_list(
+            page=page,
+            size=size,
+            app_id=app_id,
+            status=status,
+            keyword=keyword,
+            permission=permission
+        )
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -172,25 +257,183 @@ async def get_cards_list(
         total=total,
         page=page,
         size=size,
+        next_cursor=next_cursor,
         cards=card_infos
     ).model_dump(mode='json', exclude_none=True)
 
 
+@router.get("/card/export")
+async def export_cards(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="导出格式：csv 或 ndjson"),
+    app_id: Optional[int] = Query(None, description="应用ID筛选"),
+    status: Optional[str] = Query(None, description="状态筛选: unused, used, disabled"),
+    keyword: Optional[str] = Query(None, description="关键词搜索（卡密、备注）"),
+    permission: Optional[str] = Query(None, description="权限标识筛选，如 wechat"),
+    job_id: Optional[int] = Query(None, description="生成任务ID筛选"),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    流式导出卡密（管理员）
+    
+    按筛选条件导出卡密为 CSV 或 NDJSON，数据边查边发送，
+    不经过响应格式验证中间件，也不使用 ApiResponseData 包装
+    """
+    filename = f"cards_{datetime.now().strftime('%Y%m%d%H%M%S')}.{format}"
+    logger.info(f"管理员 {admin['username']} 导出卡密: format={format}, app_id={app_id}, status={status}")
+    
+    return StreamingResponse(
+        stream_cards_export(
+            format,
+            app_id=app_id,
+            status=status,
+            keyword=keyword,
+            permission=permission,
+            job_id=job_id
+        ),
+        media_type=CARD_EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/card/jobs", response_model=ApiResponseData)
+async def create_card_job(
+    request: CardGenerateJobRequest,
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    创建卡密生成任务（管理员）
+    
+    立即返回任务信息，卡密在后台分块生成；
+    通过 GET /admin/card/jobs/{job_id} 轮询进度，完成后通过 download 接口下载
+    """
+    job_service = AsyncCardJobService(db)
+    
+    job, error = await job_service.create_job(
+        app_id=request.app_id,
+        count=request.count,
+        expire_time=request.expire_time,
+        max_device_count=request.max_device_count,
+        permissions=request.permissions,
+        remark=request.remark,
+        created_by=admin.get("user_id")
+    )
+    
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    card_job_worker.submit(job["id"])
+    logger.info(f"管理员 {admin['username']} 创建卡密生成任务: job_id={job['id']}, count={request.count}")
+    
+    return CardGenerateJobResponse(
+        success=True,
+        message="卡密生成任务已创建",
+        job=CardGenerateJobInfo(**job)
+    ).model_dump(mode='json', exclude_none=True)
+
+
+@router.get("/card/jobs", response_model=ApiResponseData)
+async def get_card_jobs(
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    app_id: Optional[int] = Query(None, description="应用ID筛选"),
+    status: Optional[str] = Query(None, description="状态筛选: pending, running, completed, failed"),
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    查询卡密生成任务列表（管理员）
+    """
+    job_service = AsyncCardJobService(db)
+    
+    jobs, total, error = await job_service.get_jobs_list(
+        page=page,
+        size=size,
+        app_id=app_id,
+        status=status
+    )
+    
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    return CardGenerateJobListResponse(
+        total=total,
+        page=page,
+        size=size,
+        jobs=[CardGenerateJobInfo(**job) for job in jobs]
+    ).model_dump(mode='json', exclude_none=True)
+
+
+@router.get("/card/jobs/{job_id}", response_model=ApiResponseData)
+async def get_card_job(
+    job_id: int,
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    查询卡密生成任务的状态和进度（管理员）
+    """
+    job_service = AsyncCardJobService(db)
+    
+    job, error = await job_service.get_job(job_id)
+    
+    if error:
+        raise HTTPException(status_code=404, detail=error)
+    
+    return CardGenerateJobResponse(
+        success=True,
+        message="查询成功",
+        job=CardGenerateJobInfo(**job)
+    ).model_dump(mode='json', exclude_none=True)
+
+
+@router.get("/card/jobs/{job_id}/download")
+async def download_card_job(
+    job_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="导出格式：csv 或 ndjson"),
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    下载卡密生成任务的结果（管理员）
+    
+    任务完成后才能下载，流式导出该任务生成的全部卡密
+    """
+    job_service = AsyncCardJobService(db)
+    
+    job, error = await job_service.get_job(job_id)
+    
+    if error:
+        raise HTTPException(status_code=404, detail=error)
+    
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"任务尚未完成，当前状态: {job['status']}")
+    
+    filename = f"card_job_{job_id}.{format}"
+    logger.info(f"管理员 {admin['username']} 下载卡密生成任务结果: job_id={job_id}, format={format}")
+    
+    return StreamingResponse(
+        stream_cards_export(format, job_id=job_id),
+        media_type=CARD_EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.post("/card/{card_id}/status", response_model=ApiResponseData)
 async def update_card_status(
     card_id: int,
     request: UpdateCardStatusRequest,
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     更新卡密状态（管理员）
     
     可以禁用或启用卡密
     """
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    success, error = admin_service.update_card_status(card_id, request.status)
+    success, error = await admin_service.update_card_status(card_id, request.status)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -201,21 +444,49 @@ async def update_card_status(
     ).model_dump(mode='json', exclude_none=True)
 
 
+@router.post("/cards/status", response_model=ApiResponseData)
+async def bulk_update_card_status(
+    request: BulkUpdateCardStatusRequest,
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    批量更新卡密状态（管理员）
+    
+    按卡密ID列表和/或筛选条件（应用、生成任务、备注、当前状态、创建时间）批量禁用或启用卡密，分块执行
+    """
+    admin_service = AsyncAdminService(db)
+    
+    affected_count, error = await admin_service.bulk_update_card_status(
+        request.status, request.card_ids, request.app_id, request.job_id, request.remark,
+        request.current_status, request.created_from, request.created_to
+    )
+    
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    return BulkUpdateStatusResponse(
+        success=True,
+        message=f"批量更新卡密状态成功: {request.status}",
+        affected_count=affected_count
+    ).model_dump(mode='json', exclude_none=True)
+
+
 @router.post("/card/{card_id}/permissions", response_model=ApiResponseData)
 async def update_card_permissions(
     card_id: int,
     request: UpdateCardPermissionsRequest,
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     更新卡密权限（管理员）
     
     实时修改卡密的权限配置，对已绑定的用户立即生效
     """
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    success, error = admin_service.update_card_permissions(card_id, request.permissions)
+    success, error = await admin_service.update_card_permissions(card_id, request.permissions)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -233,23 +504,39 @@ async def get_devices_list(
     card_id: Optional[int] = Query(None, description="卡密ID筛选"),
     user_id: Optional[int] = Query(None, description="用户ID筛选"),
     status: Optional[str] = Query(None, description="状态筛选: active-激活, disabled-禁用"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="分页方式：offset-页码分页，cursor-游标分页"),
+    cursor: Optional[str] = Query(None, description="游标分页时上一页返回的 next_cursor，传入时自动使用游标分页"),
+    with_total: bool = Query(False, description="游标分页时是否返回总数（按筛选条件缓存）"),
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询设备列表（管理员）
     
-    支持分页、卡密筛选、用户筛选、状态筛选
+    支持页码分页和游标分页、卡密筛选、用户筛选、状态筛选；
+    游标分页按 (bind_time, id) 定位，深翻页不做 OFFSET 扫描
     """
-    admin_service = AdminService(db)
-    
-    devices, total, error = admin_service.get_devices_list(
-        page=page,
-        size=size,
-        card_id=card_id,
-        user_id=user_id,
-        status=status
-    )
+    admin_service = AsyncAdminService(db)
+    
+    next_cursor = None
+    if pagination == "cursor" or cursor:
+        page = None
+        devices, next_cursor, total, error = await admin_service.get_devices_list_by_cursor(
+            size=size,
+            cursor=cursor,
+            card_id=card_id,
+            user_id=user_id,
+            status=status,
+            with_total=with_total
+        )
+    else:
+        devices, total, error = await admin_service.get_devices_list(
+            page=page,
+            size=size,
+            card_id=card_id,
+            user_id=user_id,
+            status=status
+        )
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -261,6 +548,7 @@ async def get_devices_list(
         total=total,
         page=page,
         size=size,
+        next_cursor=next_cursor,
         devices=device_infos
     ).model_dump(mode='json', exclude_none=True)
 
@@ -270,16 +558,16 @@ async def update_device_status(
     device_id: int,
     request: UpdateDeviceStatusRequest,
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     更新设备状态（管理员）
     
     可以禁用或启用设备
     """
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    success, error = admin_service.update_device_status(device_id, request.status)
+    success, error = await admin_service.update_device_status(device_id, request.status)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -290,28 +578,98 @@ async def update_device_status(
     ).model_dump(mode='json', exclude_none=True)
 
 
+@router.post("/devices/status", response_model=ApiResponseData)
+async def bulk_update_device_status(
+    request: BulkUpdateDeviceStatusRequest,
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    批量更新设备状态（管理员）
+    
+    按设备绑定ID列表和/或筛选条件（卡密、应用、绑定时间）批量禁用或启用设备，分块执行
+    """
+    admin_service = AsyncAdminService(db)
+    
+    affected_count, error = await admin_service.bulk_update_device_status(
+        request.status, request.device_ids, request.card_id, request.app_id, request.bind_from, request.bind_to
+    )
+    
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    return BulkUpdateStatusResponse(
+        success=True,
+        message=f"批量更新设备状态成功: {request.status}",
+        affected_count=affected_count
+    ).model_dump(mode='json', exclude_none=True)
+
+
 @router.get("/statistics", response_model=ApiResponseData)
 async def get_statistics(
+    refresh: bool = Query(False, description="是否跳过缓存立即重新统计"),
     admin: dict = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取统计数据（管理员）
     
-    返回用户、卡密、设备、应用的统计信息
+    返回用户、卡密、设备、应用的统计信息；
+    数据来自短期缓存的快照（STATISTICS_CACHE_TTL），updated_at 为快照生成时间
     """
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    statistics, error = admin_service.get_statistics()
+    statistics, error = await admin_service.get_statistics(refresh)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
     
-    return StatisticsResponse(
-        user_count=statistics["user_count"],
-        card_count=statistics["card_count"],
-        device_count=statistics["device_count"],
-        app_count=statistics["app_count"],
-        active_device_count=statistics["active_device_count"],
-        active_user_count=statistics["active_user_count"]
+    return StatisticsResponse(**statistics).model_dump(mode='json', exclude_none=True)
+
+
+@router.get("/statistics/apps", response_model=ApiResponseData)
+async def get_app_stats(
+    app_id: Optional[int] = Query(None, description="应用ID筛选"),
+    admin: dict = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取各应用的统计汇总（管理员）
+    
+    读取增量维护的 app_stats 计数器：卡密状态、激活绑定数、激活设备数、绑定用户数
+    """
+    admin_service = AsyncAdminService(db)
+    
+    app_stats, error = await admin_service.get_app_stats(app_id)
+    
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    return AppStatsListResponse(
+        apps=[AppStatsInfo(**stats) for stats in app_stats]
+    ).model_dump(mode='json', exclude_none=True)
+
+
+@router.get("/metrics", response_model=ApiResponseData)
+async def get_system_metrics(
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    获取系统运行指标（管理员）
+    
+    返回进程内缓存的命中、未命中、淘汰次数等，用于调整缓存容量和TTL；
+    以及连接池的借出数、溢出数和获取连接的等待时间，用于调整 DB_POOL_SIZE / DB_MAX_OVERFLOW；
+    密码哈希线程池的排队深度和哈希耗时，用于调整 PASSWORD_HASH_WORKERS / PASSWORD_HASH_QUEUE_LIMIT；
+    缓存装饰器后端和跨 worker 失效通知的统计
+    """
+    return SystemMetricsResponse(
+        token_cache=token_cache.stats(),
+        token_revocation=token_revocation.stats(),
+        permission_cache=permission_cache.stats(),
+        db_pool=database.get_pool_metrics(),
+        device_heartbeat=device_heartbeat.stats(),
+        card_jobs=card_job_worker.stats(),
+        statistics_cache=statistics_snapshot.stats(),
+        password_hasher=password_hasher.stats(),
+        cache_backend={**cache_backend.stats(), "invalidation": invalidation_bus.stats()}
     ).model_dump(mode='json', exclude_none=True)
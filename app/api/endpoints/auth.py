@@ -4,10 +4,14 @@
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.utils.dependencies import get_db, get_current_user, get_current_admin
-from app.services.auth_service import AuthService
+from app.utils.dependencies import get_db, get_async_db, get_current_user, get_current_admin, security
+from app.services.auth_service import AuthService, AsyncAuthService
+from app.utils.password_hasher import PasswordHasherBusy
+from app.core.config import settings
 from app.schemas.auth import (
     UserRegisterRequest,
     UserRegisterResponse,
@@ -17,8 +21,9 @@ from app.schemas.auth import (
 )
 from app.core.logging_uru import logger
 from app.schemas.common_data import ApiResponseData
+from app.middleware.response_validator import ApiResponseRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 
 
 @router.post(
@@ -29,7 +34,7 @@ router = APIRouter()
 )
 async def register(
     request: UserRegisterRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     用户注册
@@ -37,13 +42,21 @@ async def register(
     - **username**: 用户名，3-50个字符，只能包含字母、数字和下划线
     - **password**: 密码，6-50个字符
     """
-    auth_service = AuthService(db)
+    auth_service = AsyncAuthService(db)
     
     # 执行注册
-    user, error = auth_service.register(
-        username=request.username,
-        password=request.password
-    )
+    try:
+        user, error = await auth_service.register(
+            username=request.username,
+            password=request.password
+        )
+    except PasswordHasherBusy as e:
+        logger.warning(f"用户注册被拒绝: {request.username}, 原因: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)}
+        )
     
     if error:
         logger.warning(f"用户注册失败: {request.username}, 原因: {error}")
@@ -71,7 +84,7 @@ async def register(
 )
 async def login(
     request: UserLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     用户登录
@@ -83,15 +96,23 @@ async def login(
     
     返回JWT Token，用于后续API调用的身份验证
     """
-    auth_service = AuthService(db)
+    auth_service = AsyncAuthService(db)
     
     # 执行登录
-    token, user_info, error = auth_service.login(
-        username=request.username,
-        password=request.password,
-        app_key=request.app_key,
-        device_id=request.device_id
-    )
+    try:
+        token, user_info, error = await auth_service.login(
+            username=request.username,
+            password=request.password,
+            app_key=request.app_key,
+            device_id=request.device_id
+        )
+    except PasswordHasherBusy as e:
+        logger.warning(f"用户登录被拒绝: {request.username}, 原因: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)}
+        )
     
     if error:
         logger.warning(f"用户登录失败: {request.username}, 原因: {error}")
@@ -150,19 +171,24 @@ async def verify_token(
     description="登出当前用户，使Token失效"
 )
 async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     用户登出
     
     登出后当前Token将失效，需要重新登录
     """
-    auth_service = AuthService(db)
+    auth_service = AsyncAuthService(db)
     
-    # 从请求头获取Token（这里需要从依赖中获取）
-    # 注意：这里简化处理，实际应该从request中获取token
-    # 暂时通过查询数据库中的token来删除
+    # 删除数据库中的Token并加入吊销列表
+    success, error = await auth_service.logout(credentials.credentials)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
     
     logger.info(f"用户登出: {current_user['username']} (ID: {current_user['user_id']})")
     
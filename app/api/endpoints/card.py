@@ -5,9 +5,10 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.utils.dependencies import get_db, get_current_user, get_current_admin
-from app.services.card_service import CardService
+from app.utils.dependencies import get_db, get_async_db, get_current_user, get_current_admin
+from app.services.card_service import CardService, AsyncCardService
 from app.schemas.card import (
     CardBindRequest,
     MyCardResponse,
@@ -20,8 +21,9 @@ from app.schemas.card import (
 )
 from app.core.logging_uru import logger
 from app.schemas.common_data import ApiResponseData
+from app.middleware.response_validator import ApiResponseRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 
 
 @router.get(
@@ -32,7 +34,7 @@ router = APIRouter()
 )
 async def get_my_cards(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询我的卡密
@@ -44,9 +46,9 @@ async def get_my_cards(
     - 已绑定设备数
     - 最大设备数
     """
-    card_service = CardService(db)
+    card_service = AsyncCardService(db)
     
-    cards_data = card_service.get_user_cards(current_user["user_id"])
+    cards_data = await card_service.get_user_cards(current_user["user_id"])
     
     # 转换为CardInfo对象
     cards = [
@@ -87,7 +89,7 @@ async def get_my_cards(
 async def bind_card(
     request: CardBindRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     绑定卡密
@@ -103,10 +105,10 @@ async def bind_card(
     4. 验证设备数量限制
     5. 创建绑定关系
     """
-    card_service = CardService(db)
+    card_service = AsyncCardService(db)
     
     # 执行绑定
-    card_info, error = card_service.bind_card(
+    card_info, error = await card_service.bind_card(
         user_id=current_user["user_id"],
         card_key=request.card_key,
         app_id=current_user["app_id"],
@@ -159,7 +161,7 @@ async def bind_card(
 async def unbind_device(
     request: UnbindDeviceRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     解绑设备
@@ -171,10 +173,10 @@ async def unbind_device(
     - 该设备将无法使用此卡密
     - 如果卡密没有其他设备绑定，卡密状态将改回"未使用"
     """
-    card_service = CardService(db)
+    card_service = AsyncCardService(db)
     
     # 执行解绑
-    success, error = card_service.unbind_device(
+    success, error = await card_service.unbind_device(
         user_id=current_user["user_id"],
         card_id=request.card_id,
         device_id=request.device_id
@@ -211,7 +213,7 @@ async def unbind_device(
 async def get_card_detail(
     card_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询卡密详情
@@ -221,10 +223,10 @@ async def get_card_detail(
     - 绑定的所有设备列表
     - 设备最后活跃时间
     """
-    card_service = CardService(db)
+    card_service = AsyncCardService(db)
     
     # 查询卡密详情
-    card_detail = card_service.get_card_detail(card_id)
+    card_detail = await card_service.get_card_detail(card_id)
     
     if not card_detail:
         raise HTTPException(
@@ -233,7 +235,7 @@ async def get_card_detail(
         )
     
     # 验证用户是否有权限查看（只能查看自己绑定的卡密）
-    user_cards = card_service.get_user_cards(current_user["user_id"])
+    user_cards = await card_service.get_user_cards(current_user["user_id"])
     user_card_ids = [card["card_id"] for card in user_cards]
     
     if card_id not in user_card_ids:
@@ -23,8 +23,9 @@ from app.schemas.feature_permission import (
 )
 from app.core.logging_uru import logger
 from app.schemas.common_data import ApiResponseData
+from app.middleware.response_validator import ApiResponseRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 
 
 @router.get(
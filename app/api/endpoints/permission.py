@@ -3,12 +3,12 @@
 提供权限验证功能
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime
 
-from app.utils.dependencies import get_db, get_current_user
-from app.services.permission_service import PermissionService
+from app.utils.dependencies import get_async_db, get_current_user
+from app.services.permission_service import AsyncPermissionService
 from app.schemas.permission import (
     PermissionCheckRequest,
     PermissionCheckResponse,
@@ -18,8 +18,9 @@ from app.schemas.permission import (
 )
 from app.core.logging_uru import logger
 from app.schemas.common_data import ApiResponseData
+from app.middleware.response_validator import ApiResponseRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 
 
 @router.post(
@@ -31,7 +32,7 @@ router = APIRouter()
 async def check_permission(
     request: PermissionCheckRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     权限校验接口
@@ -61,7 +62,7 @@ async def check_permission(
     - 如果 allowed=true，则可以继续执行业务逻辑
     - 如果 allowed=false，则提示用户没有权限
     """
-    permission_service = PermissionService(db)
+    permission_service = AsyncPermissionService(db)
     
     # 使用请求中的 device_id，如果没有提供则使用登录时的 device_id
     device_id = request.device_id if request.device_id else current_user.get("device_id")
@@ -73,23 +74,23 @@ async def check_permission(
         )
     
     # 执行权限校验
-    allowed, message, expire_time = permission_service.check_permission(
+    allowed, message, expire_time = await permission_service.check_permission(
         user_id=current_user["user_id"],
         device_id=device_id,
         permission=request.permission
     )
     
-    # 记录权限校验结果
-    log_message = (
-        f"权限校验: user={current_user['username']}, "
-        f"device={device_id}, permission={request.permission}, "
-        f"result={'通过' if allowed else '拒绝'}"
-    )
-    
+    # 记录权限校验结果：通过只记 DEBUG（默认级别下不格式化参数），请求本身由访问日志按采样记录
     if allowed:
-        logger.info(log_message)
+        logger.debug(
+            "权限校验: user={}, device={}, permission={}, result=通过",
+            current_user['username'], device_id, request.permission
+        )
     else:
-        logger.warning(log_message + f", reason={message}")
+        logger.warning(
+            "权限校验: user={}, device={}, permission={}, result=拒绝, reason={}",
+            current_user['username'], device_id, request.permission, message
+        )
     
     return PermissionCheckResponse(
         allowed=allowed,
@@ -107,7 +108,7 @@ async def check_permission(
 async def batch_check_permissions(
     request: BatchPermissionCheckRequest,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     批量权限校验接口
@@ -125,7 +126,7 @@ async def batch_check_permissions(
     - 应用启动时，批量检查所有需要的权限
     - 统一展示用户拥有的功能列表
     """
-    permission_service = PermissionService(db)
+    permission_service = AsyncPermissionService(db)
     
     # 使用请求中的 device_id，如果没有提供则使用登录时的 device_id
     device_id = request.device_id if request.device_id else current_user.get("device_id")
@@ -137,16 +138,15 @@ async def batch_check_permissions(
         )
     
     # 执行批量权限校验
-    results = permission_service.batch_check_permissions(
+    results = await permission_service.batch_check_permissions(
         user_id=current_user["user_id"],
         device_id=device_id,
         permissions=request.permissions
     )
     
-    logger.info(
-        f"批量权限校验: user={current_user['username']}, "
-        f"device={device_id}, permissions={request.permissions}, "
-        f"results={results}"
+    logger.debug(
+        "批量权限校验: user={}, device={}, permissions={}, results={}",
+        current_user['username'], device_id, request.permissions, results
     )
     
     return BatchPermissionCheckResponse(
@@ -163,7 +163,7 @@ async def batch_check_permissions(
 async def get_my_permissions(
     device_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     查询我的权限接口
@@ -182,7 +182,7 @@ async def get_my_permissions(
     - 应用启动时，获取用户的权限列表
     - 根据权限列表决定显示哪些功能模块
     """
-    permission_service = PermissionService(db)
+    permission_service = AsyncPermissionService(db)
     
     # 使用查询参数中的 device_id，如果没有提供则使用登录时的 device_id
     device = device_id if device_id else current_user.get("device_id")
@@ -194,15 +194,14 @@ async def get_my_permissions(
         )
     
     # 获取用户权限
-    has_permission, permissions, expire_time = permission_service.get_user_permissions(
+    has_permission, permissions, expire_time = await permission_service.get_user_permissions(
         user_id=current_user["user_id"],
         device_id=device
     )
     
-    logger.info(
-        f"查询用户权限: user={current_user['username']}, "
-        f"device={device}, has_permission={has_permission}, "
-        f"permissions={permissions}"
+    logger.debug(
+        "查询用户权限: user={}, device={}, has_permission={}, permissions={}",
+        current_user['username'], device, has_permission, permissions
     )
     
     return UserPermissionsResponse(
@@ -2,10 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from app.schemas.common_data import ApiResponseData
 from app.decorators.cache_decorator import ttl_cache, timed_cache, get_cache
 from app.services.test_api import get_wx_hot_topics, search_wx_accounts
+from app.middleware.response_validator import ApiResponseRoute
 from loguru import logger
 
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 # 测试loguru日志、cachetools缓存接口
 @router.get("/hot-topics", response_model=ApiResponseData)
 async def get_hot_topics(count: int = Query(10, description="话题数量", ge=1, le=50)):
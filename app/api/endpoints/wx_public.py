@@ -10,9 +10,10 @@ from app.services.wx_public import (
 from app.schemas.wx_data import ArticleDetailRequest
 from app.schemas.common_data import ApiResponseData
 from app.decorators.cache_decorator import ttl_cache, timed_cache, get_cache
+from app.middleware.response_validator import ApiResponseRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ApiResponseRoute)
 
 
 @router.get("/search", response_model=ApiResponseData)
@@ -16,6 +16,7 @@ def get_database_config():
     print("----------------------------------------")
     return {
         "driver": settings.DB_DRIVER,
+        "async_driver": settings.DB_ASYNC_DRIVER,
         "username": settings.DB_USER,
         "password": settings.DB_PASSWORD,
         "host": settings.DB_HOST,
@@ -36,5 +37,12 @@ def get_database_url() -> str:
     config = get_database_config()
     return f"{config['driver']}://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}?charset={config['charset']}"
 
+def get_async_database_url() -> str:
+    """获取当前环境的异步数据库URL"""
+    config = get_database_config()
+    return f"{config['async_driver']}://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}?charset={config['charset']}"
+
 # 导出数据库URL供SQLAlchemy和Alembic使用
 DATABASE_URL = get_database_url()
+# 异步数据库URL，供 AsyncSession 使用
+ASYNC_DATABASE_URL = get_async_database_url()
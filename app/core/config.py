@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import os
 from dotenv import load_dotenv
 from pydantic import field_validator
@@ -35,6 +35,77 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-this-in-production-09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7天
+    # Token 校验模式: strict-每次请求查询 user_tokens/users 表, stateless-本地校验JWT签名和过期时间 + 进程内吊销集合
+    # stateless 的吊销集合不持久化：进程启动之前签发的 Token 回退到 strict 校验（结果仍由 Token 校验缓存缓存），
+    # 重启后已登出、被替换的 Token 不会重新生效；残余风险：未配置 CACHE_BACKEND=redis 的多 worker 部署中，
+    # 在其他 worker 上登出、被替换的 Token 在本 worker 仍然有效，直到过期
+    TOKEN_VERIFY_MODE: str = "strict"
+    # Token 校验结果缓存（get_current_user），TTL 单位为秒
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAXSIZE: int = 10000
+    TOKEN_CACHE_TTL: int = 60
+
+    # 有效权限快照缓存配置：按 (user_id, device_id) 缓存权限校验结果
+    PERMISSION_CACHE_ENABLED: bool = True
+    PERMISSION_CACHE_MAXSIZE: int = 10000
+    PERMISSION_CACHE_TTL: int = 60 # 秒，卡密/设备/用户变更时会主动失效
+
+    # 设备心跳写回配置：权限校验时的设备活跃时间在内存中合并，按间隔批量写回
+    HEARTBEAT_FLUSH_INTERVAL: float = 10.0 # 写回间隔（秒）
+    HEARTBEAT_BATCH_SIZE: int = 500 # 单条 UPDATE 语句包含的最大设备数
+
+    # 批量删除用户/卡密/应用时每个事务处理的ID数量
+    BATCH_DELETE_CHUNK_SIZE: int = 1000
+
+    # 批量修改用户/卡密/设备状态时每个 UPDATE 语句（事务）处理的行数
+    BULK_UPDATE_CHUNK_SIZE: int = 1000
+
+    # 卡密流式导出时每批从数据库读取的行数
+    CARD_EXPORT_BATCH_SIZE: int = 1000
+
+    # 管理后台游标分页时列表总数的缓存时间（秒）
+    ADMIN_LIST_TOTAL_CACHE_TTL: int = 30
+
+    # 管理后台统计数据快照的缓存时间（秒），过期后先返回旧快照并在后台刷新
+    STATISTICS_CACHE_TTL: int = 30
+
+    # 密码哈希算法配置：新密码使用 PASSWORD_HASH_SCHEME，PASSWORD_LEGACY_SCHEMES 中的旧算法仍可校验；
+    # 登录成功时算法或轮数与当前配置不一致的哈希会重新生成，调高或调低轮数都会随登录逐步迁移
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_HASH_ROUNDS: Optional[int] = None # 哈希轮数（bcrypt 为 2 的指数，默认 12），None 使用算法默认值且不按轮数迁移
+    PASSWORD_LEGACY_SCHEMES: List[str] = [] # 仅用于校验的旧算法，如 ["pbkdf2_sha256"]
+
+    # 密码哈希线程池：登录/注册时的 bcrypt 计算在线程池中执行，排队超过上限时返回 503
+    PASSWORD_HASH_WORKERS: int = 4 # 线程数，建议不超过 CPU 核数
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64 # 排队等待的最大请求数
+    PASSWORD_HASH_RETRY_AFTER: int = 1 # 拒绝时 Retry-After 响应头（秒）
+
+    # 卡密生成后台任务配置
+    CARD_JOB_WORKERS: int = 2 # 同时执行的任务数
+    CARD_JOB_CHUNK_SIZE: int = 1000 # 每个事务提交的卡密数量
+    CARD_JOB_RESUME_ON_STARTUP: bool = False # 启动时继续执行 pending 和租约已过期的 running 任务（任务通过条件 UPDATE 领取，多进程同时开启也不会重复生成）
+    CARD_JOB_LEASE_SECONDS: int = 60 # 任务租约时间（秒），每个分块提交时续约，超过该时间未续约的 running 任务可被其他进程接管
+
+    # 缓存装饰器后端: memory-进程内缓存（每个 worker 独立），redis-Redis 兼容的共享缓存
+    # 配置 redis 时，进程内缓存（权限快照、Token 缓存、统计快照）的失效也会通过 Redis 通知其他 worker
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "login_km" # 缓存键和失效通知频道的前缀，多个环境共用 Redis 时需区分
+    APP_CACHE_TTL: int = 60 # 按 app_key 查询应用的缓存时间（秒），应用状态变更时主动失效
+    APP_CACHE_NEGATIVE_TTL: int = 10 # 不存在的 app_key 的缓存时间（秒），创建应用时主动失效
+    APP_CACHE_STALE_TTL: int = 30 # 缓存过期后仍先返回旧数据并在后台刷新的时间（秒），0 表示不启用
+
+    # 接口响应使用 orjson 序列化（需安装 orjson，未安装时自动使用标准库 json）
+    JSON_RESPONSE_ORJSON: bool = True
+
+    # 日志配置
+    LOG_LEVEL: str = "INFO" # 日志级别，DEBUG=True 时为 DEBUG
+    LOG_JSON: bool = False # 是否输出结构化 JSON 日志（每行一条记录，extra 字段保留为 JSON 字段）
+    # 全量调试模式：DEBUG 级别、不采样、日志中输出完整 Token、异常堆栈显示变量值（仅用于排查问题）
+    LOG_DEBUG_VERBOSE: bool = False
+    LOG_SAMPLE_RATE: float = 1.0 # 请求日志默认采样率（0~1），WARNING 及以上级别、5xx 和慢请求始终记录
+    LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = {} # 按路径前缀配置采样率，最长前缀优先，如 {"/api/v1/permission/check": 0.01}
+    LOG_SLOW_REQUEST_MS: int = 1000 # 慢请求阈值（毫秒）
 
     # docker 数据库字段
     MYSQL_ROOT_PASSWORD: Optional[str] = "aa123456"
@@ -45,6 +116,7 @@ class Settings(BaseSettings):
 
         # 数据库配置
     DB_DRIVER: Optional[str] = "mysql+mysqlconnector"
+    DB_ASYNC_DRIVER: Optional[str] = "mysql+aiomysql" # 异步驱动，用于 AsyncSession
     DB_USER: Optional[str] = "root"
     DB_PASSWORD: Optional[str] = "aa123456"
     DB_HOST: Optional[str] = "localhost"
@@ -1,6 +1,9 @@
 import logging
+import random
 import sys
 import os
+from contextvars import ContextVar, Token
+from functools import lru_cache
 from typing import List, Optional
 from datetime import datetime
 
@@ -11,12 +14,78 @@ from app.core.config import settings
 
 
 class LoggingSettings(BaseModel):
-    LOGGING_LEVEL: str = "INFO"
+    LOGGING_LEVEL: str = settings.LOG_LEVEL
     LOGGERS: List[str] = [""]
 
 
 logging_settings = LoggingSettings()
 
+# 当前请求是否被采样（由 RequestLoggingMiddleware 按路径设置），未采样请求中 INFO 及以下级别的日志不输出
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+# 按路径前缀配置的采样率，最长前缀优先匹配
+_route_sample_rates = sorted(settings.LOG_ROUTE_SAMPLE_RATES.items(), key=lambda item: len(item[0]), reverse=True)
+
+
+@lru_cache(maxsize=1024)
+def route_sample_rate(path: str) -> float:
+    """
+    获取请求路径的日志采样率
+
+    Args:
+        path: 请求路径
+
+    Returns:
+        采样率（0~1），全量调试模式下始终为 1
+    """
+    if settings.LOG_DEBUG_VERBOSE:
+        return 1.0
+    return next((rate for prefix, rate in _route_sample_rates if path.startswith(prefix)), settings.LOG_SAMPLE_RATE)
+
+
+def sample_request(path: str) -> Token:
+    """
+    按路径采样率决定当前请求是否输出 INFO 及以下级别的日志
+
+    Args:
+        path: 请求路径
+
+    Returns:
+        ContextVar Token，请求结束时交给 reset_request_sampling 恢复
+    """
+    rate = route_sample_rate(path)
+    return _request_sampled.set(rate >= 1 or (rate > 0 and random.random() < rate))
+
+
+def reset_request_sampling(token: Token) -> None:
+    """恢复请求开始前的采样状态"""
+    _request_sampled.reset(token)
+
+
+def is_request_sampled() -> bool:
+    """当前请求是否被采样（请求之外始终为 True）"""
+    return _request_sampled.get()
+
+
+def mask_token(token: Optional[str]) -> str:
+    """
+    日志中脱敏 Token，只保留前 8 位；全量调试模式下返回完整 Token
+
+    Args:
+        token: 原始 Token
+
+    Returns:
+        脱敏后的 Token
+    """
+    if not token or settings.LOG_DEBUG_VERBOSE:
+        return token or ""
+    return f"{token[:8]}...({len(token)})"
+
+
+def _sampled(record) -> bool:
+    """sink 过滤器：WARNING 及以上级别始终输出，其余按当前请求的采样结果输出"""
+    return record["level"].no >= 30 or _request_sampled.get()
+
 
 def setup_logging() -> None:
     """设置日志配置"""
@@ -24,7 +93,11 @@ def setup_logging() -> None:
     logger.remove()
     
     # 设置日志级别
-    log_level = logging_settings.LOGGING_LEVEL if not settings.DEBUG else "DEBUG"
+    log_level = logging_settings.LOGGING_LEVEL if not (settings.DEBUG or settings.LOG_DEBUG_VERBOSE) else "DEBUG"
+    # 异常堆栈中显示变量值会把 Token、密码等写入日志，只在全量调试模式下开启
+    diagnose = settings.LOG_DEBUG_VERBOSE
+    # 结构化 JSON 输出：每条日志序列化为一行 JSON（含 bind/extra 字段）
+    serialize = settings.LOG_JSON
     
     # 创建日志目录，普通运行日志目录
     log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs", "app_run")
@@ -38,9 +111,11 @@ def setup_logging() -> None:
         sink=sys.stderr,  # 使用 stderr 而不是 stdout 可以避免一些缓冲问题
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=log_level,
-        colorize=True,
-        enqueue=True,  # 启用队列模式，避免多线程/多进程问题
-        diagnose=True,  # 启用诊断信息（异常堆栈等）
+        filter=_sampled,
+        colorize=not serialize,
+        serialize=serialize,
+        enqueue=True,  # 启用队列模式，避免多线程/多进程问题，写入在后台线程完成，不阻塞请求
+        diagnose=diagnose,
     )
     
     # 添加文件日志处理器 主日志（排除 ERROR 及以上）
@@ -48,13 +123,14 @@ def setup_logging() -> None:
         sink=log_filename,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
         level=log_level,  # 设置基础级别为 INFO
-        filter=lambda record: record["level"].no < 40,  # 40=ERROR级别数值 过滤掉ERROR级别及以上的日志
+        filter=lambda record: record["level"].no < 40 and _sampled(record),  # 40=ERROR级别数值 过滤掉ERROR级别及以上的日志
         rotation="00:00",  # 每天午夜轮换日志文件
         retention="30 days",  # 保留30天的日志
         compression="zip",  # 压缩旧日志
         encoding="utf-8",
+        serialize=serialize,
         enqueue=True,  # 启用队列模式，避免多线程/多进程问题
-        diagnose=True,  # 启用诊断信息（异常堆栈等）
+        diagnose=diagnose,
     )
     
     # 创建错误日志目录
@@ -71,8 +147,9 @@ def setup_logging() -> None:
         retention="90 days",  # 保留90天的日志
         compression="zip",  # 压缩旧日志
         encoding="utf-8",
+        serialize=serialize,
         enqueue=True,
-        diagnose=True,
+        diagnose=diagnose,
     )
     
     # 设置第三方库的日志级别
@@ -81,7 +158,10 @@ def setup_logging() -> None:
         logger.level(module, logging.WARNING)  # 使用 logging.WARNING 整数常量而不是字符串
     
     # 日志初始化完成信息
-    logger.info("日志系统初始化完成 - 使用 loguru")
+    logger.info(
+        f"日志系统初始化完成 - 使用 loguru，级别 {log_level}，JSON {serialize}，"
+        f"全量调试 {settings.LOG_DEBUG_VERBOSE}，默认采样率 {settings.LOG_SAMPLE_RATE}"
+    )
     
     # 拦截标准库的日志
     # 这样通过 logging 模块记录的日志也会被 loguru 处理
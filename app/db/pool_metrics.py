@@ -0,0 +1,120 @@
+"""
+连接池监控
+统计连接池的借出数、溢出数以及获取连接的等待时间，用于调优 DB_POOL_SIZE / DB_MAX_OVERFLOW
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolWaitStats:
+    """获取连接等待时间的累计统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        """
+        记录一次获取连接
+
+        Args:
+            wait: 等待时间（秒）
+            timed_out: 是否因 pool_timeout 超时失败
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取统计快照
+
+        Returns:
+            获取次数、超时次数、平均/最大等待毫秒数
+        """
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _WaitTimingMixin:
+    """在 _do_get 外层计时，覆盖排队等待和新建连接的耗时"""
+
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # dispose/recreate 时保留同一份统计
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    """带等待时间统计的同步连接池"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    """带等待时间统计的异步连接池"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+
+def collect_pool_metrics(pool) -> Dict[str, Any]:
+    """
+    采集连接池指标
+
+    Args:
+        pool: SQLAlchemy 连接池
+
+    Returns:
+        连接池容量、当前借出/空闲/溢出数量以及等待时间统计
+    """
+    metrics: Dict[str, Any] = {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # overflow() 在连接未达到 pool_size 时为负数，只统计实际溢出的连接
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        metrics.update(wait_stats.snapshot())
+    return metrics
@@ -2,10 +2,11 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.pool import QueuePool
-from typing import Generator
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from typing import Generator, AsyncGenerator, Optional, Dict, Any
 import logging
-from app.config.database_config import get_database_config, DATABASE_URL
+from app.config.database_config import get_database_config, DATABASE_URL, ASYNC_DATABASE_URL
+from app.db.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, collect_pool_metrics
 # 创建基类，用于声明模型
 Base = declarative_base()
 
@@ -13,8 +14,11 @@ class Database:
     def __init__(self):
         self.db_config = get_database_config()
         self.db_url = DATABASE_URL
+        self.async_db_url = ASYNC_DATABASE_URL
         self._engine = None
         self._session_factory = None
+        self._async_engine: Optional[AsyncEngine] = None
+        self._async_session_factory = None
 
     def connect(self) -> None:
         """初始化数据库连接"""
@@ -22,14 +26,14 @@ class Database:
             # 创建引擎，配置连接池
             self._engine = create_engine(
                 self.db_url,
-                poolclass=QueuePool,
+                poolclass=InstrumentedQueuePool,
                 pool_size=self.db_config['pool_size'],
                 max_overflow=self.db_config['max_overflow'],
                 pool_timeout=self.db_config['pool_timeout'],
                 pool_recycle=self.db_config['pool_recycle'],
                 echo=self.db_config['echo']
             )
-            
+
             # 创建会话工厂
             self._session_factory = sessionmaker(
                 bind=self._engine,
@@ -49,36 +53,111 @@ class Database:
             logging.error(f"sqlalchemy数据库连接失败: {e}")
             raise
 
+    def connect_async(self) -> None:
+        """
+        初始化异步数据库引擎
+
+        异步引擎使用独立的连接池（AsyncAdaptedQueuePool），连接在首次使用时建立
+        """
+        try:
+            self._async_engine = create_async_engine(
+                self.async_db_url,
+                poolclass=InstrumentedAsyncQueuePool,
+                pool_size=self.db_config['pool_size'],
+                max_overflow=self.db_config['max_overflow'],
+                pool_timeout=self.db_config['pool_timeout'],
+                pool_recycle=self.db_config['pool_recycle'],
+                echo=self.db_config['echo']
+            )
+
+            # 提交后不过期对象属性，避免在事件循环中触发隐式的懒加载IO
+            self._async_session_factory = async_sessionmaker(
+                bind=self._async_engine,
+                autoflush=False,
+                expire_on_commit=False
+            )
+            logging.info("sqlalchemy异步数据库引擎初始化成功")
+
+        except Exception as e:
+            logging.error(f"sqlalchemy异步数据库引擎初始化失败: {e}")
+            raise
+
     def get_session(self) -> Generator[Session, None, None]:
         """获取数据库会话"""
         if not self._session_factory:
             raise RuntimeError("sqlalchemy数据库未初始化，请先调用 connect()")
-            
+
         session = self._session_factory()
         try:
             yield session
         finally:
             session.close()
 
+    def create_session(self) -> Session:
+        """
+        创建一个独立的数据库会话，供脚本等非请求场景使用，调用方负责关闭
+
+        Returns:
+            数据库会话
+        """
+        if not self._session_factory:
+            raise RuntimeError("sqlalchemy数据库未初始化，请先调用 connect()")
+        return self._session_factory()
+
+    def create_async_session(self) -> AsyncSession:
+        """
+        创建一个独立的异步数据库会话，供缓存加载等不属于某个请求的场景使用，调用方负责关闭
+
+        Returns:
+            异步数据库会话
+        """
+        if not self._async_session_factory:
+            raise RuntimeError("sqlalchemy异步数据库未初始化，请先调用 connect_async()")
+        return self._async_session_factory()
+
+    async def get_async_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """获取异步数据库会话"""
+        if not self._async_session_factory:
+            raise RuntimeError("sqlalchemy异步数据库未初始化，请先调用 connect_async()")
+
+        async with self._async_session_factory() as session:
+            yield session
+
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """
+        获取同步和异步连接池的运行指标
+
+        Returns:
+            {"sync": {...}, "async": {...}}，未初始化的引擎返回 None
+        """
+        return {
+            "sync": collect_pool_metrics(self._engine.pool) if self._engine else None,
+            "async": collect_pool_metrics(self._async_engine.sync_engine.pool) if self._async_engine else None,
+        }
+
     def close(self) -> None:
         """关闭数据库连接"""
         if self._engine:
             self._engine.dispose()
             logging.info("sqlalchemy数据库连接已关闭")
 
+    async def close_async(self) -> None:
+        """关闭异步数据库连接"""
+        if self._async_engine:
+            await self._async_engine.dispose()
+            logging.info("sqlalchemy异步数据库连接已关闭")
+
 # 创建全局数据库实例
 database = Database()
 
 # 获取数据库会话的依赖函数
 def get_sqlalchemy_db() -> Generator[Session, None, None]:
-    """获取数据库会话"""
-    db = next(database.get_session())
-    try:
-        return db
-    except Exception as e:
-        db.close()
-        logging.error(f"获取数据库会话失败: {e}")
-        raise
-    finally:
-        print('数据库会话关闭')
-        db.close()
+    """获取数据库会话，请求结束后关闭会话并将连接归还连接池"""
+    yield from database.get_session()
+
+
+# 获取异步数据库会话的依赖函数
+async def get_async_sqlalchemy_db() -> AsyncGenerator[AsyncSession, None]:
+    """获取异步数据库会话，请求结束后归还连接"""
+    async for session in database.get_async_session():
+        yield session
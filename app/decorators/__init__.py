@@ -2,8 +2,16 @@
 装饰器模块
 提供各种装饰器和依赖注入函数
 """
-from app.decorators.permission_decorator import require_permission
 
 __all__ = [
     "require_permission",
 ]
+
+
+def __getattr__(name):
+    # 延迟导入：permission_decorator 依赖服务层，而服务层会使用 cache_decorator，
+    # 导入 app.decorators.cache_decorator 时不能先加载 permission_decorator，否则循环导入
+    if name == "require_permission":
+        from app.decorators.permission_decorator import require_permission
+        return require_permission
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
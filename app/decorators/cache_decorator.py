@@ -1,10 +1,15 @@
 import functools
-import time
 import asyncio
-from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union, cast
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar, Union, cast
+
+from cachetools import TTLCache, LRUCache
+from cachetools.keys import hashkey, typedkey
+from loguru import logger
 
-from cachetools import TTLCache, LRUCache, cached
-from cachetools.keys import hashkey
+from app.utils.cache_backend import CacheBackend, MemoryCacheBackend, MISSING, cache_backend, invalidation_bus
 
 # 定义类型变量
 T = TypeVar('T')
@@ -13,68 +18,386 @@ FuncType = Callable[..., T]
 # 默认缓存配置
 DEFAULT_MAXSIZE = 128  # 默认最大缓存条目数
 DEFAULT_TTL = 300  # 默认缓存过期时间（秒）
+DEFAULT_NEGATIVE_TTL = 30  # 函数返回 None 时的默认缓存时间（秒），不超过 ttl
+
+# 全局缓存实例（进程内后端的命名空间；共享后端时只用于 get_cache 兼容）
+_cache_instances: Dict[str, Union[TTLCache, LRUCache]] = (
+    cache_backend.caches if isinstance(cache_backend, MemoryCacheBackend) else {}
+)
+
+# 跨 worker 失效通知的主题
+_INVALIDATION_TOPIC = "cache_decorator"
+
+# 各命名空间中包装器的本地失效函数：本进程的 invalidate/clear_cache 和其他 worker 的失效通知都经过它们，
+# 保证进行中的计算不会在失效之后写回旧结果
+_local_invalidators: Dict[str, List[Callable[[Optional[Hashable]], None]]] = {}
+
+
+class _CacheEntry:
+    """
+    缓存条目：包装函数结果，使缓存的 None（负缓存）与未命中可区分
+    
+    fresh_until 之前为新鲜数据；之后到 stale_until 之间为旧数据，可先返回并在后台刷新
+    """
+    __slots__ = ("value", "fresh_until", "stale_until")
 
-# 全局缓存实例
-_cache_instances: Dict[str, Union[TTLCache, LRUCache]] = {}
+    def __init__(self, value: Any, fresh_until: Optional[float], stale_until: Optional[float]):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
 
+    def __getstate__(self):
+        return self.value, self.fresh_until, self.stale_until
 
-def _create_cache_wrapper(func: FuncType, cache_get_func, cache_set_func) -> FuncType:
+    def __setstate__(self, state):
+        self.value, self.fresh_until, self.stale_until = state
+
+    def is_fresh(self, now: float) -> bool:
+        return self.fresh_until is None or now < self.fresh_until
+
+    def is_stale_usable(self, now: float) -> bool:
+        return self.stale_until is not None and now < self.stale_until
+
+
+def _in_event_loop_thread() -> bool:
+    """当前线程是否正在运行事件循环"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class _Flight:
+    """同一缓存键正在进行的一次计算（同步函数），其他线程等待它的结果"""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _create_cache_wrapper(
+    func: FuncType,
+    cache_name: str,
+    key_func: Callable[..., Hashable],
+    ttl: Optional[float],
+    maxsize: int,
+    backend: Optional[CacheBackend] = None,
+    negative_ttl: Optional[float] = DEFAULT_NEGATIVE_TTL,
+    stale_ttl: Optional[float] = None,
+    refresh_loader: Optional[Callable[[Hashable], Any]] = None
+) -> FuncType:
     """创建缓存包装器，支持同步和异步函数
     
+    - 单飞（single-flight）：同一进程内同一缓存键未命中时只执行一次函数，并发调用等待同一个结果
+    - 负缓存：函数返回 None 时按 negative_ttl 缓存（不超过 ttl），避免不存在的数据反复查库
+    - stale-while-revalidate：配置 stale_ttl 时，过期 stale_ttl 秒内的旧数据先返回，后台刷新
+    
     Args:
         func: 要包装的函数
-        cache_get_func: 从缓存获取值的函数
-        cache_set_func: 设置缓存值的函数
+        cache_name: 缓存命名空间
+        key_func: 根据调用参数生成缓存键的函数
+        ttl: 缓存条目的生存时间（秒），None 表示只按容量淘汰
+        maxsize: 缓存的最大条目数（进程内后端）
+        backend: 缓存后端，默认使用全局后端（CACHE_BACKEND）
+        negative_ttl: 返回 None 时的缓存时间（秒），None 或 0 表示不缓存 None
+        stale_ttl: 过期后仍可返回旧数据的时间（秒），None 或 0 表示不启用（ttl 为 None 时无效）
+        refresh_loader: 后台刷新使用的加载函数，参数为缓存键，与 func 同为同步或异步；
+            同步函数启用 stale_ttl 时必须提供（刷新在其他线程执行，不能复用调用方的参数，如数据库会话）
     
     Returns:
-        包装后的函数
+        包装后的函数，附带 clear_cache()、invalidate(*args, **kwargs)、cache_info() 方法
     """
+    backend = backend or cache_backend
+    stale_ttl = stale_ttl if ttl and stale_ttl else None
+    is_async = asyncio.iscoroutinefunction(func)
+    if stale_ttl and not is_async and refresh_loader is None:
+        raise ValueError(f"缓存 {cache_name} 启用 stale_ttl 时需要提供 refresh_loader，后台刷新不能复用调用方的参数")
+    if negative_ttl and ttl:
+        negative_ttl = min(negative_ttl, ttl)
+    # 后端中的保存时间包含旧数据可用的时间
+    store_ttl = ttl + stale_ttl if ttl and stale_ttl else ttl
+    if isinstance(backend, MemoryCacheBackend):
+        # 进程内命名空间在装饰时创建，容量和 TTL 以装饰器参数为准
+        backend.namespace(cache_name, maxsize, store_ttl)
+    
+    sync_flights: Dict[Hashable, _Flight] = {}
+    async_flights: Dict[Hashable, "asyncio.Task[Any]"] = {}
+    flights_lock = threading.Lock()
+    # 失效代数：计算开始后发生失效时，计算结果不再写入缓存
+    generation = [0]
+    # 统计（未加锁，近似值）
+    info = {"hits": 0, "misses": 0, "stale_hits": 0, "coalesced": 0, "refresh_errors": 0}
+    
+    def make_entry(result: Any) -> Optional[Tuple[_CacheEntry, Optional[float]]]:
+        """根据函数结果生成缓存条目和后端保存时间，不缓存时返回 None"""
+        now = time.time()
+        if result is None:
+            if not negative_ttl:
+                return None
+            return _CacheEntry(None, now + negative_ttl, None), negative_ttl
+        fresh_until = now + ttl if ttl else None
+        stale_until = fresh_until + stale_ttl if fresh_until and stale_ttl else None
+        return _CacheEntry(result, fresh_until, stale_until), store_ttl
+    
+    def lookup(cached: Any) -> Tuple[bool, Any, bool]:
+        """
+        解析后端读出的值
+        
+        Returns:
+            (是否可用, 结果, 是否需要后台刷新)
+        """
+        if isinstance(cached, _CacheEntry):
+            now = time.time()
+            if cached.is_fresh(now):
+                info["hits"] += 1
+                return True, cached.value, False
+            if cached.is_stale_usable(now):
+                info["stale_hits"] += 1
+                return True, cached.value, True
+            return False, None, False
+        if cached is not MISSING and cached is not None:
+            # 旧版本写入的未包装结果
+            info["hits"] += 1
+            return True, cached, False
+        return False, None, False
+    
+    async def compute_async(key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        started_generation = generation[0]
+        result = await call()
+        stored = make_entry(result)
+        if stored is not None and generation[0] == started_generation:
+            # 共享后端的网络读写放到线程中，不阻塞事件循环
+            if backend.blocking:
+                await asyncio.to_thread(backend.set, cache_name, key, stored[0], stored[1], maxsize)
+            else:
+                backend.set(cache_name, key, stored[0], stored[1], maxsize)
+        return result
+    
+    def start_async_load(key: Hashable, call: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        """返回该键正在进行的计算任务，没有时创建（任务独立于调用方，调用方被取消不影响其他等待者）"""
+        loop = asyncio.get_running_loop()
+        task = async_flights.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            info["coalesced"] += 1
+            return task
+        info["misses"] += 1
+        task = loop.create_task(compute_async(key, call))
+        async_flights[key] = task
+        
+        def finished(done: "asyncio.Task[Any]") -> None:
+            if async_flights.get(key) is done:
+                del async_flights[key]
+            if not done.cancelled():
+                # 取出异常，避免所有等待者都被取消时出现 "exception was never retrieved"
+                done.exception()
+        
+        task.add_done_callback(finished)
+        return task
+    
+    def refresh_failed(task: "asyncio.Task[Any]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            info["refresh_errors"] += 1
+            logger.warning("缓存 {} 后台刷新失败，继续使用旧数据: {!r}", cache_name, task.exception())
+    
     @functools.wraps(func)
     async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+        key = key_func(*args, **kwargs)
         # 尝试从缓存获取结果
-        cache_result = cache_get_func(*args, **kwargs)
-        if cache_result is not None:
-            return cache_result
+        if backend.blocking:
+            cached = await asyncio.to_thread(backend.get, cache_name, key)
+        else:
+            cached = backend.get(cache_name, key)
+        found, value, refresh = lookup(cached)
+        if found:
+            if refresh:
+                call = functools.partial(refresh_loader, key) if refresh_loader else functools.partial(func, *args, **kwargs)
+                start_async_load(key, call).add_done_callback(refresh_failed)
+            return value
         
-        # 计算结果并缓存
-        result = await func(*args, **kwargs)
-        cache_set_func(result, *args, **kwargs)
+        # 计算结果并缓存（同一键的并发调用共用一个任务）
+        return await asyncio.shield(start_async_load(key, functools.partial(func, *args, **kwargs)))
+    
+    def compute_sync(key: Hashable, call: Callable[[], Any], started_generation: int) -> Any:
+        info["misses"] += 1
+        result = call()
+        stored = make_entry(result)
+        if stored is not None and generation[0] == started_generation:
+            backend.set(cache_name, key, stored[0], stored[1], maxsize)
         return result
     
+    def load_sync(key: Hashable, call: Callable[[], Any]) -> Any:
+        """执行函数并缓存结果；同一键已有线程在计算时等待其结果"""
+        with flights_lock:
+            flight = sync_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = sync_flights[key] = _Flight()
+            started_generation = generation[0]
+        if not leader:
+            if _in_event_loop_thread():
+                # 事件循环线程上（如 AsyncSession.run_sync 的 greenlet）不能阻塞等待：
+                # 正在计算的调用可能挂起在同一线程的异步驱动上，等待会导致死锁，直接自行计算
+                return compute_sync(key, call, started_generation)
+            info["coalesced"] += 1
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            result = compute_sync(key, call, started_generation)
+            flight.result = result
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with flights_lock:
+                if sync_flights.get(key) is flight:
+                    del sync_flights[key]
+            flight.event.set()
+    
+    def refresh_sync(key: Hashable) -> None:
+        try:
+            load_sync(key, functools.partial(cast(Callable[[Hashable], Any], refresh_loader), key))
+        except Exception as e:
+            info["refresh_errors"] += 1
+            logger.warning("缓存 {} 后台刷新失败，继续使用旧数据: {!r}", cache_name, e)
+    
     @functools.wraps(func)
     def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+        key = key_func(*args, **kwargs)
         # 尝试从缓存获取结果
-        cache_result = cache_get_func(*args, **kwargs)
-        if cache_result is not None:
-            return cache_result
+        found, value, refresh = lookup(backend.get(cache_name, key))
+        if found:
+            if refresh and key not in sync_flights:
+                threading.Thread(target=refresh_sync, args=(key,),
+                                 name=f"cache-refresh-{cache_name}", daemon=True).start()
+            return value
         
-        # 计算结果并缓存
-        result = func(*args, **kwargs)
-        cache_set_func(result, *args, **kwargs)
-        return result
+        # 计算结果并缓存（同一键的并发调用只执行一次）
+        return load_sync(key, functools.partial(func, *args, **kwargs))
+    
+    def invalidate_local(key: Optional[Hashable] = None) -> None:
+        """失效本进程中的缓存键，key 为 None 时清空命名空间；递增失效代数，失效前开始的计算不再写回或被复用"""
+        with flights_lock:
+            generation[0] += 1
+            if key is None:
+                sync_flights.clear()
+                async_flights.clear()
+            else:
+                sync_flights.pop(key, None)
+                async_flights.pop(key, None)
+        if key is None:
+            backend.clear(cache_name)
+        else:
+            backend.delete(cache_name, key)
+    
+    _local_invalidators.setdefault(cache_name, []).append(invalidate_local)
+    
+    def invalidate(*args: Any, **kwargs: Any) -> None:
+        """失效指定参数对应的缓存，并通知其他 worker"""
+        key = key_func(*args, **kwargs)
+        _invalidate_local(cache_name, key)
+        _publish_invalidation(backend, cache_name, key)
+    
+    def clear() -> None:
+        """清空整个命名空间，并通知其他 worker"""
+        _invalidate_local(cache_name)
+        _publish_invalidation(backend, cache_name)
+    
+    def cache_info() -> Dict[str, Any]:
+        """命中、未命中、旧数据命中、合并的并发调用等统计"""
+        return {**info, "in_flight": len(sync_flights) + len(async_flights)}
     
     # 根据函数是否为异步选择合适的包装器
-    return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
+    wrapper = async_wrapper if is_async else sync_wrapper
+    wrapper.cache_name = cache_name  # type: ignore
+    wrapper.invalidate = invalidate  # type: ignore
+    wrapper.clear_cache = clear  # type: ignore
+    wrapper.cache_info = cache_info  # type: ignore
+    return cast(FuncType, wrapper)
+
+
+def _publish_invalidation(backend: CacheBackend, namespace: str, key: Optional[Hashable] = None) -> None:
+    """
+    通知其他 worker 失效进程内缓存（共享后端所有 worker 读同一份数据，不需要通知）
+    
+    Args:
+        backend: 缓存后端
+        namespace: 命名空间
+        key: 缓存键，None 或无法 JSON 序列化时通知清空整个命名空间
+    """
+    if backend.shared:
+        return
+    if key is not None:
+        try:
+            json.dumps(key)
+        except (TypeError, ValueError):
+            key = None
+    invalidation_bus.publish(_INVALIDATION_TOPIC, namespace, key)
+
+
+def _invalidate_local(namespace: str, key: Optional[Hashable] = None) -> None:
+    """
+    失效本进程中命名空间的缓存键（不通知其他 worker）
+    
+    Args:
+        namespace: 命名空间
+        key: 缓存键，None 表示清空整个命名空间
+    """
+    invalidators = _local_invalidators.get(namespace)
+    if invalidators:
+        for invalidate_local in list(invalidators):
+            invalidate_local(key)
+    elif key is None:
+        # 没有装饰器使用的命名空间（如 get_cache 创建的）直接操作全局后端
+        cache_backend.clear(namespace)
+    else:
+        cache_backend.delete(namespace, key)
+
+
+def _apply_invalidation(namespace: str, key: Any = None) -> None:
+    """收到其他 worker 的失效通知：与本地失效走同一流程（JSON 中的列表还原为元组）"""
+    _invalidate_local(namespace, None if key is None else _to_tuple(key))
+
+
+def _to_tuple(value: Any) -> Any:
+    return tuple(_to_tuple(item) for item in value) if isinstance(value, list) else value
+
+
+invalidation_bus.subscribe(_INVALIDATION_TOPIC, _apply_invalidation)
 
 
 def get_cache(name: str, maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL) -> Union[TTLCache, LRUCache]:
-    """获取或创建一个命名的缓存实例"""
+    """获取或创建一个命名的进程内缓存实例"""
+    if isinstance(cache_backend, MemoryCacheBackend):
+        return cache_backend.namespace(name, maxsize, ttl)
     if name not in _cache_instances:
         _cache_instances[name] = TTLCache(maxsize=maxsize, ttl=ttl)
     return _cache_instances[name]
 
 
 def clear_cache(name: Optional[str] = None) -> None:
-    """清除指定名称的缓存或所有缓存"""
-    if name is not None and name in _cache_instances:
-        _cache_instances[name].clear()
-    elif name is None:
-        for cache in _cache_instances.values():
-            cache.clear()
+    """清除指定名称的缓存或所有缓存（同时通知其他 worker）"""
+    if name is not None:
+        _invalidate_local(name)
+        _publish_invalidation(cache_backend, name)
+    else:
+        cache_backend.clear()
+        for namespace in set(_cache_instances) | set(_local_invalidators):
+            _invalidate_local(namespace)
+            _publish_invalidation(cache_backend, namespace)
 
 
 def ttl_cache(maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL, 
-              key_prefix: str = "", typed: bool = False, cache_name: str = "default"):
+              key_prefix: str = "", typed: bool = False, cache_name: str = "default",
+              key_func: Optional[Callable[..., Hashable]] = None, backend: Optional[CacheBackend] = None,
+              negative_ttl: Optional[float] = DEFAULT_NEGATIVE_TTL, stale_ttl: Optional[float] = None,
+              refresh_loader: Optional[Callable[[Hashable], Any]] = None):
     """基于TTL的缓存装饰器
     
     Args:
@@ -82,139 +405,80 @@ def ttl_cache(maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL,
         ttl: 缓存条目的生存时间（秒）
         key_prefix: 缓存键的前缀
         typed: 是否区分参数类型
-        cache_name: 缓存实例的名称
+        cache_name: 缓存实例的名称（后端中的命名空间）
+        key_func: 自定义缓存键函数，参数与被装饰函数相同（如排除 self、db 会话）
+        backend: 缓存后端，默认使用全局后端（CACHE_BACKEND）
+        negative_ttl: 返回 None 时的缓存时间（秒），None 或 0 表示不缓存 None
+        stale_ttl: 过期后仍先返回旧数据并在后台刷新的时间（秒），None 表示不启用
+        refresh_loader: 后台刷新使用的加载函数，参数为缓存键；同步函数启用 stale_ttl 时必须提供
     
     Returns:
         装饰器函数
     """
-    cache_instance = get_cache(cache_name, maxsize, ttl)
+    make_key = typedkey if typed else hashkey
     
     def decorator(func: FuncType) -> FuncType:
-        # 定义缓存获取函数
-        def get_from_cache(*args: Any, **kwargs: Any) -> Any:
-            # 生成缓存键
-            if key_prefix:
-                key = hashkey(key_prefix, *args, **kwargs)
-            else:
-                key = hashkey(func.__module__, func.__name__, *args, **kwargs)
-            
-            # 尝试从缓存获取结果
-            try:
-                return cache_instance[key]
-            except KeyError:
-                return None
-        
-        # 定义缓存设置函数
-        def set_to_cache(result: Any, *args: Any, **kwargs: Any) -> None:
-            # 生成缓存键
+        # 定义缓存键生成函数
+        def generate_key(*args: Any, **kwargs: Any) -> Hashable:
+            if key_func is not None:
+                return key_func(*args, **kwargs)
             if key_prefix:
-                key = hashkey(key_prefix, *args, **kwargs)
-            else:
-                key = hashkey(func.__module__, func.__name__, *args, **kwargs)
-            
-            # 设置缓存
-            try:
-                cache_instance[key] = result
-            except ValueError:
-                # 处理不可哈希的结果
-                pass
-        
-        # 使用通用包装器创建函数
-        wrapper = _create_cache_wrapper(func, get_from_cache, set_to_cache)
-        
-        # 添加清除缓存的方法
-        wrapper.clear_cache = lambda: clear_cache(cache_name)  # type: ignore
+                return make_key(key_prefix, *args, **kwargs)
+            return make_key(func.__module__, func.__name__, *args, **kwargs)
         
-        return cast(FuncType, wrapper)
+        return _create_cache_wrapper(func, cache_name, generate_key, ttl, maxsize, backend,
+                                     negative_ttl, stale_ttl, refresh_loader)
     
     return decorator
 
 
-def lru_cache(maxsize: int = DEFAULT_MAXSIZE, typed: bool = False, cache_name: str = "lru_default"):
+def lru_cache(maxsize: int = DEFAULT_MAXSIZE, typed: bool = False, cache_name: str = "lru_default",
+              backend: Optional[CacheBackend] = None, negative_ttl: Optional[float] = DEFAULT_NEGATIVE_TTL):
     """基于LRU的缓存装饰器
     
     Args:
         maxsize: 缓存的最大条目数
         typed: 是否区分参数类型
-        cache_name: 缓存实例的名称
+        cache_name: 缓存实例的名称（后端中的命名空间）
+        backend: 缓存后端，默认使用全局后端（CACHE_BACKEND，Redis 中条目不过期，由 Redis 的淘汰策略回收）
+        negative_ttl: 返回 None 时的缓存时间（秒），None 或 0 表示不缓存 None
     
     Returns:
         装饰器函数
     """
-    if cache_name not in _cache_instances:
-        _cache_instances[cache_name] = LRUCache(maxsize=maxsize)
-    
-    cache_instance = _cache_instances[cache_name]
+    make_key = typedkey if typed else hashkey
     
     def decorator(func: FuncType) -> FuncType:
         # 定义缓存键生成函数
-        def generate_key(*args: Any, **kwargs: Any) -> Any:
-            return hashkey(func.__module__, func.__name__, *args, **kwargs)
-        
-        # 定义缓存获取函数
-        def get_from_cache(*args: Any, **kwargs: Any) -> Any:
-            key = generate_key(*args, **kwargs)
-            try:
-                return cache_instance[key]
-            except KeyError:
-                return None
-        
-        # 定义缓存设置函数
-        def set_to_cache(result: Any, *args: Any, **kwargs: Any) -> None:
-            key = generate_key(*args, **kwargs)
-            try:
-                cache_instance[key] = result
-            except ValueError:
-                # 处理不可哈希的结果
-                pass
-        
-        # 使用通用包装器创建函数
-        wrapper = _create_cache_wrapper(func, get_from_cache, set_to_cache)
+        def generate_key(*args: Any, **kwargs: Any) -> Hashable:
+            return make_key(func.__module__, func.__name__, *args, **kwargs)
         
-        # 添加清除缓存的方法
-        wrapper.clear_cache = lambda: clear_cache(cache_name)  # type: ignore
-        
-        return cast(FuncType, wrapper)
+        return _create_cache_wrapper(func, cache_name, generate_key, None, maxsize, backend, negative_ttl)
     
     return decorator
 
 
-def timed_cache(seconds: int = DEFAULT_TTL):
+def timed_cache(seconds: int = DEFAULT_TTL, maxsize: int = DEFAULT_MAXSIZE,
+                backend: Optional[CacheBackend] = None, negative_ttl: Optional[float] = DEFAULT_NEGATIVE_TTL,
+                stale_ttl: Optional[float] = None, refresh_loader: Optional[Callable[[Hashable], Any]] = None):
     """简单的基于时间的缓存装饰器
     
     Args:
         seconds: 缓存过期时间（秒）
+        maxsize: 缓存的最大条目数
+        backend: 缓存后端，默认使用全局后端（CACHE_BACKEND）
+        negative_ttl: 返回 None 时的缓存时间（秒），None 或 0 表示不缓存 None
+        stale_ttl: 过期后仍先返回旧数据并在后台刷新的时间（秒），None 表示不启用
+        refresh_loader: 后台刷新使用的加载函数，参数为缓存键（参数元组）；同步函数启用 stale_ttl 时必须提供
     
     Returns:
         装饰器函数
     """
     def decorator(func: FuncType) -> FuncType:
-        # 缓存和时间戳
-        cache: Dict[Tuple, Tuple[float, Any]] = {}
-        
-        # 定义缓存获取函数
-        def get_from_cache(*args: Any, **kwargs: Any) -> Any:
-            key = hashkey(*args, **kwargs)
-            
-            # 检查缓存是否存在且未过期
-            if key in cache:
-                timestamp, result = cache[key]
-                if time.time() - timestamp < seconds:
-                    return result
-            return None
-        
-        # 定义缓存设置函数
-        def set_to_cache(result: Any, *args: Any, **kwargs: Any) -> None:
-            key = hashkey(*args, **kwargs)
-            cache[key] = (time.time(), result)
-        
-        # 使用通用包装器创建函数
-        wrapper = _create_cache_wrapper(func, get_from_cache, set_to_cache)
-        
-        # 添加清除缓存的方法
-        wrapper.clear_cache = lambda: cache.clear()  # type: ignore
-        
-        return cast(FuncType, wrapper)
+        # 每个函数一个独立的命名空间
+        cache_name = f"timed:{func.__module__}.{func.__qualname__}"
+        return _create_cache_wrapper(func, cache_name, hashkey, seconds, maxsize, backend,
+                                     negative_ttl, stale_ttl, refresh_loader)
     
     return decorator
 
@@ -6,9 +6,10 @@ from functools import wraps
 from typing import Callable
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.utils.dependencies import get_db, get_current_user
-from app.services.permission_service import PermissionService
+from app.utils.dependencies import get_async_db, get_current_user
+from app.services.permission_service import PermissionService, AsyncPermissionService
 from app.core.logging_uru import logger
 
 
@@ -75,13 +76,19 @@ def require_permission(permission: str):
                     detail="用户信息不完整"
                 )
             
-            # 执行权限校验
-            permission_service = PermissionService(db)
-            allowed, message, expire_time = permission_service.check_permission(
-                user_id=user_id,
-                device_id=device_id,
-                permission=permission
-            )
+            # 执行权限校验（同时支持同步和异步会话）
+            if isinstance(db, AsyncSession):
+                allowed, message, expire_time = await AsyncPermissionService(db).check_permission(
+                    user_id=user_id,
+                    device_id=device_id,
+                    permission=permission
+                )
+            else:
+                allowed, message, expire_time = PermissionService(db).check_permission(
+                    user_id=user_id,
+                    device_id=device_id,
+                    permission=permission
+                )
             
             if not allowed:
                 logger.warning(
@@ -140,7 +147,7 @@ def create_permission_dependency(permission: str):
     """
     async def permission_checker(
         current_user: dict = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
     ) -> None:
         """权限检查函数"""
         user_id = current_user.get("user_id")
@@ -153,8 +160,8 @@ def create_permission_dependency(permission: str):
             )
         
         # 执行权限校验
-        permission_service = PermissionService(db)
-        allowed, message, expire_time = permission_service.check_permission(
+        permission_service = AsyncPermissionService(db)
+        allowed, message, expire_time = await permission_service.check_permission(
             user_id=user_id,
             device_id=device_id,
             permission=permission
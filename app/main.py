@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -7,6 +8,10 @@ from app.core.config import settings
 from app.core.logging import setup_logging
 from app.api.api import api_router
 from app.db.sqlalchemy_db import database
+from app.services.heartbeat_service import device_heartbeat
+from app.services.card_job_service import card_job_worker
+from app.utils.password_hasher import password_hasher
+from app.utils.cache_backend import invalidation_bus
 from fastapi.exceptions import RequestValidationError, HTTPException, ResponseValidationError
 from app.middleware.exception_handlers import (
     request_validation_error_handler, http_exception_handler, response_validation_error_handler,
@@ -19,7 +24,8 @@ from app.core.exceptions import (
     UserException, DeviceException, AppException,
     ValidationException, DatabaseException
 )
-from app.middleware.response_validator import ResponseValidatorMiddleware
+from app.middleware.response_validator import APIJSONResponse, ResponseValidatorMiddleware
+from app.middleware.request_logging import RequestLoggingMiddleware
 from app.schemas.common_data import ApiResponseData, PlatformEnum
 
 # 初始化日志系统（这个是系统日志，操作复杂，设置复杂，所以先舍弃）
@@ -30,11 +36,29 @@ from app.core.logging_uru import setup_logging
 setup_logging()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动设备心跳写回线程、卡密生成任务线程池、密码哈希线程池和缓存失效通知；关闭时停止任务、写回剩余心跳并释放数据库连接池"""
+    device_heartbeat.start()
+    card_job_worker.start(resume=settings.CARD_JOB_RESUME_ON_STARTUP)
+    password_hasher.start()
+    invalidation_bus.start()
+    yield
+    card_job_worker.stop()
+    password_hasher.stop()
+    device_heartbeat.stop()
+    invalidation_bus.stop()
+    await database.close_async()
+    database.close()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     version=settings.PROJECT_VERSION,
-    openapi_url=f"{settings.API_PREFIX}/openapi.json"
+    openapi_url=f"{settings.API_PREFIX}/openapi.json",
+    default_response_class=APIJSONResponse,
+    lifespan=lifespan
 )
 
 # 设置CORS
@@ -66,16 +90,19 @@ app.add_exception_handler(AppException, app_exception_handler)
 app.add_exception_handler(ValidationException, validation_exception_handler)
 app.add_exception_handler(DatabaseException, database_exception_handler)
 
-# 添加响应格式验证中间件
+# 添加响应格式兜底中间件（接口响应在 ApiResponseRoute 中包装，这里只处理未包装的 JSON 响应）
 app.add_middleware(ResponseValidatorMiddleware)
 
+# 添加访问日志中间件（最外层，统计包含其他中间件在内的耗时，并按路径采样请求内的日志）
+app.add_middleware(RequestLoggingMiddleware)
+
 
 # 添加路由
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 # 创建数据库连接池
-print('database.connect()3')
 database.connect()
+database.connect_async()
 
 @app.get("/")
 async def root():
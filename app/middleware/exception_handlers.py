@@ -13,6 +13,7 @@ from app.core.exceptions import (
 import httpx
 from datetime import datetime, timedelta
 from loguru import logger
+from app.middleware.response_validator import APIJSONResponse, build_api_response, mark_api_response
 
 # 创建一个简单的内存锁，用于防止重复调用n8n
 n8n_workflow_lock = {
@@ -36,10 +37,10 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     """
     统一处理HTTP异常，转换为指定格式
     """
-    print('http_exception_handler----exc----', exc)
+    logger.debug("HTTP异常: {} {} -> {} {}", request.method, request.url.path, exc.status_code, exc.detail)
     # 检查是否已包含自定义格式
     if isinstance(exc.detail, dict) and 'platform' in exc.detail and 'ret' in exc.detail:
-        return JSONResponse(
+        return APIJSONResponse(
             status_code=exc.status_code,
             content=exc.detail
         )
@@ -65,18 +66,17 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     }
     # 通过：获取最后一个
     error_msg = exc.detail.split(':')[-1].strip()
-    print('error_msg----', error_msg)
     # 如果error_msg包含invalid session 说明需要调用n8n登录工作流
     if 'invalid session' in error_msg:
         # 检查锁是否已存在
         global n8n_workflow_lock
         # 获取当前时间
         current_time = datetime.now()
-        print('n8n_workflow_lock----', n8n_workflow_lock)
+        logger.debug("n8n工作流锁状态: {}", n8n_workflow_lock)
         # 如果锁存在，但超过最大持续时间，则释放锁
         if (n8n_workflow_lock["is_running"] and n8n_workflow_lock["started_at"] 
             and (current_time - n8n_workflow_lock["started_at"]) > timedelta(seconds=n8n_workflow_lock["max_duration"])):
-            print('n8n_workflow_lock----', '锁存在，但超过最大持续时间，则释放锁')
+            logger.warning("n8n工作流锁超过最大持续时间，释放锁")
             # 释放锁
             n8n_workflow_lock["is_running"] = False
             n8n_workflow_lock["started_at"] = None
@@ -91,21 +91,22 @@ async def http_exception_handler(request: Request, exc: HTTPException):
                 n8n_webhook_url = settings.N8N_WEBHOOK_URL
                 async with httpx.AsyncClient() as client:
                     response = await client.get(n8n_webhook_url)
-                    print('n8n_response----', response)
+                    logger.info("已调用n8n登录工作流: status={}", response.status_code)
             except Exception as e:
-                print(f"调用n8n工作流出错: {e}")
+                logger.error("调用n8n工作流出错: {}", e)
             finally:
                 # 释放锁
                 n8n_workflow_lock["is_running"] = False
                 n8n_workflow_lock["started_at"] = None
-                print('n8n_workflow_lock----', '释放锁')
         else:
             # 工作流正在运行，记录日志
-            print('n8n工作流已在运行，跳过本次调用')
+            logger.debug("n8n工作流已在运行，跳过本次调用")
     
-    return JSONResponse(
+    mark_api_response(request.scope)
+    return APIJSONResponse(
         status_code=exc.status_code,
-        content=response_content
+        content=response_content,
+        headers=getattr(exc, "headers", None)
     ) 
 
 # 自定义请求参数异常处理器
@@ -115,10 +116,8 @@ async def request_validation_error_handler(request: Request, exc: RequestValidat
     统一处理请求参数异常，转换为指定格式
     支持query参数和body参数的异常处理
     """
-    print('request_validation_error_handler----exc----', exc)
     # 提示缺少哪个参数
     missing_fields = exc.errors()
-    print('missing_fields----', missing_fields)
     
     # 处理不同类型的参数错误
     missing_field_names = []
@@ -144,7 +143,7 @@ async def request_validation_error_handler(request: Request, exc: RequestValidat
                 missing_field_names.append(error['loc'][0])
     
     missing_field_names_str = ', '.join(missing_field_names)
-    print('missing_field_names_str----', missing_field_names_str)
+    logger.debug("请求参数错误: {} {} -> {}", request.method, request.url.path, missing_field_names_str)
     
     # 获取请求信息
     request_method = request.method
@@ -157,7 +156,8 @@ async def request_validation_error_handler(request: Request, exc: RequestValidat
 
     platform = next((v for k, v in platform_mapping.items() if k in request_url), PlatformEnum.UNKNOWN)
     
-    return JSONResponse(
+    mark_api_response(request.scope)
+    return APIJSONResponse(
         status_code=422,
         content={
             "platform": platform,
@@ -173,107 +173,18 @@ async def request_validation_error_handler(request: Request, exc: RequestValidat
 async def response_validation_error_handler(request: Request, exc: ResponseValidationError):
     """
     统一处理响应格式验证异常，转换为指定格式
-    1. 检查原始返回是字典还是其他类型
-    2. 如果是字典，对比字典中的字段是否有符合定义要求的，有则覆盖，没有则提取
-    3. 如果不是字典，则把对应的值放到指定格式的data字段中
-    4. 其余字段自动补齐
-    5. 如果原始响应中包含headers字段，则将其设置为响应头
-    """
-    # print('response_validation_error_handler----exc----response----', request.headers)
-    # print('response_validation_error_handler----exc----', exc)
-    # 获取请求信息
-    request_method = request.method
-    request_url = request.url.path
-    original_response = exc.body
-    
-    # 根据路径判断平台
-    # platform = PlatformEnum.WX_PUBLIC if "wx/public" in request_url else "unknown"
-    platform = next((v for k, v in platform_mapping.items() if k in request_url), PlatformEnum.UNKNOWN)
-    
-    # 初始化标准响应格式
-    formatted_response = {
-        "platform": platform,
-        "api": request_url.strip("/"),
-        "ret": ["SUCCESS::请求成功"],
-        "v": settings.VERSION
-    }
     
-    # 初始化headers变量，用于存储需要设置的响应头
-    response_headers = {}
-    
-    # 检查原始响应是否为字典类型
-    if isinstance(original_response, dict):
-        # 检查是否包含headers字段
-        if "headers" in original_response:
-            # 提取headers字段
-            response_headers = original_response["headers"]
-            # 从原始响应中移除headers字段
-            original_response = {k: v for k, v in original_response.items() if k != "headers" and k != "cookie_str" and k != "token" and k != "cookies"}
-        
-        # 检查字典中是否包含符合ApiResponseData模型要求的字段
-        required_fields = ["platform", "api", "data", "ret", "v"]
-        existing_fields = {}
-        
-        for field in required_fields:
-            if field in original_response:
-                # 如果原始响应中包含该字段，则保留
-                existing_fields[field] = original_response[field]
-        
-        # 如果原始响应中包含所有必要字段，则直接使用原始响应中的data字段
-        if "data" in existing_fields:
-            data_content = {k: v for k, v in original_response.items() if k not in existing_fields}
-            # 判断data_content字典是否为空
-            if len(data_content) < 1:
-                formatted_response["data"] = existing_fields["data"]
-            else:
-                formatted_response["data"] = {
-                    "data": existing_fields["data"],
-                    **data_content
-                }
-        else:
-            # 否则，将整个原始响应作为data字段的值
-            # 移除已经存在于formatted_response中的字段，避免重复
-            data_content = {k: v for k, v in original_response.items() if k not in existing_fields}
-            formatted_response["data"] = data_content
-        
-        # 使用原始响应中的其他字段覆盖formatted_response中的对应字段
-        for field, value in existing_fields.items():
-            if field != "data":  # data字段已经单独处理
-                formatted_response[field] = value
-    else:
-        # 如果原始响应不是字典类型，直接将其放入data字段
-        formatted_response["data"] = original_response
-    
-    # 创建响应对象
-    response = JSONResponse(
-        status_code=200,  # 使用200状态码，因为这是一个有效的响应
-        content=formatted_response
-    )
-    
-    # 设置响应头
-    if response_headers:
-        for key, value in response_headers.items():
-            if key == 'Set-Cookie' or key == 'set-cookie':
-                cookie_list = []
-                if isinstance(value, str):
-                    cookie_list = value.split(';')
-                elif isinstance(value, list):
-                    cookie_list = value
-                # 设置多个cookie
-                for cookieValue in cookie_list:
-                    # 去除左右两边空格
-                    cookieValue = cookieValue.strip()
-                    response.headers.append("Set-Cookie", cookieValue)
-            else:
-                response.headers[key] = value
-    return response
+    使用 ApiResponseRoute 的路由在路由层完成包装，不会走到这里；
+    其余声明 response_model=ApiResponseData 的路由返回业务数据时由这里包装（规则见 format_api_response）
+    """
+    return build_api_response(request, exc.body)
 
 
 # 业务异常处理器
 async def auth_exception_handler(request: Request, exc: AuthException):
     """认证异常处理器"""
     logger.warning(f"认证异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_401_UNAUTHORIZED,
         content={
             "success": False,
@@ -286,7 +197,7 @@ async def auth_exception_handler(request: Request, exc: AuthException):
 async def card_exception_handler(request: Request, exc: CardException):
     """卡密异常处理器"""
     logger.warning(f"卡密异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={
             "success": False,
@@ -299,7 +210,7 @@ async def card_exception_handler(request: Request, exc: CardException):
 async def permission_exception_handler(request: Request, exc: PermissionException):
     """权限异常处理器"""
     logger.warning(f"权限异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_403_FORBIDDEN,
         content={
             "success": False,
@@ -312,7 +223,7 @@ async def permission_exception_handler(request: Request, exc: PermissionExceptio
 async def user_exception_handler(request: Request, exc: UserException):
     """用户异常处理器"""
     logger.warning(f"用户异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={
             "success": False,
@@ -325,7 +236,7 @@ async def user_exception_handler(request: Request, exc: UserException):
 async def device_exception_handler(request: Request, exc: DeviceException):
     """设备异常处理器"""
     logger.warning(f"设备异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={
             "success": False,
@@ -338,7 +249,7 @@ async def device_exception_handler(request: Request, exc: DeviceException):
 async def app_exception_handler(request: Request, exc: AppException):
     """应用异常处理器"""
     logger.warning(f"应用异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={
             "success": False,
@@ -351,7 +262,7 @@ async def app_exception_handler(request: Request, exc: AppException):
 async def validation_exception_handler(request: Request, exc: ValidationException):
     """数据验证异常处理器"""
     logger.warning(f"数据验证异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "success": False,
@@ -364,7 +275,7 @@ async def validation_exception_handler(request: Request, exc: ValidationExceptio
 async def database_exception_handler(request: Request, exc: DatabaseException):
     """数据库异常处理器"""
     logger.error(f"数据库异常: {exc.message} - 路径: {request.url.path}")
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "success": False,
@@ -0,0 +1,64 @@
+import time
+
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging_uru import is_request_sampled, reset_request_sampling, sample_request
+
+
+class RequestLoggingMiddleware:
+    """
+    请求访问日志中间件（纯 ASGI）
+
+    每个请求开始时按路径采样率决定是否采样（LOG_ROUTE_SAMPLE_RATES / LOG_SAMPLE_RATE），
+    采样结果对整个请求内的 INFO 及以下日志生效；请求结束后输出一条结构化访问日志
+    （method、path、status、duration_ms、client 作为 extra 字段，LOG_JSON=True 时为 JSON 字段）。
+    5xx 和慢请求（LOG_SLOW_REQUEST_MS）不受采样影响，以 WARNING 级别始终记录
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = sample_request(scope["path"])
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - started_at) * 1000
+            try:
+                _log_request(scope, status_code, duration_ms)
+            finally:
+                reset_request_sampling(token)
+
+
+def _log_request(scope: Scope, status_code: int, duration_ms: float) -> None:
+    """输出访问日志：采样的请求记为 INFO，5xx 和慢请求记为 WARNING"""
+    abnormal = status_code >= 500 or duration_ms >= settings.LOG_SLOW_REQUEST_MS
+    if not abnormal and not is_request_sampled():
+        return
+    client = scope.get("client")
+    logger.bind(
+        method=scope["method"],
+        path=scope["path"],
+        status=status_code,
+        duration_ms=round(duration_ms, 2),
+        client=client[0] if client else None,
+    ).log(
+        "WARNING" if abnormal else "INFO",
+        "{} {} {} {:.1f}ms",
+        scope["method"], scope["path"], status_code, duration_ms
+    )
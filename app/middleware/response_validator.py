@@ -1,16 +1,24 @@
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse, StreamingResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp, Receive, Scope, Send
+import functools
+import inspect
 import json
-from typing import Any, Dict, Union, List, Callable, Awaitable
-from pydantic import ValidationError
-import logging
-from fastapi.exceptions import ResponseValidationError
+import re
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.schemas.common_data import ApiResponseData, PlatformEnum
 from app.core.config import settings
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
 platform_mapping = {
     "wx/public": PlatformEnum.WX_PUBLIC,
     "license": PlatformEnum.LICENSE,
@@ -22,147 +30,264 @@ platform_mapping = {
     "admin": PlatformEnum.LICENSE,
     "admin/feature-permissions": PlatformEnum.LICENSE,
 }
-class ResponseValidatorMiddleware(BaseHTTPMiddleware):
+
+# 流式响应的接口路径：不经过响应格式验证，避免整个响应体被缓冲到内存
+STREAMING_PATH_PATTERNS = (
+    re.compile(rf"^{settings.API_PREFIX}/admin/card/export$"),
+    re.compile(rf"^{settings.API_PREFIX}/admin/card/jobs/\d+/download$"),
+)
+
+# scope["state"] 中的标记：响应已是 ApiResponseData 格式，中间件直接透传
+API_RESPONSE_STATE_KEY = "api_response_formatted"
+
+# 原始返回值中不放入 data 的字段
+_EXCLUDED_CONTENT_FIELDS = ("headers", "cookie_str", "token", "cookies")
+_ENVELOPE_FIELDS = ("platform", "api", "data", "ret", "v")
+
+
+class ORJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应（输出 UTF-8，不转义中文，与 JSONResponse 的 ensure_ascii=False 一致）"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# 接口响应、统一异常处理器和应用默认使用的 JSON 响应类
+APIJSONResponse = ORJSONResponse if orjson is not None and settings.JSON_RESPONSE_ORJSON else JSONResponse
+
+
+def is_streaming_path(path: str) -> bool:
+    """判断请求路径是否为流式响应接口"""
+    return any(pattern.match(path) for pattern in STREAMING_PATH_PATTERNS)
+
+
+def get_platform(path: str) -> PlatformEnum:
+    """根据请求路径判断平台"""
+    return next((v for k, v in platform_mapping.items() if k in path), PlatformEnum.UNKNOWN)
+
+
+def mark_api_response(scope: Scope) -> None:
+    """标记本次请求的响应已是 ApiResponseData 格式（路由和统一异常处理器调用）"""
+    scope.setdefault("state", {})[API_RESPONSE_STATE_KEY] = True
+
+
+def format_api_response(path: str, original_response: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    把接口的原始返回值包装为 ApiResponseData 格式
+    1. 检查原始返回是字典还是其他类型
+    2. 如果是字典，对比字典中的字段是否有符合定义要求的，有则覆盖，没有则提取
+    3. 如果不是字典，则把对应的值放到指定格式的data字段中
+    4. 其余字段自动补齐
+    5. 如果原始响应中包含headers字段，则作为响应头返回
+    6. 如果是 Pydantic 模型，按 model_dump(mode='json', exclude_none=True) 转为字典，不再校验
+
+    Args:
+        path: 请求路径
+        original_response: 接口的原始返回值
+
+    Returns:
+        (ApiResponseData 格式的响应内容, 需要设置的响应头)
+    """
+    formatted_response = {
+        "platform": get_platform(path),
+        "api": path.strip("/"),
+        "ret": ["SUCCESS::请求成功"],
+        "v": settings.VERSION
+    }
+    response_headers = {}
+
+    if isinstance(original_response, BaseModel):
+        original_response = original_response.model_dump(mode='json', exclude_none=True)
+
+    if not isinstance(original_response, dict):
+        formatted_response["data"] = original_response
+        return formatted_response, response_headers
+
+    if "headers" in original_response:
+        response_headers = original_response["headers"]
+        original_response = {k: v for k, v in original_response.items() if k not in _EXCLUDED_CONTENT_FIELDS}
+
+    # 原始返回值中已有的 ApiResponseData 字段保留，其余字段放入 data
+    existing_fields = {field: original_response[field] for field in _ENVELOPE_FIELDS if field in original_response}
+    data_content = {k: v for k, v in original_response.items() if k not in existing_fields}
+    if "data" in existing_fields:
+        formatted_response["data"] = existing_fields["data"] if not data_content else {
+            "data": existing_fields["data"],
+            **data_content
+        }
+    else:
+        formatted_response["data"] = data_content
+
+    for field, value in existing_fields.items():
+        if field != "data":
+            formatted_response[field] = value
+    return formatted_response, response_headers
+
+
+def build_api_response(
+    request: Request,
+    original_response: Any,
+    status_code: int = 200,
+    background: Optional[BackgroundTask] = None
+) -> Response:
+    """
+    构建 ApiResponseData 格式的 JSON 响应（含原始返回值中的自定义响应头和 Cookie）
+
+    Args:
+        request: 请求对象
+        original_response: 接口的原始返回值
+        status_code: 响应状态码
+        background: 后台任务
+
+    Returns:
+        JSON 响应
     """
-    响应格式验证中间件
-    验证所有API响应是否符合ApiResponseData格式
-    如果不符合则返回错误信息和正确的格式示例
+    formatted_response, response_headers = format_api_response(request.url.path, original_response)
+    response = APIJSONResponse(status_code=status_code, content=formatted_response, background=background)
+
+    for key, value in response_headers.items():
+        if key == 'Set-Cookie' or key == 'set-cookie':
+            cookie_list = value.split(';') if isinstance(value, str) else (value if isinstance(value, list) else [])
+            # 设置多个cookie
+            for cookie_value in cookie_list:
+                response.headers.append("Set-Cookie", cookie_value.strip())
+        else:
+            response.headers[key] = value
+
+    mark_api_response(request.scope)
+    return response
+
+
+class _UnrenderedResponse(JSONResponse):
+    """接口返回值的占位响应：保存原始返回值不做序列化，由 ApiResponseRoute 包装成 ApiResponseData 后渲染一次"""
+
+    def __init__(self, content: Any) -> None:
+        self.content = content
+        self.status_code = 200
+        self.background = None
+        self.init_headers()
+
+
+def _defer_rendering(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """包装接口函数：返回值放入 _UnrenderedResponse，FastAPI 不再对其校验和 jsonable_encoder 序列化"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = await endpoint(*args, **kwargs)
+            return result if isinstance(result, Response) else _UnrenderedResponse(result)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        result = endpoint(*args, **kwargs)
+        return result if isinstance(result, Response) else _UnrenderedResponse(result)
+    return wrapper
+
+
+class ApiResponseRoute(APIRoute):
+    """
+    在路由层包装响应格式的 APIRoute
+
+    声明 response_model=ApiResponseData 的接口不再让 FastAPI 按 ApiResponseData 校验返回值
+    （接口返回的业务数据必然校验失败，再经 ResponseValidationError 异常处理器包装），
+    而是把返回值直接包装成 ApiResponseData 格式渲染一次，并标记给 ResponseValidatorMiddleware 透传。
+    OpenAPI 文档中的响应模型保持为 ApiResponseData；接口自己返回 Response（如流式下载）时原样返回
+
+    用法:
+        router = APIRouter(route_class=ApiResponseRoute)
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        self.wraps_api_response = kwargs.get("response_model") is ApiResponseData
+        if self.wraps_api_response:
+            endpoint = _defer_rendering(endpoint)
+            kwargs["response_model"] = None
+            kwargs["responses"] = {200: {"model": ApiResponseData}, **(kwargs.get("responses") or {})}
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        if not self.wraps_api_response:
+            return handler
+
+        async def api_response_handler(request: Request) -> Response:
+            response = await handler(request)
+            if not isinstance(response, _UnrenderedResponse):
+                return response
+            return build_api_response(request, response.content, background=response.background)
+
+        return api_response_handler
+
+
+class ResponseValidatorMiddleware:
     """
-    
+    响应格式兜底中间件（纯 ASGI）
+
+    ApiResponseRoute 路由和统一异常处理器生成的响应已是 ApiResponseData 格式并在 scope 中标记，
+    这里直接透传，不缓冲也不解析响应体；流式接口和非 JSON 响应同样原样透传。
+    只有未标记的 /api/ JSON 响应（如未匹配路由的 404、业务异常处理器的返回）才会被缓冲、
+    校验，不符合格式时包装为 ApiResponseData
+    """
+
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next):
-        # 只验证API路径的响应
-        if not request.url.path.startswith("/api/"):
-            return await call_next(request)
-        
-        # 创建一个自定义的发送函数来拦截响应
-        original_response = None
-        response_body = []
-        send_called = False
-        print('ResponseValidatorMiddleware')
-        
-        async def send_wrapper(message):
-            nonlocal original_response, response_body, send_called
-            print('send_wrapper----message----', message)
-            
-            if message["type"] == "http.response.start":
-                # 保存原始响应的状态码和头信息
-                original_response = {
-                    "status": message["status"],
-                    "headers": message.get("headers", [])
-                }
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or is_streaming_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+        body: List[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                if scope.get("state", {}).get(API_RESPONSE_STATE_KEY) or not _is_json(message.get("headers", [])):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
             elif message["type"] == "http.response.body":
-                # 收集响应体
-                response_body.append(message.get("body", b""))
-                
-                # 如果这是最后一个块，处理完整的响应
-                if not message.get("more_body", False) and not send_called:
-                    send_called = True
-                    
-                    # 检查是否是JSON响应
-                    is_json = False
-                    for header in original_response["headers"]:
-                        if header[0] == b"content-type" and b"application/json" in header[1]:
-                            is_json = True
-                            break
-                    
-                    if not is_json:
-                        # 如果不是JSON响应，直接返回原始响应
-                        await request.send({
-                            "type": "http.response.start",
-                            "status": original_response["status"],
-                            "headers": original_response["headers"]
-                        })
-                        for chunk in response_body:
-                            await request.send({
-                                "type": "http.response.body",
-                                "body": chunk,
-                                "more_body": False
-                            })
-                        return
-                    
-                    # 合并响应体并解析JSON
-                    full_body = b"".join(response_body)
-                    try:
-                        response_data = json.loads(full_body)
-                    except json.JSONDecodeError:
-                        # 如果不是有效的JSON，直接返回原始响应
-                        await request.send({
-                            "type": "http.response.start",
-                            "status": original_response["status"],
-                            "headers": original_response["headers"]
-                        })
-                        await request.send({
-                            "type": "http.response.body",
-                            "body": full_body,
-                            "more_body": False
-                        })
-                        return
-                    
-                    # 验证响应格式
-                    try:
-                        # 尝试使用ApiResponseData模型验证响应数据
-                        ApiResponseData(**response_data)
-                        # 如果验证通过，返回原始响应
-                        await request.send({
-                            "type": "http.response.start",
-                            "status": original_response["status"],
-                            "headers": original_response["headers"]
-                        })
-                        await request.send({
-                            "type": "http.response.body",
-                            "body": full_body,
-                            "more_body": False
-                        })
-                    except ValidationError:
-                        # 获取路径信息并确定平台
-                        path = request.url.path
-                        print('path-----', path)
-                        platform = next((v for k, v in platform_mapping.items() if k in path), PlatformEnum.UNKNOWN)
-                        
-                        # 将原始响应数据包装到ApiResponseData格式中
-                        formatted_response = {
-                            "platform": platform,
-                            "api": path.strip("/"),
-                            "data": response_data,  # 将原始响应放入data字段
-                            "ret": ["SUCCESS"],
-                            "v": settings.VERSION
-                        }
-                        print('formatted_response-----', formatted_response)
-                        # 返回格式化后的响应
-                        formatted_body = json.dumps(formatted_response).encode("utf-8")
-
-                        # 保留原始响应头中的自定义头信息
-                        headers = [
-                            (b"content-type", b"application/json"),
-                            (b"content-length", str(len(formatted_body)).encode())
-                        ]
-
-                        # 添加原始响应头中的自定义头信息（排除content-type和content-length）
-                        for header in original_response["headers"]:
-                            if header[0] != b"content-type" and header[0] != b"content-length":
-                                headers.append(header)
-                                
-                        await request.send({
-                            "type": "http.response.start",
-                            "status": original_response["status"],  # 保持原始状态码
-                            "headers": [
-                                (b"content-type", b"application/json"),
-                                (b"content-length", str(len(formatted_body)).encode())
-                            ]
-                        })
-                        await request.send({
-                            "type": "http.response.body",
-                            "body": formatted_body,
-                            "more_body": False
-                        })
-            
-            # 将消息传递给原始的发送函数
-            if not send_called:
-                await request.send(message)
-        print('send_wrapper')
-        # 使用自定义的发送函数调用下一个中间件
-        request.send = send_wrapper
-        return await call_next(request)
\ No newline at end of file
+                body.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await _send_formatted(scope, start_message, b"".join(body), send)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _is_json(headers: List[Tuple[bytes, bytes]]) -> bool:
+    return any(key == b"content-type" and b"application/json" in value for key, value in headers)
+
+
+async def _send_formatted(scope: Scope, start_message: Message, body: bytes, send: Send) -> None:
+    """校验未标记的 JSON 响应，不符合 ApiResponseData 格式时包装后发送"""
+    headers = start_message.get("headers", [])
+    try:
+        response_data = json.loads(body)
+        ApiResponseData.model_validate(response_data)
+    except json.JSONDecodeError:
+        # 不是有效的JSON，原样返回
+        pass
+    except ValidationError:
+        path = scope["path"]
+        body = json.dumps({
+            "platform": get_platform(path),
+            "api": path.strip("/"),
+            "data": response_data,
+            "ret": ["SUCCESS"],
+            "v": settings.VERSION
+        }, ensure_ascii=False).encode("utf-8")
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *[header for header in headers if header[0] not in (b"content-type", b"content-length")]
+        ]
+
+    await send({"type": "http.response.start", "status": start_message["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": body, "more_body": False})
@@ -1,9 +1,12 @@
 from app.models.article import Article
 from app.models.app import App, AppStatus
+from app.models.app_stats import AppStats
 from app.models.user import User, UserStatus, UserRole
 from app.models.card import Card, CardStatus
 from app.models.user_card import UserCard, UserCardStatus
 from app.models.card_device import CardDevice, CardDeviceStatus
+from app.models.card_permission import CardPermission
+from app.models.card_job import CardGenerateJob, CardJobStatus
 from app.models.user_token import UserToken
 from app.models.feature_permission import FeaturePermission, FeaturePermissionStatus
 
@@ -11,6 +14,7 @@ __all__ = [
     "Article",
     "App",
     "AppStatus",
+    "AppStats",
     "User",
     "UserStatus",
     "UserRole",
@@ -20,6 +24,9 @@ __all__ = [
     "UserCardStatus",
     "CardDevice",
     "CardDeviceStatus",
+    "CardPermission",
+    "CardGenerateJob",
+    "CardJobStatus",
     "UserToken",
     "FeaturePermission",
     "FeaturePermissionStatus",
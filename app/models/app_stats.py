@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.db.sqlalchemy_db import Base
+
+
+class AppStats(Base):
+    """应用统计汇总表模型
+
+    每个应用一行计数器，由卡密生成、绑定、解绑、状态修改和批量删除在同一事务中增量更新，
+    管理后台按应用展示统计时不再扫描 cards / card_devices；
+    计数出现偏差时用 manage_db.py reconcile-app-stats 重新统计
+    """
+    __tablename__ = "app_stats"
+
+    app_id = Column(Integer, ForeignKey("apps.id"), primary_key=True, comment="应用ID")
+    cards_unused = Column(Integer, default=0, nullable=False, comment="未使用卡密数")
+    cards_used = Column(Integer, default=0, nullable=False, comment="已使用卡密数")
+    cards_disabled = Column(Integer, default=0, nullable=False, comment="禁用卡密数")
+    active_bindings = Column(Integer, default=0, nullable=False, comment="激活的用户-卡密绑定数")
+    active_devices = Column(Integer, default=0, nullable=False, comment="激活的设备绑定数")
+    registered_users = Column(Integer, default=0, nullable=False, comment="绑定了该应用卡密的用户数")
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<AppStats(app_id={self.app_id}, cards_unused={self.cards_unused}, cards_used={self.cards_used})>"
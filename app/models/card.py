@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Text, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -30,13 +30,21 @@ class Card(Base):
     max_device_count = Column(Integer, default=1, nullable=False, comment="最大可绑定设备数")
     permissions = Column(JSON, nullable=True, comment="权限配置 JSON")
     remark = Column(String(255), nullable=True, comment="备注（套餐名称等）")
+    job_id = Column(Integer, ForeignKey("card_generate_jobs.id"), nullable=True, index=True, comment="生成任务ID（后台任务生成的卡密）")
     created_at = Column(DateTime, default=func.now(), nullable=False, comment="创建时间")
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
 
     # 关系映射
     app = relationship("App", back_populates="cards")
+    job = relationship("CardGenerateJob", back_populates="cards")
     user_cards = relationship("UserCard", back_populates="card", lazy="dynamic")
     card_devices = relationship("CardDevice", back_populates="card", lazy="dynamic")
+    card_permissions = relationship("CardPermission", back_populates="card", lazy="dynamic")
+
+    # 管理后台游标分页：按 (created_at, id) 倒序定位
+    __table_args__ = (
+        Index('idx_card_created_at_id', 'created_at', 'id'),
+    )
 
     def __repr__(self):
         return f"<Card(id={self.id}, card_key='{self.card_key}', status='{self.status}')>"
@@ -37,6 +37,8 @@ class CardDevice(Base):
     # 唯一索引：一个卡密不能重复绑定同一设备
     __table_args__ = (
         Index('idx_card_device', 'card_id', 'device_id', unique=True),
+        # 管理后台游标分页：按 (bind_time, id) 倒序定位
+        Index('idx_card_device_bind_time_id', 'bind_time', 'id'),
     )
 
     def __repr__(self):
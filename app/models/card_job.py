@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Text, JSON
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+import enum
+
+from app.db.sqlalchemy_db import Base
+
+
+class CardJobStatus(str, enum.Enum):
+    """卡密生成任务状态枚举"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class CardGenerateJob(Base):
+    """卡密生成任务表模型
+
+    后台分块生成卡密，generated 与每个分块的卡密在同一事务中提交，
+    服务重启后可以从 generated 处继续生成。执行进程通过条件 UPDATE 领取任务（owner + heartbeat_at 租约），
+    同一时间只有一个进程生成
+    """
+    __tablename__ = "card_generate_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, comment="任务ID")
+    app_id = Column(Integer, ForeignKey("apps.id"), nullable=False, index=True, comment="所属应用ID")
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True, comment="创建任务的管理员ID")
+    count = Column(Integer, nullable=False, comment="计划生成数量")
+    generated = Column(Integer, default=0, nullable=False, comment="已生成数量")
+    status = Column(
+        SQLEnum(CardJobStatus),
+        default=CardJobStatus.PENDING,
+        nullable=False,
+        index=True,
+        comment="任务状态: pending-等待中, running-生成中, completed-已完成, failed-失败"
+    )
+    expire_time = Column(DateTime, nullable=False, comment="卡密过期时间")
+    max_device_count = Column(Integer, default=1, nullable=False, comment="最大可绑定设备数")
+    permissions = Column(JSON, nullable=True, comment="权限配置 JSON")
+    remark = Column(String(255), nullable=True, comment="备注（套餐名称等）")
+    error = Column(Text, nullable=True, comment="失败原因")
+    owner = Column(String(64), nullable=True, comment="执行任务的进程标识")
+    heartbeat_at = Column(DateTime, nullable=True, comment="执行进程最近一次心跳时间，超过租约时间视为进程已退出")
+    started_at = Column(DateTime, nullable=True, comment="开始时间")
+    finished_at = Column(DateTime, nullable=True, comment="结束时间")
+    created_at = Column(DateTime, default=func.now(), nullable=False, comment="创建时间")
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
+
+    # 关系映射
+    cards = relationship("Card", back_populates="job", lazy="dynamic")
+
+    def __repr__(self):
+        return f"<CardGenerateJob(id={self.id}, status='{self.status}', generated={self.generated}/{self.count})>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship
+
+from app.db.sqlalchemy_db import Base
+
+
+class CardPermission(Base):
+    """卡密-权限关联表模型
+
+    由 Card.permissions 展开得到，每个授予的权限标识一行，
+    用于按权限标识反查卡密、以及权限校验时的索引查询
+    """
+    __tablename__ = "card_permissions"
+
+    id = Column(Integer, primary_key=True, index=True, comment="关联ID")
+    card_id = Column(Integer, ForeignKey("cards.id"), nullable=False, comment="卡密ID")
+    permission_key = Column(String(100), nullable=False, index=True, comment="权限标识")
+
+    # 关系映射
+    card = relationship("Card", back_populates="card_permissions")
+
+    # 唯一索引：同一卡密的权限标识不重复，同时覆盖按卡密查询
+    __table_args__ = (
+        Index('idx_card_permission', 'card_id', 'permission_key', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<CardPermission(card_id={self.card_id}, permission_key='{self.permission_key}')>"
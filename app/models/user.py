@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -45,5 +45,10 @@ class User(Base):
     user_cards = relationship("UserCard", back_populates="user", lazy="dynamic")
     user_tokens = relationship("UserToken", back_populates="user", lazy="dynamic")
 
+    # 管理后台游标分页：按 (created_at, id) 倒序定位
+    __table_args__ = (
+        Index('idx_user_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', status='{self.status}')>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List, Union, Dict
+from typing import Optional, List, Union, Dict, Any
 from datetime import datetime
 
 
@@ -28,6 +28,44 @@ class CardGenerateResponse(BaseModel):
     cards: List[str] = Field(..., description="卡密列表")
 
 
+class CardGenerateJobRequest(CardGenerateRequest):
+    """创建卡密生成任务请求（后台分块生成，支持更大数量）"""
+    count: int = Field(..., ge=1, le=1000000, description="生成数量，1-1000000")
+
+
+class CardGenerateJobInfo(BaseModel):
+    """卡密生成任务信息"""
+    id: int = Field(..., description="任务ID")
+    app_id: int = Field(..., description="应用ID")
+    count: int = Field(..., description="计划生成数量")
+    generated: int = Field(..., description="已生成数量")
+    progress: float = Field(..., description="进度百分比")
+    status: str = Field(..., description="任务状态: pending, running, completed, failed")
+    expire_time: Optional[datetime] = Field(None, description="卡密过期时间")
+    max_device_count: int = Field(..., description="最大设备数")
+    permissions: Union[List[str], Dict, None] = Field(None, description="权限配置")
+    remark: Optional[str] = Field(None, description="备注")
+    error: Optional[str] = Field(None, description="失败原因")
+    started_at: Optional[datetime] = Field(None, description="开始时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+    created_at: Optional[datetime] = Field(None, description="创建时间")
+
+
+class CardGenerateJobResponse(BaseModel):
+    """卡密生成任务响应"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(..., description="提示信息")
+    job: CardGenerateJobInfo = Field(..., description="任务信息")
+
+
+class CardGenerateJobListResponse(BaseModel):
+    """卡密生成任务列表响应"""
+    total: int = Field(..., description="总数")
+    page: int = Field(..., description="当前页")
+    size: int = Field(..., description="每页数量")
+    jobs: List[CardGenerateJobInfo] = Field(..., description="任务列表")
+
+
 class AdminCardListRequest(BaseModel):
     """管理员查询卡密列表请求"""
     app_id: Optional[int] = Field(None, description="应用ID筛选")
@@ -54,9 +92,10 @@ class AdminCardInfo(BaseModel):
 
 class AdminCardListResponse(BaseModel):
     """管理员卡密列表响应"""
-    total: int = Field(..., description="总数")
-    page: int = Field(..., description="当前页")
+    total: Optional[int] = Field(None, description="总数（游标分页且未请求总数时不返回）")
+    page: Optional[int] = Field(None, description="当前页（仅页码分页）")
     size: int = Field(..., description="每页数量")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（仅游标分页，没有下一页时不返回）")
     cards: List[AdminCardInfo] = Field(..., description="卡密列表")
 
 
@@ -76,6 +115,25 @@ class UpdateCardResponse(BaseModel):
     message: str = Field(..., description="提示信息")
 
 
+class BulkUpdateCardStatusRequest(BaseModel):
+    """批量更新卡密状态请求（card_ids 与筛选条件至少提供一项，同时提供时取交集）"""
+    status: str = Field(..., pattern="^(unused|used|disabled)$", description="目标状态: unused-未使用, used-已使用, disabled-禁用")
+    card_ids: Optional[List[int]] = Field(None, description="卡密ID列表")
+    app_id: Optional[int] = Field(None, description="应用ID筛选")
+    job_id: Optional[int] = Field(None, description="生成任务ID筛选")
+    remark: Optional[str] = Field(None, description="备注筛选（完全匹配）")
+    current_status: Optional[str] = Field(None, pattern="^(unused|used|disabled)$", description="当前状态筛选")
+    created_from: Optional[datetime] = Field(None, description="创建时间起（含）")
+    created_to: Optional[datetime] = Field(None, description="创建时间止（含）")
+
+
+class BulkUpdateStatusResponse(BaseModel):
+    """批量更新状态响应"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(..., description="提示信息")
+    affected_count: int = Field(..., description="实际更新的数量（状态已是目标值的不计入）")
+
+
 class AdminDeviceListRequest(BaseModel):
     """管理员查询设备列表请求"""
     card_id: Optional[int] = Field(None, description="卡密ID筛选")
@@ -98,9 +156,10 @@ class AdminDeviceInfo(BaseModel):
 
 class AdminDeviceListResponse(BaseModel):
     """管理员设备列表响应"""
-    total: int = Field(..., description="总数")
-    page: int = Field(..., description="当前页")
+    total: Optional[int] = Field(None, description="总数（游标分页且未请求总数时不返回）")
+    page: Optional[int] = Field(None, description="当前页（仅页码分页）")
     size: int = Field(..., description="每页数量")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（仅游标分页，没有下一页时不返回）")
     devices: List[AdminDeviceInfo] = Field(..., description="设备列表")
 
 
@@ -109,6 +168,16 @@ class UpdateDeviceStatusRequest(BaseModel):
     status: str = Field(..., description="设备状态: active-激活, disabled-禁用")
 
 
+class BulkUpdateDeviceStatusRequest(BaseModel):
+    """批量更新设备状态请求（device_ids 与筛选条件至少提供一项，同时提供时取交集）"""
+    status: str = Field(..., pattern="^(active|disabled)$", description="目标状态: active-激活, disabled-禁用")
+    device_ids: Optional[List[int]] = Field(None, description="设备绑定ID列表")
+    card_id: Optional[int] = Field(None, description="卡密ID筛选")
+    app_id: Optional[int] = Field(None, description="应用ID筛选")
+    bind_from: Optional[datetime] = Field(None, description="绑定时间起（含）")
+    bind_to: Optional[datetime] = Field(None, description="绑定时间止（含）")
+
+
 class UpdateDeviceStatusResponse(BaseModel):
     """更新设备状态响应"""
     success: bool = Field(..., description="是否成功")
@@ -128,17 +197,86 @@ class AdminUserInfo(BaseModel):
 
 class AdminUserListResponse(BaseModel):
     """管理员用户列表响应"""
-    total: int = Field(..., description="总数")
-    page: int = Field(..., description="当前页")
+    total: Optional[int] = Field(None, description="总数（游标分页且未请求总数时不返回）")
+    page: Optional[int] = Field(None, description="当前页（仅页码分页）")
     size: int = Field(..., description="每页数量")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（仅游标分页，没有下一页时不返回）")
     users: List[AdminUserInfo] = Field(..., description="用户列表")
 
 
+class BulkUpdateUserStatusRequest(BaseModel):
+    """批量更新用户状态请求（user_ids 与筛选条件至少提供一项，同时提供时取交集；管理员账户不会被修改）"""
+    status: str = Field(..., pattern="^(normal|banned)$", description="目标状态: normal-正常, banned-封禁")
+    user_ids: Optional[List[int]] = Field(None, description="用户ID列表")
+    app_id: Optional[int] = Field(None, description="应用ID筛选（绑定了该应用卡密的用户）")
+    created_from: Optional[datetime] = Field(None, description="注册时间起（含）")
+    created_to: Optional[datetime] = Field(None, description="注册时间止（含）")
+
+
+class UserStatistics(BaseModel):
+    """用户统计"""
+    total: int = Field(..., description="用户总数")
+    normal: int = Field(..., description="正常用户数")
+    banned: int = Field(..., description="封禁用户数")
+
+
+class CardStatistics(BaseModel):
+    """卡密统计"""
+    total: int = Field(..., description="卡密总数")
+    unused: int = Field(..., description="未使用卡密数")
+    used: int = Field(..., description="已使用卡密数")
+    disabled: int = Field(..., description="禁用卡密数")
+
+
+class DeviceStatistics(BaseModel):
+    """设备统计"""
+    total: int = Field(..., description="设备总数")
+    active: int = Field(..., description="活跃设备数")
+    disabled: int = Field(..., description="禁用设备数")
+
+
+class AppStatistics(BaseModel):
+    """应用统计"""
+    total: int = Field(..., description="应用总数")
+    active: int = Field(..., description="正常应用数")
+
+
 class StatisticsResponse(BaseModel):
     """统计数据响应"""
-    user_count: int = Field(..., description="用户总数")
-    card_count: int = Field(..., description="卡密总数")
-    device_count: int = Field(..., description="设备总数")
-    app_count: int = Field(..., description="应用总数")
-    active_device_count: int = Field(..., description="活跃设备数")
-    active_user_count: int = Field(..., description="活跃用户数")
+    users: UserStatistics = Field(..., description="用户统计")
+    cards: CardStatistics = Field(..., description="卡密统计")
+    devices: DeviceStatistics = Field(..., description="设备统计")
+    apps: AppStatistics = Field(..., description="应用统计")
+    updated_at: datetime = Field(..., description="统计时间（快照生成时间）")
+
+
+class AppStatsInfo(BaseModel):
+    """应用统计汇总"""
+    app_id: int = Field(..., description="应用ID")
+    app_name: str = Field(..., description="应用名称")
+    cards_total: int = Field(..., description="卡密总数")
+    cards_unused: int = Field(..., description="未使用卡密数")
+    cards_used: int = Field(..., description="已使用卡密数")
+    cards_disabled: int = Field(..., description="禁用卡密数")
+    active_bindings: int = Field(..., description="激活的用户-卡密绑定数")
+    active_devices: int = Field(..., description="激活的设备绑定数")
+    registered_users: int = Field(..., description="绑定了该应用卡密的用户数")
+    updated_at: Optional[datetime] = Field(None, description="计数器最后更新时间")
+
+
+class AppStatsListResponse(BaseModel):
+    """应用统计汇总列表响应"""
+    apps: List[AppStatsInfo] = Field(..., description="各应用统计")
+
+
+class SystemMetricsResponse(BaseModel):
+    """系统运行指标响应"""
+    token_cache: Dict[str, Any] = Field(..., description="Token校验缓存统计")
+    token_revocation: Dict[str, int] = Field(..., description="Token吊销列表规模")
+    permission_cache: Dict[str, Any] = Field(..., description="有效权限快照缓存统计")
+    db_pool: Dict[str, Any] = Field(..., description="数据库连接池指标（借出数、溢出数、等待时间）")
+    device_heartbeat: Dict[str, Any] = Field(..., description="设备心跳写回统计")
+    card_jobs: Dict[str, Any] = Field(..., description="卡密生成任务线程池统计")
+    statistics_cache: Dict[str, Any] = Field(..., description="统计数据快照缓存统计")
+    password_hasher: Dict[str, Any] = Field(..., description="密码哈希线程池统计（排队深度、拒绝次数、哈希耗时）")
+    cache_backend: Dict[str, Any] = Field(..., description="缓存装饰器后端及跨 worker 失效通知统计")
@@ -0,0 +1,140 @@
+"""
+接口响应序列化基准测试脚本
+按 /card/my、/permission/my-permissions、/admin/cards 的返回数据，对比三种方式生成响应体的耗时和内存峰值：
+- 原方式：FastAPI 按 ApiResponseData 校验返回值失败，异常处理器包装后 jsonable_encoder + json 序列化，
+  中间件再 json.loads 并按 ApiResponseData 校验一次
+- 路由包装 + json：ApiResponseRoute 直接包装返回值，标准库 json 序列化一次
+- 路由包装 + orjson：ApiResponseRoute 直接包装返回值，orjson 序列化一次
+
+用法:
+    python app/scripts/benchmark_json_response.py
+    python app/scripts/benchmark_json_response.py --rounds 5000 --cards 100
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from app.schemas.admin import AdminCardInfo, AdminCardListResponse
+from app.schemas.card import CardInfo, MyCardResponse
+from app.schemas.common_data import ApiResponseData
+from app.schemas.permission import UserPermissionsResponse
+from app.middleware.response_validator import ORJSONResponse, format_api_response, orjson
+
+
+def build_payloads(cards: int) -> Dict[str, Any]:
+    """按接口的响应模型构造返回数据（与接口中 model_dump(mode='json', exclude_none=True) 的结果一致）"""
+    now = datetime.now()
+    permissions = ["wechat", "douyin", "xiaohongshu", "weibo", "bilibili", "kuaishou", "zhihu", "toutiao"]
+    my_cards = MyCardResponse(has_card=True, cards=[
+        CardInfo(
+            card_id=i, card_key=f"A3KD-Q7LM-P2E8-{i:04d}", expire_time=now + timedelta(days=30),
+            permissions=permissions[:4], bind_devices=1, max_device_count=3, status="used", remark="基准测试",
+            app_name="测试应用", app_id=1, app_key="test_app", app_status="normal", app_created_at=now
+        )
+        for i in range(cards)
+    ])
+    my_permissions = UserPermissionsResponse(
+        has_permission=True, permissions=permissions, expire_time=now + timedelta(days=30)
+    )
+    admin_cards = AdminCardListResponse(total=10000, page=1, size=100, cards=[
+        AdminCardInfo(
+            id=i, app_id=1, app_name="测试应用", card_key=f"A3KD-Q7LM-P2E8-{i:04d}", status="unused",
+            expire_time=now + timedelta(days=30), max_device_count=3, permissions=permissions[:4],
+            remark="基准测试", bind_user_count=0, bind_device_count=0, created_at=now
+        )
+        for i in range(100)
+    ])
+    return {
+        "/api/v1/card/my": my_cards.model_dump(mode='json', exclude_none=True),
+        "/api/v1/permission/my-permissions": my_permissions.model_dump(mode='json', exclude_none=True),
+        "/api/v1/admin/cards": admin_cards.model_dump(mode='json', exclude_none=True),
+    }
+
+
+def legacy_render(path: str, result: Any) -> bytes:
+    """原方式：校验失败 -> 异常处理器包装 -> jsonable_encoder + json -> 中间件解析并再次校验"""
+    try:
+        ApiResponseData.model_validate(result)
+    except ValidationError:
+        pass
+    formatted_response, _ = format_api_response(path, result)
+    body = JSONResponse(content=jsonable_encoder(formatted_response)).body
+    ApiResponseData(**json.loads(body))
+    return body
+
+
+def json_render(path: str, result: Any) -> bytes:
+    """路由包装 + 标准库 json"""
+    formatted_response, _ = format_api_response(path, result)
+    return JSONResponse(content=formatted_response).body
+
+
+def orjson_render(path: str, result: Any) -> bytes:
+    """路由包装 + orjson"""
+    formatted_response, _ = format_api_response(path, result)
+    return ORJSONResponse(content=formatted_response).body
+
+
+def measure(render: Callable[[str, Any], bytes], path: str, result: Any, rounds: int) -> Dict[str, float]:
+    """
+    测量单次生成响应体的平均耗时和内存峰值
+
+    Args:
+        render: 生成响应体的函数
+        path: 请求路径
+        result: 接口返回数据
+        rounds: 计时的执行次数
+
+    Returns:
+        平均耗时（微秒）、单次执行的内存峰值（KiB）和响应体大小（字节）
+    """
+    for _ in range(min(rounds, 100)):
+        body = render(path, result)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render(path, result)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    render(path, result)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"us": elapsed / rounds * 1_000_000, "peak_kib": (peak - baseline) / 1024, "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口响应序列化基准测试")
+    parser.add_argument("--rounds", type=int, default=2000, help="每种方式的执行次数")
+    parser.add_argument("--cards", type=int, default=20, help="/card/my 返回的卡密数量")
+    args = parser.parse_args()
+
+    renders = {"原方式": legacy_render, "路由包装+json": json_render}
+    if orjson is not None:
+        renders["路由包装+orjson"] = orjson_render
+    else:
+        print("未安装 orjson，跳过 orjson 对比")
+
+    print(f"{'接口':<36} {'方式':<16} {'耗时(us)':>10} {'内存峰值(KiB)':>14} {'响应体(B)':>10}")
+    for path, result in build_payloads(args.cards).items():
+        for name, render in renders.items():
+            stats = measure(render, path, result, args.rounds)
+            print(f"{path:<36} {name:<16} {stats['us']:>10.1f} {stats['peak_kib']:>14.1f} {stats['bytes']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+密码哈希成本基准测试脚本
+对每个哈希轮数测量单次校验耗时、单核每秒可处理的登录数，以及按 PASSWORD_HASH_WORKERS 个线程并发时的吞吐，
+用于在部署机器上选择 PASSWORD_HASH_ROUNDS
+
+用法:
+    python app/scripts/benchmark_password_hash.py
+    python app/scripts/benchmark_password_hash.py --scheme bcrypt --rounds 10 11 12 13 --iterations 20
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from app.core.config import settings
+from app.utils.security import build_password_context
+
+
+def benchmark(scheme: str, rounds: int, iterations: int, workers: int) -> dict:
+    """
+    测量一个轮数设置下的校验耗时与吞吐
+
+    Args:
+        scheme: 哈希算法
+        rounds: 哈希轮数
+        iterations: 每个线程校验的次数
+        workers: 并发线程数
+
+    Returns:
+        测量结果
+    """
+    context = build_password_context(scheme=scheme, rounds=rounds, legacy_schemes=[])
+    password = "benchmark_password_123"
+    hashed = context.hash(password)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        context.verify(password, hashed)
+    single_seconds = (time.perf_counter() - started) / iterations
+
+    def verify_many(_):
+        for _ in range(iterations):
+            context.verify(password, hashed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(verify_many, range(workers)))
+    pool_seconds = time.perf_counter() - started
+
+    return {
+        "rounds": rounds,
+        "verify_ms": single_seconds * 1000,
+        "per_core": 1 / single_seconds,
+        "pool": workers * iterations / pool_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="密码哈希成本基准测试")
+    parser.add_argument("--scheme", default=settings.PASSWORD_HASH_SCHEME, help="哈希算法")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13], help="要测试的轮数")
+    parser.add_argument("--iterations", type=int, default=10, help="每个线程校验的次数")
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS, help="并发线程数")
+    args = parser.parse_args()
+
+    print(f"算法: {args.scheme}, CPU 核数: {os.cpu_count()}, 并发线程数: {args.workers}")
+    print(f"{'轮数':>6} {'单次校验(ms)':>14} {'单核登录/秒':>12} {'线程池登录/秒':>14}")
+    for rounds in args.rounds:
+        result = benchmark(args.scheme, rounds, args.iterations, args.workers)
+        print(f"{result['rounds']:>6} {result['verify_ms']:>14.1f} {result['per_core']:>12.1f} {result['pool']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
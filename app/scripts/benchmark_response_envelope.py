@@ -0,0 +1,99 @@
+"""
+响应格式包装基准测试脚本
+对比两种方式下单个请求的耗时：
+- 原方式：FastAPI 按 ApiResponseData 校验返回值失败后由 ResponseValidationError 异常处理器包装，
+  再经 BaseHTTPMiddleware 缓冲响应体、json.loads 并重新校验
+- 现方式：ApiResponseRoute 在路由层直接包装，纯 ASGI 的 ResponseValidatorMiddleware 透传
+
+用法:
+    python app/scripts/benchmark_response_envelope.py
+    python app/scripts/benchmark_response_envelope.py --requests 5000 --items 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import httpx
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.exceptions import ResponseValidationError
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.schemas.common_data import ApiResponseData
+from app.middleware.exception_handlers import response_validation_error_handler
+from app.middleware.response_validator import ApiResponseRoute, ResponseValidatorMiddleware
+
+
+class LegacyResponseValidatorMiddleware(BaseHTTPMiddleware):
+    """原 ResponseValidatorMiddleware 的等价实现：缓冲完整响应体，json.loads 后按 ApiResponseData 校验"""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        ApiResponseData(**json.loads(body))
+        return Response(body, status_code=response.status_code, headers=dict(response.headers))
+
+
+def build_app(items: int, legacy: bool) -> FastAPI:
+    """构建只有一个列表接口的应用"""
+    router = APIRouter() if legacy else APIRouter(route_class=ApiResponseRoute)
+    payload = {
+        "total": items,
+        "items": [{"id": i, "card_key": f"CARD-{i:08d}", "status": "unused", "remark": "基准测试"} for i in range(items)],
+    }
+
+    @router.get("/api/v1/admin/cards", response_model=ApiResponseData)
+    async def list_cards():
+        return payload
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_exception_handler(ResponseValidationError, response_validation_error_handler)
+    app.add_middleware(LegacyResponseValidatorMiddleware if legacy else ResponseValidatorMiddleware)
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    """
+    顺序发送请求，返回单个请求的平均耗时（微秒）
+
+    Args:
+        app: ASGI 应用
+        requests: 请求次数
+
+    Returns:
+        平均耗时（微秒）
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for _ in range(min(requests, 100)):
+            await client.get("/api/v1/admin/cards")
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/api/v1/admin/cards")
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 200 and response.json()["ret"] == ["SUCCESS::请求成功"]
+    return elapsed / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应格式包装基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="每种方式的请求次数")
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 20, 200], help="响应中的列表长度")
+    args = parser.parse_args()
+
+    print(f"{'列表长度':>8} {'原方式(us)':>12} {'现方式(us)':>12} {'节省':>8}")
+    for items in args.items:
+        before = asyncio.run(measure(build_app(items, legacy=True), args.requests))
+        after = asyncio.run(measure(build_app(items, legacy=False), args.requests))
+        print(f"{items:>8} {before:>12.1f} {after:>12.1f} {(1 - after / before):>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ import os
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from app.db.sqlalchemy_db import get_sqlalchemy_db, database
+from app.db.sqlalchemy_db import database
 from app.models.user import User, UserRole, UserStatus
 from app.utils.security import hash_password
 from loguru import logger
@@ -22,7 +22,7 @@ def create_admin_user(username: str = "admin", password: str = "admin123"):
         password: 管理员密码
     """
     database.connect()
-    db = get_sqlalchemy_db()
+    db = database.create_session()
     
     try:
         # 检查用户是否已存在
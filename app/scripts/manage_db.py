@@ -9,8 +9,10 @@ project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(project_root))
 
 from sqlalchemy import create_engine, text
-from src.config.database_config import DATABASE_URL, get_database_config
-from src.sql.sqlalchemy_db import Base
+from sqlalchemy.orm import sessionmaker
+from app.config.database_config import DATABASE_URL, get_database_config
+from app.db.sqlalchemy_db import Base
+import app.models  # 注册所有模型，create_tables / drop_tables 才能拿到完整的表结构
 
 # 创建一个命令行接口
 @click.group()
@@ -102,6 +104,28 @@ def reset():
     os.system('alembic upgrade head')
     click.echo("数据库重置成功")
 
+@cli.command(name='reconcile-app-stats')
+@click.option('--app-id', 'app_ids', type=int, multiple=True, help='只重新统计指定应用（可重复传入），默认全部应用')
+def reconcile_app_stats_command(app_ids):
+    """从卡密、绑定和设备表重新统计 app_stats
+    
+    例如: python manage_db.py reconcile-app-stats --app-id 1 --app-id 2
+    """
+    from app.services.app_stats_service import reconcile_app_stats
+    
+    engine = create_engine(DATABASE_URL)
+    session = sessionmaker(bind=engine)()
+    try:
+        count = reconcile_app_stats(session, list(app_ids) or None)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    
+    click.echo(f"已重新统计 {count} 个应用的 app_stats")
+
 @cli.command()
 def history():
     """查看迁移历史"""
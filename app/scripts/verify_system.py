@@ -6,7 +6,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from app.db.sqlalchemy_db import get_sqlalchemy_db
+from app.db.sqlalchemy_db import database
 from app.models.user import User, UserRole
 from app.models.card import Card
 from app.models.app import App
@@ -22,7 +22,8 @@ def verify_database_connection():
     print("="*60)
     
     try:
-        db = get_sqlalchemy_db()
+        database.connect()
+        db = database.create_session()
         # 简单查询测试连接
         user_count = db.query(User).count()
         print(f"✅ 数据库连接成功")
@@ -135,7 +136,7 @@ def verify_database_models():
     print("="*60)
     
     try:
-        db = get_sqlalchemy_db()
+        db = database.create_session()
         
         # 检查关键表
         tables = {
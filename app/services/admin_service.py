@@ -2,10 +2,14 @@
 管理员服务层
 提供管理后台相关的业务逻辑
 """
-from typing import List, Tuple, Optional, Dict, Union
+import csv
+import io
+import json
+from typing import Any, Iterator, List, Tuple, Optional, Dict, Union
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, Query, contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, select
 from loguru import logger
 
 from app.models.user import User, UserStatus, UserRole
@@ -13,7 +17,32 @@ from app.models.card import Card, CardStatus
 from app.models.card_device import CardDevice, CardDeviceStatus
 from app.models.user_card import UserCard
 from app.models.app import App
-from app.utils.card_generator import generate_batch_cards
+from app.models.app_stats import AppStats
+from app.models.card_permission import CardPermission
+from app.utils.card_generator import iter_insert_unique_cards
+from app.utils.token_revocation import token_revocation
+from app.utils.token_cache import token_cache
+from app.utils.permission_cache import permission_cache
+from app.services.permission_service import insert_card_permission_rows, sync_card_permission_rows
+from app.services.async_service import AsyncServiceAdapter
+from app.services.statistics_service import statistics_snapshot
+from app.services.app_stats_service import APP_STATS_COUNTERS, apply_app_stats_delta, card_status_delta
+from app.utils.pagination import keyset_page, list_total_cache
+from app.core.config import settings
+from app.db.sqlalchemy_db import database
+
+
+# 卡密导出的字段顺序（CSV 表头 / NDJSON 键）
+CARD_EXPORT_FIELDS = (
+    "id", "app_id", "card_key", "status", "expire_time",
+    "max_device_count", "permissions", "remark", "created_at"
+)
+
+# 卡密导出格式 -> 响应 Content-Type
+CARD_EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
 
 
 class AdminService:
@@ -54,25 +83,22 @@ class AdminService:
             if app.status != "normal":
                 return [], "应用已禁用"
             
-            # 生成卡密
+            # 分块生成并插入卡密，依赖 card_key 唯一索引去重，不加载已有卡密
             logger.info(f"开始生成 {count} 个卡密，应用ID: {app_id}")
-            card_keys = generate_batch_cards(count, self.db)
-            
-            # 批量插入数据库
-            cards_to_insert = []
-            for card_key in card_keys:
-                card = Card(
-                    app_id=app_id,
-                    card_key=card_key,
-                    status=CardStatus.UNUSED,
-                    expire_time=expire_time,
-                    max_device_count=max_device_count,
-                    permissions=permissions,
-                    remark=remark
-                )
-                cards_to_insert.append(card)
-            
-            self.db.bulk_save_objects(cards_to_insert)
+            card_values = {
+                "app_id": app_id,
+                "status": CardStatus.UNUSED,
+                "expire_time": expire_time,
+                "max_device_count": max_device_count,
+                "permissions": permissions,
+                "remark": remark,
+            }
+            card_keys = []
+            for rows in iter_insert_unique_cards(self.db, count, card_values):
+                # 同步写入 card_permissions 关联表
+                insert_card_permission_rows(self.db, [card_id for card_id, _ in rows], permissions)
+                card_keys.extend(card_key for _, card_key in rows)
+            apply_app_stats_delta(self.db, app_id, cards_unused=len(card_keys))
             self.db.commit()
             
             logger.info(f"成功生成 {len(card_keys)} 个卡密")
@@ -103,15 +129,7 @@ class AdminService:
             (用户列表, 总数, 错误信息)
         """
         try:
-            query = self.db.query(User)
-            
-            # 状态筛选
-            if status:
-                query = query.filter(User.status == status)
-            
-            # 关键词搜索
-            if keyword:
-                query = query.filter(User.username.like(f"%{keyword}%"))
+            query = self._users_query(status, keyword)
             
             # 获取总数
             total = query.count()
@@ -119,31 +137,85 @@ class AdminService:
             # 分页查询
             users = query.order_by(User.created_at.desc()).offset((page - 1) * size).limit(size).all()
             
-            # 统计每个用户的卡密数量
-            user_list = []
-            for user in users:
-                # 查询用户绑定的有效卡密数量
-                card_count = self.db.query(UserCard).filter(
-                    UserCard.user_id == user.id,
-                    UserCard.status == "active"
-                ).count()
-                
-                user_list.append({
-                    "id": user.id,
-                    "username": user.username,
-                    "status": user.status.value,
-                    "role": user.role.value,
-                    "card_count": card_count,
-                    "created_at": user.created_at,
-                    "last_login_at": user.last_login_at
-                })
-            
-            return user_list, total, None
+            return self._user_rows(users), total, None
             
         except Exception as e:
             logger.error(f"查询用户列表失败: {e}")
             return [], 0, f"查询用户列表失败: {str(e)}"
     
+    def get_users_list_by_cursor(
+        self,
+        size: int = 20,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        with_total: bool = False
+    ) -> Tuple[List[Dict], Optional[str], Optional[int], Optional[str]]:
+        """
+        按游标查询用户列表（按 created_at、id 倒序）
+        
+        Args:
+            size: 每页数量
+            cursor: 上一页返回的 next_cursor，第一页不传
+            status: 状态筛选
+            keyword: 关键词搜索（用户名）
+            with_total: 是否返回总数（按筛选条件缓存，可能略有滞后）
+            
+        Returns:
+            (用户列表, 下一页游标, 总数, 错误信息)
+        """
+        try:
+            query = self._users_query(status, keyword)
+            users, next_cursor = keyset_page(
+                query, User.created_at, User.id, size, cursor,
+                sort_key=lambda user: (user.created_at, user.id)
+            )
+            total = list_total_cache.get_or_count(("users", status, keyword), query.count) if with_total else None
+            
+            return self._user_rows(users), next_cursor, total, None
+            
+        except ValueError as e:
+            return [], None, None, str(e)
+        except Exception as e:
+            logger.error(f"查询用户列表失败: {e}")
+            return [], None, None, f"查询用户列表失败: {str(e)}"
+    
+    def _users_query(self, status: Optional[str] = None, keyword: Optional[str] = None) -> Query:
+        """构建带筛选条件的用户查询"""
+        query = self.db.query(User)
+        
+        # 状态筛选
+        if status:
+            query = query.filter(User.status == status)
+        
+        # 关键词搜索
+        if keyword:
+            query = query.filter(User.username.like(f"%{keyword}%"))
+        
+        return query
+    
+    def _user_rows(self, users: List[User]) -> List[Dict]:
+        """把一页用户转换为列表数据"""
+        # 一次分组统计本页用户绑定的有效卡密数量
+        card_counts = self._count_by(
+            UserCard.user_id,
+            [user.id for user in users],
+            UserCard.status == "active"
+        )
+        
+        user_list = []
+        for user in users:
+            user_list.append({
+                "id": user.id,
+                "username": user.username,
+                "status": user.status.value,
+                "role": user.role.value,
+                "card_count": card_counts.get(user.id, 0),
+                "created_at": user.created_at,
+                "last_login_at": user.last_login_at
+            })
+        return user_list
+    
     def update_user_status(
         self,
         user_id: int,
@@ -171,6 +243,14 @@ class AdminService:
             user.status = UserStatus(status)
             self.db.commit()
             
+            # 封禁时吊销该用户已签发的Token，解封时恢复
+            if user.status == UserStatus.BANNED:
+                token_revocation.revoke_user(user_id)
+            else:
+                token_revocation.restore_user(user_id)
+            token_cache.invalidate_user(user_id)
+            permission_cache.invalidate_user(user_id)
+            
             logger.info(f"更新用户状态成功: user_id={user_id}, status={status}")
             return True, None
             
@@ -179,13 +259,79 @@ class AdminService:
             logger.error(f"更新用户状态失败: {e}")
             return False, f"更新用户状态失败: {str(e)}"
     
+    def bulk_update_user_status(
+        self,
+        status: str,
+        user_ids: Optional[List[int]] = None,
+        app_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> Tuple[int, Optional[str]]:
+        """
+        批量更新用户状态（按ID列表和/或筛选条件，分块执行 UPDATE，管理员账户不会被修改）
+        
+        Args:
+            status: 状态（normal/banned）
+            user_ids: 用户ID列表
+            app_id: 只更新绑定了该应用卡密的用户
+            created_from: 注册时间起（含）
+            created_to: 注册时间止（含）
+            
+        Returns:
+            (更新的用户数量, 错误信息)
+        """
+        if status not in [UserStatus.NORMAL.value, UserStatus.BANNED.value]:
+            return 0, "无效的状态值"
+        if not (user_ids or app_id or created_from or created_to):
+            return 0, "请提供ID列表或筛选条件"
+        
+        target = UserStatus(status)
+        conditions = [User.status != target, User.role != UserRole.ADMIN]
+        if app_id:
+            conditions.append(User.id.in_(
+                select(UserCard.user_id).join(Card, UserCard.card_id == Card.id).where(Card.app_id == app_id)
+            ))
+        if created_from:
+            conditions.append(User.created_at >= created_from)
+        if created_to:
+            conditions.append(User.created_at <= created_to)
+        
+        updated_ids: List[int] = []
+        try:
+            for rows in self._iter_update_chunks(User.id, conditions, ids=user_ids):
+                chunk = [row.id for row in rows]
+                self.db.query(User).filter(User.id.in_(chunk)).update(
+                    {User.status: target}, synchronize_session=False
+                )
+                self.db.commit()
+                updated_ids.extend(chunk)
+            
+            logger.info(f"批量更新用户状态成功: status={status}, count={len(updated_ids)}")
+            return len(updated_ids), None
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"批量更新用户状态失败: {e}")
+            return len(updated_ids), f"批量更新用户状态失败（已更新 {len(updated_ids)} 个）: {str(e)}"
+        
+        finally:
+            # 已提交的部分一次性吊销/恢复Token并失效缓存
+            if updated_ids:
+                if target == UserStatus.BANNED:
+                    token_revocation.revoke_users(updated_ids)
+                else:
+                    token_revocation.restore_users(updated_ids)
+                token_cache.invalidate_users(updated_ids)
+                permission_cache.invalidate_users(updated_ids)
+    
     def get_cards_list(
         self,
         page: int = 1,
         size: int = 20,
         app_id: Optional[int] = None,
         status: Optional[str] = None,
-        keyword: Optional[str] = None
+        keyword: Optional[str] = None,
+        permission: Optional[str] = None
     ) -> Tuple[List[Dict], int, Optional[str]]:
         """
         查询卡密列表
@@ -196,27 +342,13 @@ class AdminService:
             app_id: 应用ID筛选
             status: 状态筛选
             keyword: 关键词搜索（卡密、备注）
+            permission: 权限标识筛选（通过 card_permissions 索引查询）
             
         Returns:
             (卡密列表, 总数, 错误信息)
         """
         try:
-            query = self.db.query(Card).join(App, Card.app_id == App.id)
-            
-            # 应用筛选
-            if app_id:
-                query = query.filter(Card.app_id == app_id)
-            
-            # 状态筛选
-            if status:
-                query = query.filter(Card.status == status)
-            
-            # 关键词搜索
-            if keyword:
-                query = query.filter(or_(
-                    Card.card_key.like(f"%{keyword}%"),
-                    Card.remark.like(f"%{keyword}%")
-                ))
+            query = self._cards_query(app_id, status, keyword, permission)
             
             # 获取总数
             total = query.count()
@@ -224,45 +356,266 @@ class AdminService:
             # 分页查询
             cards = query.order_by(Card.created_at.desc()).offset((page - 1) * size).limit(size).all()
             
-            # 统计每个卡密的绑定信息
-            card_list = []
-            for card in cards:
-                # 查询绑定的用户数量
-                bind_user_count = self.db.query(UserCard).filter(
-                    UserCard.card_id == card.id,
-                    UserCard.status == "active"
-                ).count()
-                
-                # 查询绑定的设备数量
-                bind_device_count = self.db.query(CardDevice).filter(
-                    CardDevice.card_id == card.id,
-                    CardDevice.status == CardDeviceStatus.ACTIVE
-                ).count()
-                
-                # 获取应用信息
-                app = self.db.query(App).filter(App.id == card.app_id).first()
-                
-                card_list.append({
-                    "id": card.id,
-                    "app_id": card.app_id,
-                    "app_name": app.app_name if app else "未知应用",
-                    "card_key": card.card_key,
-                    "status": card.status.value,
-                    "expire_time": card.expire_time,
-                    "max_device_count": card.max_device_count,
-                    "permissions": card.permissions,
-                    "remark": card.remark,
-                    "bind_user_count": bind_user_count,
-                    "bind_device_count": bind_device_count,
-                    "created_at": card.created_at
-                })
-            
-            return card_list, total, None
+            return self._card_rows(cards), total, None
             
         except Exception as e:
             logger.error(f"查询卡密列表失败: {e}")
             return [], 0, f"查询卡密列表失败: {str(e)}"
     
+    def get_cards_list_by_cursor(
+        self,
+        size: int = 20,
+        cursor: Optional[str] = None,
+        app_id: Optional[int] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        permission: Optional[str] = None,
+        with_total: bool = False
+    ) -> Tuple[List[Dict], Optional[str], Optional[int], Optional[str]]:
+        """
+        按游标查询卡密列表（按 created_at、id 倒序）
+        
+        Args:
+            size: 每页数量
+            cursor: 上一页返回的 next_cursor，第一页不传
+            app_id: 应用ID筛选
+            status: 状态筛选
+            keyword: 关键词搜索（卡密、备注）
+            permission: 权限标识筛选
+            with_total: 是否返回总数（按筛选条件缓存，可能略有滞后）
+            
+        Returns:
+            (卡密列表, 下一页游标, 总数, 错误信息)
+        """
+        try:
+            query = self._cards_query(app_id, status, keyword, permission)
+            cards, next_cursor = keyset_page(
+                query, Card.created_at, Card.id, size, cursor,
+                sort_key=lambda card: (card.created_at, card.id)
+            )
+            total = list_total_cache.get_or_count(
+                ("cards", app_id, status, keyword, permission), query.count
+            ) if with_total else None
+            
+            return self._card_rows(cards), next_cursor, total, None
+            
+        except ValueError as e:
+            return [], None, None, str(e)
+        except Exception as e:
+            logger.error(f"查询卡密列表失败: {e}")
+            return [], None, None, f"查询卡密列表失败: {str(e)}"
+    
+    def _cards_query(
+        self,
+        app_id: Optional[int] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        permission: Optional[str] = None
+    ) -> Query:
+        """构建带筛选条件的卡密列表查询（应用信息随 JOIN 一起加载）"""
+        query = self.db.query(Card).join(App, Card.app_id == App.id).options(contains_eager(Card.app))
+        return self._filter_cards(query, app_id, status, keyword, permission=permission)
+    
+    def _card_rows(self, cards: List[Card]) -> List[Dict]:
+        """把一页卡密转换为列表数据"""
+        # 一次分组统计本页卡密的绑定用户数和绑定设备数
+        card_ids = [card.id for card in cards]
+        bind_user_counts = self._count_by(UserCard.card_id, card_ids, UserCard.status == "active")
+        bind_device_counts = self._count_by(
+            CardDevice.card_id,
+            card_ids,
+            CardDevice.status == CardDeviceStatus.ACTIVE
+        )
+        
+        card_list = []
+        for card in cards:
+            card_list.append({
+                "id": card.id,
+                "app_id": card.app_id,
+                "app_name": card.app.app_name if card.app else "未知应用",
+                "card_key": card.card_key,
+                "status": card.status.value,
+                "expire_time": card.expire_time,
+                "max_device_count": card.max_device_count,
+                "permissions": card.permissions,
+                "remark": card.remark,
+                "bind_user_count": bind_user_counts.get(card.id, 0),
+                "bind_device_count": bind_device_counts.get(card.id, 0),
+                "created_at": card.created_at
+            })
+        return card_list
+    
+    def _count_by(self, column, ids: List[int], *conditions) -> Dict[int, int]:
+        """
+        按外键分组统计一页数据的关联记录数（GROUP BY ... COUNT，只查询本页的ID）
+        
+        Args:
+            column: 分组的外键列，如 UserCard.card_id
+            ids: 本页的主键ID列表
+            *conditions: 额外的筛选条件
+            
+        Returns:
+            ID -> 记录数，没有关联记录的ID不在结果中
+        """
+        if not ids:
+            return {}
+        rows = self.db.query(column, func.count()).filter(
+            column.in_(ids), *conditions
+        ).group_by(column).all()
+        return {key: count for key, count in rows}
+    
+    def _iter_update_chunks(
+        self,
+        id_column,
+        conditions: List,
+        *columns,
+        ids: Optional[List[int]] = None
+    ) -> Iterator[List]:
+        """
+        分块取出待批量更新的行（每块最多 BULK_UPDATE_CHUNK_SIZE 行）
+        
+        给定ID列表时按ID列表分块；否则按主键键集翻页，不使用 OFFSET
+        
+        Args:
+            id_column: 主键列，如 Card.id
+            conditions: 筛选条件（应包含“状态不等于目标状态”）
+            *columns: 额外需要的列，如 Card.app_id
+            ids: ID列表
+            
+        Yields:
+            一块行数据（包含 id 和额外的列）
+        """
+        chunk_size = settings.BULK_UPDATE_CHUNK_SIZE
+        query = self.db.query(id_column.label("id"), *columns).filter(*conditions).order_by(id_column)
+        
+        if ids:
+            ids = sorted(set(ids))
+            for start in range(0, len(ids), chunk_size):
+                rows = query.filter(id_column.in_(ids[start:start + chunk_size])).all()
+                if rows:
+                    yield rows
+            return
+        
+        last_id = 0
+        while True:
+            rows = query.filter(id_column > last_id).limit(chunk_size).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+    
+    def _filter_cards(
+        self,
+        query: Query,
+        app_id: Optional[int] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        permission: Optional[str] = None,
+        job_id: Optional[int] = None
+    ) -> Query:
+        """
+        为卡密查询添加筛选条件（卡密列表和卡密导出共用）
+        
+        Args:
+            query: 卡密查询
+            app_id: 应用ID筛选
+            status: 状态筛选
+            keyword: 关键词搜索（卡密、备注）
+            permission: 权限标识筛选
+            job_id: 生成任务ID筛选
+            
+        Returns:
+            添加筛选条件后的查询
+        """
+        # 应用筛选
+        if app_id:
+            query = query.filter(Card.app_id == app_id)
+        
+        # 生成任务筛选
+        if job_id:
+            query = query.filter(Card.job_id == job_id)
+        
+        # 状态筛选
+        if status:
+            query = query.filter(Card.status == status)
+        
+        # 关键词搜索
+        if keyword:
+            query = query.filter(or_(
+                Card.card_key.like(f"%{keyword}%"),
+                Card.remark.like(f"%{keyword}%")
+            ))
+        
+        # 权限筛选
+        if permission:
+            query = query.filter(Card.id.in_(
+                self.db.query(CardPermission.card_id).filter(
+                    CardPermission.permission_key == permission
+                )
+            ))
+        
+        return query
+    
+    def iter_cards_export(
+        self,
+        export_format: str = "csv",
+        app_id: Optional[int] = None,
+        status: Optional[str] = None,
+        keyword: Optional[str] = None,
+        permission: Optional[str] = None,
+        job_id: Optional[int] = None,
+        batch_size: int = settings.CARD_EXPORT_BATCH_SIZE
+    ) -> Iterator[bytes]:
+        """
+        按筛选条件逐批导出卡密
+        
+        使用服务端游标（yield_per）按ID顺序读取 cards 表，每批行编码为一个数据块，
+        内存占用只与 batch_size 有关，与导出的总行数无关。
+        
+        Args:
+            export_format: 导出格式，csv 或 ndjson
+            app_id: 应用ID筛选
+            status: 状态筛选
+            keyword: 关键词搜索（卡密、备注）
+            permission: 权限标识筛选
+            job_id: 生成任务ID筛选
+            batch_size: 每批读取的行数
+            
+        Yields:
+            编码后的数据块（UTF-8）
+        """
+        if export_format not in CARD_EXPORT_MEDIA_TYPES:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        
+        columns = [getattr(Card, field) for field in CARD_EXPORT_FIELDS]
+        query = self._filter_cards(self.db.query(*columns), app_id, status, keyword, permission, job_id)
+        result = self.db.execute(
+            query.statement.order_by(Card.id).execution_options(yield_per=batch_size)
+        )
+        
+        if export_format == "csv":
+            # 带 BOM，便于 Excel 直接识别 UTF-8
+            yield ("\ufeff" + ",".join(CARD_EXPORT_FIELDS) + "\r\n").encode("utf-8")
+        
+        exported = 0
+        for rows in result.partitions():
+            buffer = io.StringIO()
+            if export_format == "csv":
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow(_export_values(row, export_format))
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(
+                        dict(zip(CARD_EXPORT_FIELDS, _export_values(row, export_format))),
+                        ensure_ascii=False
+                    ))
+                    buffer.write("\n")
+            exported += len(rows)
+            yield buffer.getvalue().encode("utf-8")
+        
+        logger.info(f"卡密导出完成: format={export_format}, rows={exported}")
+    
     def update_card_status(
         self,
         card_id: int,
@@ -288,8 +641,11 @@ class AdminService:
             if status not in valid_statuses:
                 return False, "无效的状态值"
             
+            old_status = card.status
             card.status = CardStatus(status)
+            apply_app_stats_delta(self.db, card.app_id, **card_status_delta(old_status, card.status))
             self.db.commit()
+            permission_cache.invalidate_cards([card_id])
             
             logger.info(f"更新卡密状态成功: card_id={card_id}, status={status}")
             return True, None
@@ -299,6 +655,86 @@ class AdminService:
             logger.error(f"更新卡密状态失败: {e}")
             return False, f"更新卡密状态失败: {str(e)}"
     
+    def bulk_update_card_status(
+        self,
+        status: str,
+        card_ids: Optional[List[int]] = None,
+        app_id: Optional[int] = None,
+        job_id: Optional[int] = None,
+        remark: Optional[str] = None,
+        current_status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> Tuple[int, Optional[str]]:
+        """
+        批量更新卡密状态（按ID列表和/或筛选条件，分块执行 UPDATE）
+        
+        每块在一个事务中更新卡密并调整 app_stats，全部完成后一次性失效相关的权限快照
+        
+        Args:
+            status: 状态（unused/used/disabled）
+            card_ids: 卡密ID列表
+            app_id: 应用ID筛选
+            job_id: 生成任务ID筛选
+            remark: 备注筛选（完全匹配）
+            current_status: 当前状态筛选
+            created_from: 创建时间起（含）
+            created_to: 创建时间止（含）
+            
+        Returns:
+            (更新的卡密数量, 错误信息)
+        """
+        valid_statuses = [CardStatus.UNUSED.value, CardStatus.USED.value, CardStatus.DISABLED.value]
+        if status not in valid_statuses or (current_status and current_status not in valid_statuses):
+            return 0, "无效的状态值"
+        if not (card_ids or app_id or job_id or remark or current_status or created_from or created_to):
+            return 0, "请提供ID列表或筛选条件"
+        
+        target = CardStatus(status)
+        conditions = [Card.status != target]
+        if app_id:
+            conditions.append(Card.app_id == app_id)
+        if job_id:
+            conditions.append(Card.job_id == job_id)
+        if remark:
+            conditions.append(Card.remark == remark)
+        if current_status:
+            conditions.append(Card.status == CardStatus(current_status))
+        if created_from:
+            conditions.append(Card.created_at >= created_from)
+        if created_to:
+            conditions.append(Card.created_at <= created_to)
+        
+        updated_ids: List[int] = []
+        try:
+            for rows in self._iter_update_chunks(Card.id, conditions, Card.app_id, Card.status, ids=card_ids):
+                chunk = [row.id for row in rows]
+                deltas: Dict[int, Dict[str, int]] = {}
+                for row in rows:
+                    app_deltas = deltas.setdefault(row.app_id, {})
+                    for column, delta in card_status_delta(row.status, target).items():
+                        app_deltas[column] = app_deltas.get(column, 0) + delta
+                
+                self.db.query(Card).filter(Card.id.in_(chunk)).update(
+                    {Card.status: target}, synchronize_session=False
+                )
+                for row_app_id, app_deltas in deltas.items():
+                    apply_app_stats_delta(self.db, row_app_id, **app_deltas)
+                self.db.commit()
+                updated_ids.extend(chunk)
+            
+            logger.info(f"批量更新卡密状态成功: status={status}, count={len(updated_ids)}")
+            return len(updated_ids), None
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"批量更新卡密状态失败: {e}")
+            return len(updated_ids), f"批量更新卡密状态失败（已更新 {len(updated_ids)} 张）: {str(e)}"
+        
+        finally:
+            if updated_ids:
+                permission_cache.invalidate_cards(updated_ids)
+    
     def update_card_permissions(
         self,
         card_id: int,
@@ -321,7 +757,9 @@ class AdminService:
             
             old_permissions = card.permissions
             card.permissions = permissions
+            sync_card_permission_rows(self.db, [card_id], permissions)
             self.db.commit()
+            permission_cache.invalidate_cards([card_id])
             
             logger.info(f"更新卡密权限成功: card_id={card_id}, old={old_permissions}, new={permissions}")
             return True, None
@@ -353,23 +791,7 @@ class AdminService:
             (设备列表, 总数, 错误信息)
         """
         try:
-            query = self.db.query(CardDevice).join(Card, CardDevice.card_id == Card.id)
-            
-            # 卡密筛选
-            if card_id:
-                query = query.filter(CardDevice.card_id == card_id)
-            
-            # 用户筛选
-            if user_id:
-                # 通过 UserCard 关联查询
-                query = query.join(UserCard, UserCard.card_id == Card.id).filter(
-                    UserCard.user_id == user_id,
-                    UserCard.status == "active"
-                )
-            
-            # 状态筛选
-            if status:
-                query = query.filter(CardDevice.status == status)
+            query = self._devices_query(card_id, user_id, status)
             
             # 获取总数
             total = query.count()
@@ -377,28 +799,99 @@ class AdminService:
             # 分页查询
             devices = query.order_by(CardDevice.bind_time.desc()).offset((page - 1) * size).limit(size).all()
             
-            # 构建返回数据
-            device_list = []
-            for device in devices:
-                card = self.db.query(Card).filter(Card.id == device.card_id).first()
-                
-                device_list.append({
-                    "id": device.id,
-                    "card_id": device.card_id,
-                    "card_key": card.card_key if card else "未知",
-                    "device_id": device.device_id,
-                    "device_name": device.device_name,
-                    "bind_time": device.bind_time,
-                    "last_active_at": device.last_active_at,
-                    "status": device.status.value
-                })
-            
-            return device_list, total, None
+            return self._device_rows(devices), total, None
             
         except Exception as e:
             logger.error(f"查询设备列表失败: {e}")
             return [], 0, f"查询设备列表失败: {str(e)}"
     
+    def get_devices_list_by_cursor(
+        self,
+        size: int = 20,
+        cursor: Optional[str] = None,
+        card_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        with_total: bool = False
+    ) -> Tuple[List[Dict], Optional[str], Optional[int], Optional[str]]:
+        """
+        按游标查询设备列表（按 bind_time、id 倒序）
+        
+        Args:
+            size: 每页数量
+            cursor: 上一页返回的 next_cursor，第一页不传
+            card_id: 卡密ID筛选
+            user_id: 用户ID筛选
+            status: 状态筛选
+            with_total: 是否返回总数（按筛选条件缓存，可能略有滞后）
+            
+        Returns:
+            (设备列表, 下一页游标, 总数, 错误信息)
+        """
+        try:
+            query = self._devices_query(card_id, user_id, status)
+            devices, next_cursor = keyset_page(
+                query, CardDevice.bind_time, CardDevice.id, size, cursor,
+                sort_key=lambda device: (device.bind_time, device.id)
+            )
+            total = list_total_cache.get_or_count(
+                ("devices", card_id, user_id, status), query.count
+            ) if with_total else None
+            
+            return self._device_rows(devices), next_cursor, total, None
+            
+        except ValueError as e:
+            return [], None, None, str(e)
+        except Exception as e:
+            logger.error(f"查询设备列表失败: {e}")
+            return [], None, None, f"查询设备列表失败: {str(e)}"
+    
+    def _devices_query(
+        self,
+        card_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None
+    ) -> Query:
+        """构建带筛选条件的设备列表查询（卡密信息随 JOIN 一起加载）"""
+        query = self.db.query(CardDevice).join(Card, CardDevice.card_id == Card.id).options(
+            contains_eager(CardDevice.card)
+        )
+        
+        # 卡密筛选
+        if card_id:
+            query = query.filter(CardDevice.card_id == card_id)
+        
+        # 用户筛选
+        if user_id:
+            # 通过 UserCard 关联查询
+            query = query.join(UserCard, UserCard.card_id == Card.id).filter(
+                UserCard.user_id == user_id,
+                UserCard.status == "active"
+            )
+        
+        # 状态筛选
+        if status:
+            query = query.filter(CardDevice.status == status)
+        
+        return query
+    
+    @staticmethod
+    def _device_rows(devices: List[CardDevice]) -> List[Dict]:
+        """把一页设备转换为列表数据"""
+        device_list = []
+        for device in devices:
+            device_list.append({
+                "id": device.id,
+                "card_id": device.card_id,
+                "card_key": device.card.card_key if device.card else "未知",
+                "device_id": device.device_id,
+                "device_name": device.device_name,
+                "bind_time": device.bind_time,
+                "last_active_at": device.last_active_at,
+                "status": device.status.value
+            })
+        return device_list
+    
     def update_device_status(
         self,
         device_id: int,
@@ -424,8 +917,14 @@ class AdminService:
             if status not in valid_statuses:
                 return False, "无效的状态值"
             
+            old_status = device.status
             device.status = CardDeviceStatus(status)
+            card_id = device.card_id
+            if old_status != device.status:
+                active_delta = 1 if device.status == CardDeviceStatus.ACTIVE else -1
+                apply_app_stats_delta(self.db, device.card.app_id, active_devices=active_delta)
             self.db.commit()
+            permission_cache.invalidate_cards([card_id])
             
             logger.info(f"更新设备状态成功: device_id={device_id}, status={status}")
             return True, None
@@ -435,59 +934,231 @@ class AdminService:
             logger.error(f"更新设备状态失败: {e}")
             return False, f"更新设备状态失败: {str(e)}"
     
-    def get_statistics(self) -> Tuple[Dict, Optional[str]]:
+    def bulk_update_device_status(
+        self,
+        status: str,
+        device_ids: Optional[List[int]] = None,
+        card_id: Optional[int] = None,
+        app_id: Optional[int] = None,
+        bind_from: Optional[datetime] = None,
+        bind_to: Optional[datetime] = None
+    ) -> Tuple[int, Optional[str]]:
         """
-        获取统计数据
+        批量更新设备状态（按ID列表和/或筛选条件，分块执行 UPDATE）
         
+        Args:
+            status: 状态（active/disabled）
+            device_ids: 设备绑定ID列表
+            card_id: 卡密ID筛选
+            app_id: 应用ID筛选
+            bind_from: 绑定时间起（含）
+            bind_to: 绑定时间止（含）
+            
         Returns:
-            (统计数据字典, 错误信息)
+            (更新的设备数量, 错误信息)
         """
+        if status not in [CardDeviceStatus.ACTIVE.value, CardDeviceStatus.DISABLED.value]:
+            return 0, "无效的状态值"
+        if not (device_ids or card_id or app_id or bind_from or bind_to):
+            return 0, "请提供ID列表或筛选条件"
+        
+        target = CardDeviceStatus(status)
+        active_delta = 1 if target == CardDeviceStatus.ACTIVE else -1
+        conditions = [CardDevice.status != target, CardDevice.card_id == Card.id]
+        if card_id:
+            conditions.append(CardDevice.card_id == card_id)
+        if app_id:
+            conditions.append(Card.app_id == app_id)
+        if bind_from:
+            conditions.append(CardDevice.bind_time >= bind_from)
+        if bind_to:
+            conditions.append(CardDevice.bind_time <= bind_to)
+        
+        updated_count = 0
+        affected_card_ids = set()
         try:
-            # 用户统计
-            total_users = self.db.query(User).count()
-            normal_users = self.db.query(User).filter(User.status == UserStatus.NORMAL).count()
-            banned_users = self.db.query(User).filter(User.status == UserStatus.BANNED).count()
-            
-            # 卡密统计
-            total_cards = self.db.query(Card).count()
-            unused_cards = self.db.query(Card).filter(Card.status == CardStatus.UNUSED).count()
-            used_cards = self.db.query(Card).filter(Card.status == CardStatus.USED).count()
-            disabled_cards = self.db.query(Card).filter(Card.status == CardStatus.DISABLED).count()
-            
-            # 设备统计
-            total_devices = self.db.query(CardDevice).count()
-            active_devices = self.db.query(CardDevice).filter(CardDevice.status == CardDeviceStatus.ACTIVE).count()
-            disabled_devices = self.db.query(CardDevice).filter(CardDevice.status == CardDeviceStatus.DISABLED).count()
-            
-            # 应用统计
-            total_apps = self.db.query(App).count()
-            active_apps = self.db.query(App).filter(App.status == "normal").count()
-            
-            statistics = {
-                "users": {
-                    "total": total_users,
-                    "normal": normal_users,
-                    "banned": banned_users
-                },
-                "cards": {
-                    "total": total_cards,
-                    "unused": unused_cards,
-                    "used": used_cards,
-                    "disabled": disabled_cards
-                },
-                "devices": {
-                    "total": total_devices,
-                    "active": active_devices,
-                    "disabled": disabled_devices
-                },
-                "apps": {
-                    "total": total_apps,
-                    "active": active_apps
-                }
-            }
+            for rows in self._iter_update_chunks(
+                CardDevice.id, conditions, CardDevice.card_id, Card.app_id, ids=device_ids
+            ):
+                chunk = [row.id for row in rows]
+                app_counts: Dict[int, int] = {}
+                for row in rows:
+                    app_counts[row.app_id] = app_counts.get(row.app_id, 0) + 1
+                
+                self.db.query(CardDevice).filter(CardDevice.id.in_(chunk)).update(
+                    {CardDevice.status: target}, synchronize_session=False
+                )
+                for row_app_id, count in app_counts.items():
+                    apply_app_stats_delta(self.db, row_app_id, active_devices=active_delta * count)
+                self.db.commit()
+                updated_count += len(chunk)
+                affected_card_ids.update(row.card_id for row in rows)
+            
+            logger.info(f"批量更新设备状态成功: status={status}, count={updated_count}")
+            return updated_count, None
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"批量更新设备状态失败: {e}")
+            return updated_count, f"批量更新设备状态失败（已更新 {updated_count} 个）: {str(e)}"
+        
+        finally:
+            if affected_card_ids:
+                permission_cache.invalidate_cards(affected_card_ids)
+    
+    def get_statistics(self, refresh: bool = False) -> Tuple[Dict, Optional[str]]:
+        """
+        获取统计数据（优先返回缓存的快照）
+        
+        Args:
+            refresh: 是否跳过快照，立即重新统计
             
-            return statistics, None
+        Returns:
+            (统计数据字典, 错误信息)
+        """
+        try:
+            return statistics_snapshot.get(self.db, refresh=refresh), None
             
         except Exception as e:
             logger.error(f"获取统计数据失败: {e}")
             return {}, f"获取统计数据失败: {str(e)}"
+    
+    def get_app_stats(self, app_id: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        获取各应用的统计汇总（读取 app_stats，不扫描卡密和设备表）
+        
+        Args:
+            app_id: 应用ID筛选
+            
+        Returns:
+            (应用统计列表, 错误信息)
+        """
+        try:
+            query = self.db.query(App, AppStats).outerjoin(AppStats, AppStats.app_id == App.id)
+            if app_id:
+                query = query.filter(App.id == app_id)
+            
+            app_stats = []
+            for app, stats in query.order_by(App.id).all():
+                counters = {column: getattr(stats, column) if stats else 0 for column in APP_STATS_COUNTERS}
+                app_stats.append({
+                    "app_id": app.id,
+                    "app_name": app.app_name,
+                    "cards_total": counters["cards_unused"] + counters["cards_used"] + counters["cards_disabled"],
+                    **counters,
+                    "updated_at": stats.updated_at if stats else None
+                })
+            
+            return app_stats, None
+            
+        except Exception as e:
+            logger.error(f"获取应用统计失败: {e}")
+            return [], f"获取应用统计失败: {str(e)}"
+
+
+def _export_values(row, export_format: str) -> List[Any]:
+    """把一行卡密转换为可导出的值（枚举取值、时间转 ISO 格式，CSV 中权限转为 JSON 字符串）"""
+    values = []
+    for field, value in zip(CARD_EXPORT_FIELDS, row):
+        if isinstance(value, CardStatus):
+            value = value.value
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif field == "permissions" and export_format == "csv" and value is not None and not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        values.append(value)
+    return values
+
+
+def stream_cards_export(export_format: str = "csv", **filters) -> Iterator[bytes]:
+    """
+    使用独立会话流式导出卡密，供 StreamingResponse 迭代
+    
+    请求依赖中的会话在响应开始发送后可能已经关闭，因此导出过程自行创建并关闭会话。
+    
+    Args:
+        export_format: 导出格式，csv 或 ndjson
+        **filters: 传给 AdminService.iter_cards_export 的筛选条件
+        
+    Yields:
+        编码后的数据块
+    """
+    db = database.create_session()
+    try:
+        yield from AdminService(db).iter_cards_export(export_format, **filters)
+    except Exception as e:
+        logger.error(f"卡密导出失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
+class AsyncAdminService(AsyncServiceAdapter):
+    """
+    管理员服务的异步版本
+    
+    与 AdminService 的方法一一对应，在 AsyncSession 上执行，不阻塞事件循环
+    """
+    
+    service_class = AdminService
+    
+    async def generate_cards(self, app_id: int, count: int, expire_time: datetime, max_device_count: int, permissions: Union[List[str], Dict], remark: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+        return await self._run("generate_cards", app_id, count, expire_time, max_device_count, permissions, remark)
+    
+    async def get_users_list(self, page: int = 1, size: int = 20, status: Optional[str] = None, keyword: Optional[str] = None) -> Tuple[List[Dict], int, Optional[str]]:
+        return await self._run("get_users_list", page, size, status, keyword)
+    
+    async def update_user_status(self, user_id: int, status: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("update_user_status", user_id, status)
+    
+    async def get_cards_list(self, page: int = 1, size: int = 20, app_id: Optional[int] = None, status: Optional[str] = None, keyword: Optional[str] = None, permission: Optional[str] = None) -> Tuple[List[Dict], int, Optional[str]]:
+        return await self._run("get_cards_list", page, size, app_id, status, keyword, permission)
+    
+    async def get_users_list_by_cursor(self, size: int = 20, cursor: Optional[str] = None, status: Optional[str] = None, keyword: Optional[str] = None, with_total: bool = False) -> Tuple[List[Dict], Optional[str], Optional[int], Optional[str]]:
+        return await self._run("get_users_list_by_cursor", size, cursor, status, keyword, with_total)
+    
+    async def get_cards_list_by_cursor(self, size: int = 20, cursor: Optional[str] = None, app_id: Optional[int] = None, status: Optional[str] = None, keyword: Optional[str] = None, permission: Optional[str] = None, with_total: bool = False) -> Tuple[List[Dict], Optional[str], Optional[int], Optional[str]]:
+        return await self._run("get_cards_list_by_cursor", size, cursor, app_id, status, keyword, permission, with_total)
+    
+    async def get_devices_list_by_cursor(self, size: int = 20, cursor: Optional[str] = None, card_id: Optional[int] = None, user_id: Optional[int] = None, status: Optional[str] = None, with_total: bool = False) -> Tuple[List[Dict], Optional[str], Optional[int], Optional[str]]:
+        return await self._run("get_devices_list_by_cursor", size, cursor, card_id, user_id, status, with_total)
+    
+    async def update_card_status(self, card_id: int, status: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("update_card_status", card_id, status)
+    
+    async def update_card_permissions(self, card_id: int, permissions: Union[List[str], Dict]) -> Tuple[bool, Optional[str]]:
+        return await self._run("update_card_permissions", card_id, permissions)
+    
+    async def get_devices_list(self, page: int = 1, size: int = 20, card_id: Optional[int] = None, user_id: Optional[int] = None, status: Optional[str] = None) -> Tuple[List[Dict], int, Optional[str]]:
+        return await self._run("get_devices_list", page, size, card_id, user_id, status)
+    
+    async def update_device_status(self, device_id: int, status: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("update_device_status", device_id, status)
+    
+    async def bulk_update_user_status(self, status: str, user_ids: Optional[List[int]] = None, app_id: Optional[int] = None, created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Tuple[int, Optional[str]]:
+        return await self._run("bulk_update_user_status", status, user_ids, app_id, created_from, created_to)
+    
+    async def bulk_update_card_status(self, status: str, card_ids: Optional[List[int]] = None, app_id: Optional[int] = None, job_id: Optional[int] = None, remark: Optional[str] = None, current_status: Optional[str] = None, created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Tuple[int, Optional[str]]:
+        return await self._run("bulk_update_card_status", status, card_ids, app_id, job_id, remark, current_status, created_from, created_to)
+    
+    async def bulk_update_device_status(self, status: str, device_ids: Optional[List[int]] = None, card_id: Optional[int] = None, app_id: Optional[int] = None, bind_from: Optional[datetime] = None, bind_to: Optional[datetime] = None) -> Tuple[int, Optional[str]]:
+        return await self._run("bulk_update_device_status", status, device_ids, card_id, app_id, bind_from, bind_to)
+    
+    async def get_statistics(self, refresh: bool = False) -> Tuple[Dict, Optional[str]]:
+        return await self._run("get_statistics", refresh)
+    
+    async def get_app_stats(self, app_id: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+        return await self._run("get_app_stats", app_id)
+
+
+def get_async_admin_service(db: AsyncSession) -> AsyncAdminService:
+    """
+    获取异步管理员服务实例
+    
+    Args:
+        db: 异步数据库会话
+        
+    Returns:
+        AsyncAdminService实例
+    """
+    return AsyncAdminService(db)
@@ -4,12 +4,71 @@
 """
 import secrets
 from datetime import datetime
-from typing import Optional, Tuple, List
+from typing import Any, Dict, Optional, Tuple, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 
 from app.models.app import App, AppStatus
+from app.models.app_stats import AppStats
+from app.models.card import Card
+from app.models.card_device import CardDevice
+from app.models.card_job import CardGenerateJob
+from app.models.card_permission import CardPermission
+from app.models.user_card import UserCard
+from app.models.user_token import UserToken
+from app.services.app_stats_service import ensure_app_stats_rows
+from app.decorators.cache_decorator import ttl_cache
+from app.db.sqlalchemy_db import database
+from app.utils.token_revocation import token_revocation
+from app.utils.token_cache import token_cache
+from app.utils.permission_cache import permission_cache
 from app.core.logging_uru import logger
+from app.core.config import settings
+
+
+def _app_info(app: Optional[App]) -> Optional[Dict[str, Any]]:
+    """应用缓存中保存的基本信息"""
+    if not app:
+        return None
+    return {"id": app.id, "app_key": app.app_key, "app_name": app.app_name, "status": app.status}
+
+
+def _load_app_info(app_key: str) -> Optional[Dict[str, Any]]:
+    """
+    应用缓存的后台刷新：在刷新线程中使用独立会话查询，不复用请求的会话
+    
+    Args:
+        app_key: 应用标识
+        
+    Returns:
+        应用基本信息，应用不存在返回 None
+    """
+    db = database.create_session()
+    try:
+        return _app_info(db.query(App).filter(App.app_key == app_key).first())
+    finally:
+        db.close()
+
+
+@ttl_cache(maxsize=1024, ttl=settings.APP_CACHE_TTL, cache_name="app_by_key",
+           key_func=lambda app_key: app_key, negative_ttl=settings.APP_CACHE_NEGATIVE_TTL,
+           stale_ttl=settings.APP_CACHE_STALE_TTL)
+async def get_app_info_async(app_key: str) -> Optional[Dict[str, Any]]:
+    """
+    根据app_key获取应用基本信息（异步登录路径使用）
+    
+    与 AppService.get_app_info_by_key 共用 app_by_key 命名空间，失效通知同时作用于两者；
+    在进入 run_sync 之前调用，共享缓存后端的读写在线程中执行，查库使用独立的异步会话，不阻塞事件循环
+    
+    Args:
+        app_key: 应用标识
+        
+    Returns:
+        {"id", "app_key", "app_name", "status"}，应用不存在返回 None
+    """
+    async with database.create_async_session() as db:
+        result = await db.execute(select(App).where(App.app_key == app_key))
+        return _app_info(result.scalars().first())
 
 
 class AppService:
@@ -50,8 +109,12 @@ class AppService:
         )
         
         self.db.add(new_app)
+        self.db.flush()
+        ensure_app_stats_rows(self.db, [new_app.id])
         self.db.commit()
         self.db.refresh(new_app)
+        # 登录时查询过的不存在的 app_key 会被负缓存，创建后立即失效
+        AppService.get_app_info_by_key.invalidate(self, app_key)
         
         logger.info(f"创建应用成功: {app_name} (app_key: {app_key})")
         
@@ -90,6 +153,24 @@ class AppService:
         """
         return self.db.query(App).filter(App.app_key == app_key).first()
     
+    @ttl_cache(maxsize=1024, ttl=settings.APP_CACHE_TTL, cache_name="app_by_key",
+               key_func=lambda self, app_key: app_key, negative_ttl=settings.APP_CACHE_NEGATIVE_TTL,
+               stale_ttl=settings.APP_CACHE_STALE_TTL, refresh_loader=_load_app_info)
+    def get_app_info_by_key(self, app_key: str) -> Optional[Dict[str, Any]]:
+        """
+        根据app_key获取应用基本信息（登录时使用，结果按 app_key 缓存）
+        
+        应用状态变更、删除、创建时主动失效；不存在的 app_key 按 APP_CACHE_NEGATIVE_TTL 缓存；
+        过期后的后台刷新由 _load_app_info 使用独立会话完成；配置共享缓存后端时所有 worker 共用
+        
+        Args:
+            app_key: 应用标识
+            
+        Returns:
+            {"id", "app_key", "app_name", "status"}，应用不存在返回 None
+        """
+        return _app_info(self.get_app_by_key(app_key))
+    
     def update_app_status(
         self,
         app_id: int,
@@ -120,6 +201,7 @@ class AppService:
         
         self.db.commit()
         self.db.refresh(app)
+        AppService.get_app_info_by_key.invalidate(self, app.app_key)
         
         logger.info(f"更新应用状态: {app.app_name} (ID: {app_id}), {old_status} -> {new_status}")
         
@@ -149,6 +231,10 @@ class AppService:
         """
         批量删除应用
         
+        先用一条查询找出不存在的ID和默认应用，再按 BATCH_DELETE_CHUNK_SIZE 分块，
+        每块删除应用下的 Token、卡密及其绑定、生成任务和统计汇总，一个分块一个事务；
+        卡密的子表按 card_id IN (SELECT id FROM cards ...) 删除，不把卡密ID加载到内存
+        
         Args:
             app_ids: 要删除的应用ID列表
             
@@ -158,56 +244,64 @@ class AppService:
         if not app_ids:
             return 0, [], "应用ID列表不能为空"
         
-        deleted_count = 0
-        failed_ids = []
+        app_ids = list(dict.fromkeys(app_ids))
+        app_keys = dict(self.db.query(App.id, App.app_key).filter(App.id.in_(app_ids)).all())
         
+        failed_ids = []
+        ids_to_delete = []
         for app_id in app_ids:
+            if app_id not in app_keys:
+                logger.warning(f"应用不存在，跳过删除: ID {app_id}")
+                failed_ids.append(app_id)
+            elif app_keys[app_id] == 'default_app':
+                # 默认应用（app_key 为 default_app）不能删除
+                logger.warning(f"不能删除默认应用: ID {app_id}")
+                failed_ids.append(app_id)
+            else:
+                ids_to_delete.append(app_id)
+        
+        chunk_size = settings.BATCH_DELETE_CHUNK_SIZE
+        deleted_count = 0
+        
+        for start in range(0, len(ids_to_delete), chunk_size):
+            chunk = ids_to_delete[start:start + chunk_size]
             try:
-                # 查询应用是否存在
-                app = self.get_app_by_id(app_id)
-                if not app:
-                    logger.warning(f"应用不存在，跳过删除: ID {app_id}")
-                    failed_ids.append(app_id)
-                    continue
-                
-                # 检查是否是默认应用（app_key 为 default_app）
-                if app.app_key == 'default_app':
-                    logger.warning(f"不能删除默认应用: {app.app_name} (app_key: {app.app_key})")
-                    failed_ids.append(app_id)
-                    continue
+                # 先删除这些应用下的所有 Token（避免外键约束问题），吊销列表需要 Token 原文
+                app_tokens = self.db.query(UserToken.token, UserToken.expire_time).filter(
+                    UserToken.app_id.in_(chunk)
+                ).all()
+                self.db.query(UserToken).filter(UserToken.app_id.in_(chunk)).delete(synchronize_session=False)
                 
-                # 先删除该应用下的所有 Token（避免外键约束问题）
-                from app.models.user_token import UserToken
-                self.db.query(UserToken).filter(UserToken.app_id == app_id).delete()
+                # 删除卡密的设备绑定、用户绑定、权限关联，再删除卡密
+                app_card_ids = select(Card.id).where(Card.app_id.in_(chunk))
+                self.db.query(CardDevice).filter(CardDevice.card_id.in_(app_card_ids)).delete(synchronize_session=False)
+                self.db.query(UserCard).filter(UserCard.card_id.in_(app_card_ids)).delete(synchronize_session=False)
+                self.db.query(CardPermission).filter(CardPermission.card_id.in_(app_card_ids)).delete(synchronize_session=False)
+                self.db.query(Card).filter(Card.app_id.in_(chunk)).delete(synchronize_session=False)
                 
-                # 删除该应用下的所有卡密（会级联删除卡密的绑定关系）
-                from app.models.card import Card
-                from app.models.user_card import UserCard
-                from app.models.card_device import CardDevice
-                
-                # 获取该应用下的所有卡密ID
-                card_ids = [card.id for card in self.db.query(Card).filter(Card.app_id == app_id).all()]
-                
-                # 删除卡密的设备绑定
-                if card_ids:
-                    self.db.query(CardDevice).filter(CardDevice.card_id.in_(card_ids)).delete(synchronize_session=False)
-                    # 删除卡密的用户绑定
-                    self.db.query(UserCard).filter(UserCard.card_id.in_(card_ids)).delete(synchronize_session=False)
-                    # 删除卡密
-                    self.db.query(Card).filter(Card.app_id == app_id).delete()
-                
-                # 最后删除应用
-                self.db.delete(app)
+                # 删除卡密生成任务和统计汇总，最后删除应用
+                self.db.query(CardGenerateJob).filter(CardGenerateJob.app_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(AppStats).filter(AppStats.app_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(App).filter(App.id.in_(chunk)).delete(synchronize_session=False)
                 self.db.commit()
                 
-                deleted_count += 1
-                logger.info(f"成功删除应用: {app.app_name} (ID: {app_id})")
+                # 这些应用下的Token加入吊销列表
+                for app_token, expire_time in app_tokens:
+                    token_revocation.revoke_token(app_token, expire_time.timestamp())
+                    token_cache.invalidate_token(app_token)
+                # 被删除的卡密数量可能很大，直接清空权限快照缓存，不逐个卡密失效
+                permission_cache.clear()
+                for app_id in chunk:
+                    AppService.get_app_info_by_key.invalidate(self, app_keys[app_id])
+                
+                deleted_count += len(chunk)
                 
             except Exception as e:
                 self.db.rollback()
-                logger.error(f"删除应用失败: ID {app_id}, 错误: {str(e)}")
-                failed_ids.append(app_id)
+                logger.error(f"删除应用失败: ID {chunk}, 错误: {str(e)}")
+                failed_ids.extend(chunk)
         
+        logger.info(f"批量删除应用完成: 成功 {deleted_count} 个，失败 {len(failed_ids)} 个")
         return deleted_count, failed_ids, None
     
     def _generate_app_key(self, app_name: str) -> str:
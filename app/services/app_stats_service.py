@@ -0,0 +1,268 @@
+"""
+应用统计汇总服务
+维护 app_stats 计数器：写路径在自己的事务中调用这里的函数增量更新，reconcile_app_stats 从头重新统计
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.app import App
+from app.models.app_stats import AppStats
+from app.models.card import Card, CardStatus
+from app.models.card_device import CardDevice, CardDeviceStatus
+from app.models.user_card import UserCard, UserCardStatus
+
+
+# 卡密状态 -> 计数列
+CARD_STATUS_COUNTERS = {
+    CardStatus.UNUSED: "cards_unused",
+    CardStatus.USED: "cards_used",
+    CardStatus.DISABLED: "cards_disabled",
+}
+
+APP_STATS_COUNTERS = (
+    "cards_unused", "cards_used", "cards_disabled",
+    "active_bindings", "active_devices", "registered_users"
+)
+
+
+def ensure_app_stats_rows(db: Session, app_ids: Iterable[int]) -> None:
+    """
+    为应用创建计数为 0 的统计行（已存在的忽略）
+
+    Args:
+        db: 数据库会话
+        app_ids: 应用ID列表
+    """
+    rows = [{"app_id": app_id} for app_id in set(app_ids)]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = insert(AppStats).prefix_with("IGNORE")
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        stmt = pg_insert(AppStats).on_conflict_do_nothing(index_elements=["app_id"])
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(AppStats).on_conflict_do_nothing(index_elements=["app_id"])
+    else:
+        raise ValueError(f"不支持的数据库类型: {dialect}")
+
+    db.execute(stmt.values(rows))
+
+
+def apply_app_stats_delta(db: Session, app_id: int, **deltas: int) -> None:
+    """
+    增量更新一个应用的计数器（UPDATE col = col + delta，不提交事务）
+
+    Args:
+        db: 数据库会话
+        app_id: 应用ID
+        **deltas: 计数列 -> 增量，如 cards_unused=100
+    """
+    values = {
+        column: getattr(AppStats, column) + delta
+        for column, delta in deltas.items() if delta
+    }
+    if not values:
+        return
+
+    stmt = (
+        update(AppStats)
+        .where(AppStats.app_id == app_id)
+        .values(updated_at=func.now(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount == 0:
+        # 统计行不存在（迁移前创建的应用），先补一行再更新
+        ensure_app_stats_rows(db, [app_id])
+        db.execute(stmt)
+
+
+def card_status_delta(old_status: Optional[CardStatus], new_status: Optional[CardStatus]) -> Dict[str, int]:
+    """
+    卡密状态变化对应的计数增量
+
+    Args:
+        old_status: 原状态，None 表示新建
+        new_status: 新状态，None 表示删除
+
+    Returns:
+        计数列 -> 增量
+    """
+    deltas: Dict[str, int] = defaultdict(int)
+    if old_status == new_status:
+        return deltas
+    if old_status is not None:
+        deltas[CARD_STATUS_COUNTERS[CardStatus(old_status)]] -= 1
+    if new_status is not None:
+        deltas[CARD_STATUS_COUNTERS[CardStatus(new_status)]] += 1
+    return deltas
+
+
+def user_has_active_binding(db: Session, user_id: int, app_id: int, exclude_card_id: Optional[int] = None) -> bool:
+    """
+    判断用户在应用下是否有激活的卡密绑定（用于维护 registered_users）
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        app_id: 应用ID
+        exclude_card_id: 不计入的卡密ID（正在绑定/解绑的卡密）
+
+    Returns:
+        是否存在
+    """
+    query = db.query(UserCard.id).join(Card, UserCard.card_id == Card.id).filter(
+        UserCard.user_id == user_id,
+        UserCard.status == UserCardStatus.ACTIVE,
+        Card.app_id == app_id
+    )
+    if exclude_card_id is not None:
+        query = query.filter(UserCard.card_id != exclude_card_id)
+    return query.first() is not None
+
+
+def binding_counts_by_app(db: Session, *conditions) -> Dict[int, Dict[str, int]]:
+    """
+    按应用统计激活的绑定数和绑定用户数
+
+    Args:
+        db: 数据库会话
+        *conditions: user_cards / cards 上的附加过滤条件
+
+    Returns:
+        {app_id: {"active_bindings": n, "registered_users": n}}
+    """
+    rows = db.query(
+        Card.app_id, func.count(UserCard.id), func.count(func.distinct(UserCard.user_id))
+    ).join(Card, UserCard.card_id == Card.id).filter(
+        UserCard.status == UserCardStatus.ACTIVE, *conditions
+    ).group_by(Card.app_id).all()
+    return {
+        app_id: {"active_bindings": bindings, "registered_users": users}
+        for app_id, bindings, users in rows
+    }
+
+
+def card_counts_by_app(db: Session, *conditions) -> Dict[int, Dict[str, int]]:
+    """
+    按应用统计卡密状态和激活设备数
+
+    Args:
+        db: 数据库会话
+        *conditions: cards 上的附加过滤条件
+
+    Returns:
+        {app_id: {"cards_unused": n, "cards_used": n, "cards_disabled": n, "active_devices": n}}
+    """
+    counts: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    for app_id, status, count in db.query(Card.app_id, Card.status, func.count()).filter(
+        *conditions
+    ).group_by(Card.app_id, Card.status).all():
+        counts[app_id][CARD_STATUS_COUNTERS[CardStatus(status)]] = count
+
+    for app_id, count in db.query(Card.app_id, func.count(CardDevice.id)).join(
+        Card, CardDevice.card_id == Card.id
+    ).filter(
+        CardDevice.status == CardDeviceStatus.ACTIVE, *conditions
+    ).group_by(Card.app_id).all():
+        counts[app_id]["active_devices"] = count
+
+    return counts
+
+
+def remove_cards_from_app_stats(db: Session, card_ids: List[int]) -> List[int]:
+    """
+    删除卡密前扣减计数（卡密状态、绑定数、设备数）
+
+    绑定用户数无法按差值扣减（用户可能还持有同应用的其他卡密），
+    删除完成后需对返回的应用调用 recount_registered_users
+
+    Args:
+        db: 数据库会话
+        card_ids: 即将删除的卡密ID列表
+
+    Returns:
+        受影响的应用ID列表
+    """
+    if not card_ids:
+        return []
+
+    card_counts = card_counts_by_app(db, Card.id.in_(card_ids))
+    binding_counts = binding_counts_by_app(db, UserCard.card_id.in_(card_ids))
+
+    app_ids = sorted(set(card_counts) | set(binding_counts))
+    for app_id in app_ids:
+        deltas = {column: -count for column, count in card_counts.get(app_id, {}).items()}
+        deltas["active_bindings"] = -binding_counts.get(app_id, {}).get("active_bindings", 0)
+        apply_app_stats_delta(db, app_id, **deltas)
+    return app_ids
+
+
+def recount_registered_users(db: Session, app_ids: List[int]) -> None:
+    """
+    重新统计指定应用的绑定用户数
+
+    Args:
+        db: 数据库会话
+        app_ids: 应用ID列表
+    """
+    if not app_ids:
+        return
+    counts = binding_counts_by_app(db, Card.app_id.in_(app_ids))
+    for app_id in app_ids:
+        db.execute(
+            update(AppStats)
+            .where(AppStats.app_id == app_id)
+            .values(registered_users=counts.get(app_id, {}).get("registered_users", 0), updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def reconcile_app_stats(db: Session, app_ids: Optional[List[int]] = None) -> int:
+    """
+    从 cards / user_cards / card_devices 重新统计 app_stats（不提交事务）
+
+    Args:
+        db: 数据库会话
+        app_ids: 只统计这些应用，None 表示全部应用（同时删除已不存在应用的统计行）
+
+    Returns:
+        重新统计的应用数量
+    """
+    reconcile_all = app_ids is None
+    app_query = db.query(App.id)
+    if not reconcile_all:
+        app_query = app_query.filter(App.id.in_(app_ids))
+    app_ids = [app_id for (app_id,) in app_query.all()]
+
+    if reconcile_all:
+        stale_rows = db.query(AppStats)
+        if app_ids:
+            stale_rows = stale_rows.filter(AppStats.app_id.notin_(app_ids))
+        stale_rows.delete(synchronize_session=False)
+    if not app_ids:
+        return 0
+
+    card_counts = card_counts_by_app(db, Card.app_id.in_(app_ids))
+    binding_counts = binding_counts_by_app(db, Card.app_id.in_(app_ids))
+
+    ensure_app_stats_rows(db, app_ids)
+    for app_id in app_ids:
+        values = {column: 0 for column in APP_STATS_COUNTERS}
+        values.update(card_counts.get(app_id, {}))
+        values.update(binding_counts.get(app_id, {}))
+        db.execute(
+            update(AppStats)
+            .where(AppStats.app_id == app_id)
+            .values(updated_at=func.now(), **values)
+            .execution_options(synchronize_session=False)
+        )
+
+    return len(app_ids)
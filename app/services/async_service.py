@@ -0,0 +1,41 @@
+"""
+异步服务适配层
+在 AsyncSession 上复用同步服务的业务逻辑，数据库IO通过异步驱动完成，不阻塞事件循环
+"""
+from typing import Any, Type
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+class AsyncServiceAdapter:
+    """
+    异步服务基类
+
+    子类指定 service_class，每个异步方法通过 AsyncSession.run_sync 调用同名的同步方法。
+    run_sync 内部的查询、flush、commit 都会经由异步驱动执行，
+    因此业务逻辑只需要维护一份，同步路径（脚本、alembic）保持不变
+    """
+
+    service_class: Type = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _run(self, method_name: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        在异步会话上执行同步服务方法
+
+        Args:
+            method_name: 同步服务的方法名
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            同步方法的返回值
+        """
+        def call(sync_session: Session) -> Any:
+            service = self.service_class(sync_session)
+            return getattr(service, method_name)(*args, **kwargs)
+
+        return await self.db.run_sync(call)
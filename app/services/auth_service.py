@@ -3,8 +3,9 @@
 处理用户注册、登录、Token验证等业务逻辑
 """
 from datetime import datetime, timedelta
-from typing import Optional, Tuple, List
+from typing import Any, Dict, Optional, Tuple, List
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_
 from loguru import logger
 
@@ -12,10 +13,15 @@ from app.models.user import User, UserStatus, UserRole
 from app.models.app import App, AppStatus
 from app.models.user_token import UserToken
 from app.models.user_card import UserCard, UserCardStatus
-from app.utils.security import hash_password, verify_password, create_access_token
+from app.utils.security import hash_password, verify_password, password_needs_rehash, create_access_token, decode_access_token
+from app.utils.token_revocation import token_revocation
+from app.utils.token_cache import token_cache
+from app.utils.permission_cache import permission_cache
+from app.utils.password_hasher import password_hasher
 from app.core.config import settings
-import colorama
-
+from app.core.logging_uru import mask_token
+from app.services.async_service import AsyncServiceAdapter
+from app.services.app_stats_service import apply_app_stats_delta, binding_counts_by_app
 
 
 class AuthService:
@@ -24,13 +30,19 @@ class AuthService:
     def __init__(self, db: Session):
         self.db = db
     
-    def register(self, username: str, password: str) -> Tuple[Optional[User], Optional[str]]:
+    def register(
+        self,
+        username: str,
+        password: str,
+        password_hash: Optional[str] = None
+    ) -> Tuple[Optional[User], Optional[str]]:
         """
         用户注册
         
         Args:
             username: 用户名
             password: 密码
+            password_hash: 已在密码哈希线程池中生成的哈希，None 时在当前线程生成
             
         Returns:
             (用户对象, 错误信息)，成功时错误信息为None
@@ -43,7 +55,7 @@ class AuthService:
                 return None, "用户名已存在"
             
             # 创建新用户
-            hashed_password = hash_password(password)
+            hashed_password = password_hash or hash_password(password)
             new_user = User(
                 username=username,
                 password_hash=hashed_password,
@@ -67,7 +79,11 @@ class AuthService:
         username: str,
         password: str,
         app_key: str,
-        device_id: str
+        device_id: str,
+        password_verified: Optional[bool] = None,
+        new_password_hash: Optional[str] = None,
+        app_info: Optional[Dict[str, Any]] = None,
+        verified_hash: Optional[str] = None
     ) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
         """
         用户登录
@@ -77,17 +93,25 @@ class AuthService:
             password: 密码
             app_key: 应用标识
             device_id: 设备标识
+            password_verified: 已在密码哈希线程池中完成的校验结果，None 时在当前线程校验
+            new_password_hash: 已在密码哈希线程池中按当前配置重新生成的哈希，None 时需要时在当前线程生成
+            app_info: 已在异步路径中查询的应用信息（get_app_info_async），None 时在当前会话中查询
+            verified_hash: password_verified 校验时使用的密码哈希；与当前哈希不一致（期间修改了密码）时登录失败
             
         Returns:
             (token, 用户信息, 错误信息)
         """
         try:
-            # 验证应用是否存在且有效
-            app = self.db.query(App).filter(App.app_key == app_key).first()
+            # 验证应用是否存在且有效（按 app_key 缓存）
+            # 延迟导入：app_service 导入 app.utils 时会加载 dependencies -> auth_service
+            if app_info is None:
+                from app.services.app_service import AppService
+                app_info = AppService(self.db).get_app_info_by_key(app_key)
+            app = app_info
             if not app:
                 logger.warning(f"登录失败: 应用不存在 - {app_key}")
                 return None, None, "应用不存在"
-            if app.status == AppStatus.DISABLED:
+            if app["status"] == AppStatus.DISABLED:
                 logger.warning(f"登录失败: 应用已被禁用 - {app_key}")
                 return None, None, "应用已被禁用"
             
@@ -97,7 +121,13 @@ class AuthService:
                 logger.warning(f"登录失败: 用户名不存在 - {username}")
                 return None, None, "用户名或密码错误"
             
-            if not verify_password(password, user.password_hash):
+            if password_verified is None:
+                verified_hash = user.password_hash
+                password_verified = verify_password(password, verified_hash)
+            elif verified_hash != user.password_hash:
+                logger.warning(f"登录失败: 校验期间密码已变更 - {username}")
+                return None, None, "用户名或密码错误"
+            if not password_verified:
                 logger.warning(f"登录失败: 密码错误 - {username}")
                 return None, None, "用户名或密码错误"
             
@@ -106,6 +136,16 @@ class AuthService:
                 logger.warning(f"登录失败: 用户已被封禁 - {username}")
                 return None, None, "用户已被封禁"
             
+            # 哈希算法或轮数与当前配置不一致时重新哈希，随本次登录一起提交；
+            # 只在哈希仍是校验时的值时更新，不覆盖期间修改的密码
+            if password_needs_rehash(verified_hash):
+                updated = self.db.query(User).filter(
+                    User.id == user.id,
+                    User.password_hash == verified_hash
+                ).update({User.password_hash: new_password_hash or hash_password(password)})
+                if updated:
+                    logger.info(f"用户密码哈希已更新: {username}")
+            
             # 更新最后登录时间
             user.last_login_at = datetime.now()
             
@@ -113,7 +153,7 @@ class AuthService:
             token_data = {
                 "user_id": user.id,
                 "username": user.username,
-                "app_id": app.id,
+                "app_id": app["id"],
                 "device_id": device_id,
                 "role": user.role.value
             }
@@ -123,24 +163,31 @@ class AuthService:
             token_expire = datetime.now() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
             user_token = UserToken(
                 user_id=user.id,
-                app_id=app.id,
+                app_id=app["id"],
                 token=token,
                 device_id=device_id,
                 expire_time=token_expire
             )
             
             # 删除该用户在该应用该设备上的旧Token（如果存在）
-            self.db.query(UserToken).filter(
+            old_tokens_query = self.db.query(UserToken).filter(
                 and_(
                     UserToken.user_id == user.id,
-                    UserToken.app_id == app.id,
+                    UserToken.app_id == app["id"],
                     UserToken.device_id == device_id
                 )
-            ).delete()
+            )
+            replaced_tokens = old_tokens_query.with_entities(UserToken.token, UserToken.expire_time).all()
+            old_tokens_query.delete()
             
             self.db.add(user_token)
             self.db.commit()
             
+            # 被替换的旧Token加入吊销列表（无状态校验模式下不再查询数据库）
+            for old_token, old_expire_time in replaced_tokens:
+                token_revocation.revoke_token(old_token, old_expire_time.timestamp())
+                token_cache.invalidate_token(old_token)
+            
             # 检查用户是否已绑定卡密
             has_card = self._check_user_has_card(user.id)
             
@@ -160,41 +207,104 @@ class AuthService:
             logger.error(f"用户登录异常: {username} - {str(e)}")
             return None, None, f"登录失败: {str(e)}"
     
+    def get_password_hash(self, username: str) -> Optional[str]:
+        """
+        查询用户的密码哈希（异步登录先取出哈希，在线程池中校验后再调用 login）
+        
+        Args:
+            username: 用户名
+            
+        Returns:
+            密码哈希，用户不存在时为 None
+        """
+        return self.db.query(User.password_hash).filter(User.username == username).scalar()
+    
     def verify_token(self, token: str) -> Tuple[Optional[dict], Optional[str]]:
         """
         验证Token
         
+        根据 settings.TOKEN_VERIFY_MODE 选择校验方式：
+        - strict: 查询 user_tokens 和 users 表（默认）
+        - stateless: 本地校验JWT签名和过期时间，只检查进程内吊销列表，不访问数据库
+        
         Args:
             token: JWT Token
             
         Returns:
             (用户信息, 错误信息)
         """
-        print(colorama.Fore.CYAN + f" [AuthService] 开始验证Token: {token[:20]}...")
+        if settings.TOKEN_VERIFY_MODE == "stateless":
+            return self._verify_token_stateless(token)
+        return self._verify_token_strict(token)
+    
+    def _verify_token_stateless(self, token: str) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        无状态校验Token
         
+        被封禁、删除的用户以及登出、被替换的Token通过吊销列表拒绝，
+        因此通过校验的用户状态一定是正常。吊销列表不持久化，
+        本进程启动之前签发的Token回退到数据库校验，避免重启后已吊销的Token重新生效
+        
+        Args:
+            token: JWT Token
+            
+        Returns:
+            (用户信息, 错误信息)
+        """
+        payload = decode_access_token(token)
+        if not payload or payload.get("user_id") is None:
+            return None, "Token无效或已过期"
+        
+        user_id = payload["user_id"]
+        issued_at = payload.get("iat")
+        if not token_revocation.covers(issued_at):
+            return self._verify_token_strict(token)
+        if token_revocation.is_revoked(token, user_id, issued_at):
+            logger.debug("Token已被吊销: user_id={}", user_id)
+            return None, "Token已失效"
+        
+        user_info = {
+            "user_id": user_id,
+            "username": payload.get("username"),
+            "status": UserStatus.NORMAL.value,
+            "role": payload.get("role"),
+            "app_id": payload.get("app_id"),
+            "device_id": payload.get("device_id")
+        }
+        
+        return user_info, None
+    
+    def _verify_token_strict(self, token: str) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        查询数据库校验Token
+        
+        Args:
+            token: JWT Token
+            
+        Returns:
+            (用户信息, 错误信息)
+        """
         # 从数据库查询Token
         user_token = self.db.query(UserToken).filter(UserToken.token == token).first()
         if not user_token:
-            print(colorama.Fore.RED + " [AuthService] Token不存在")
+            logger.opt(lazy=True).debug("Token不存在: {}", lambda: mask_token(token))
             return None, "Token无效"
         
         # 检查Token是否过期
         if user_token.expire_time < datetime.now():
-            print(colorama.Fore.RED + f" [AuthService] Token已过期: {user_token.expire_time}")
+            logger.debug("Token已过期: user_id={}, expire_time={}", user_token.user_id, user_token.expire_time)
             return None, "Token已过期"
         
         # 获取用户信息
         user = self.db.query(User).filter(User.id == user_token.user_id).first()
         if not user:
-            print(colorama.Fore.RED + f" [AuthService] 用户不存在: user_id={user_token.user_id}")
+            logger.debug("Token对应的用户不存在: user_id={}", user_token.user_id)
             return None, "用户不存在"
         
         # 检查用户状态
         if user.status == UserStatus.BANNED:
-            print(colorama.Fore.RED + f" [AuthService] 用户已被封禁: {user.username}")
+            logger.debug("Token对应的用户已被封禁: user_id={}", user.id)
             return None, "用户已被封禁"
-            
-        print(colorama.Fore.GREEN + f" [AuthService] 验证通过: {user.username}")
         
         # 构造用户信息
         user_info = {
@@ -226,8 +336,12 @@ class AuthService:
             result = self.db.query(UserToken).filter(UserToken.token == token).delete()
             self.db.commit()
             
+            # 无论数据库中是否存在，都清除该Token的缓存
+            token_cache.invalidate_token(token)
+            
             if result > 0:
                 if user_token:
+                    token_revocation.revoke_token(token, user_token.expire_time.timestamp())
                     logger.info(f"用户登出成功: user_id={user_token.user_id}, device={user_token.device_id}")
                 return True, None
             
@@ -285,6 +399,9 @@ class AuthService:
         """
         批量删除用户
         
+        先用一条查询找出不存在的ID和管理员账户，再按 BATCH_DELETE_CHUNK_SIZE 分块，
+        每块用 IN (...) 删除 Token、卡密绑定和用户，一个分块一个事务
+        
         Args:
             user_ids: 要删除的用户ID列表
             
@@ -294,42 +411,56 @@ class AuthService:
         if not user_ids:
             return 0, [], "用户ID列表不能为空"
         
-        deleted_count = 0
-        failed_ids = []
+        user_ids = list(dict.fromkeys(user_ids))
+        roles = dict(self.db.query(User.id, User.role).filter(User.id.in_(user_ids)).all())
         
+        failed_ids = []
+        ids_to_delete = []
         for user_id in user_ids:
-            try:
-                # 查询用户是否存在
-                user = self.get_user_by_id(user_id)
-                if not user:
-                    logger.warning(f"用户不存在，跳过删除: ID {user_id}")
-                    failed_ids.append(user_id)
-                    continue
-                
+            if user_id not in roles:
+                logger.warning(f"用户不存在，跳过删除: ID {user_id}")
+                failed_ids.append(user_id)
+            elif roles[user_id] == UserRole.ADMIN:
                 # 不允许删除管理员账户
-                if user.role == UserRole.ADMIN:
-                    logger.warning(f"不允许删除管理员账户: {user.username} (ID: {user_id})")
-                    failed_ids.append(user_id)
-                    continue
-                
-                # 先删除用户的所有 Token（避免外键约束问题）
-                self.db.query(UserToken).filter(UserToken.user_id == user_id).delete()
-                
-                # 删除用户的所有卡密绑定
-                self.db.query(UserCard).filter(UserCard.user_id == user_id).delete()
+                logger.warning(f"不允许删除管理员账户: ID {user_id}")
+                failed_ids.append(user_id)
+            else:
+                ids_to_delete.append(user_id)
+        
+        chunk_size = settings.BATCH_DELETE_CHUNK_SIZE
+        deleted_count = 0
+        
+        for start in range(0, len(ids_to_delete), chunk_size):
+            chunk = ids_to_delete[start:start + chunk_size]
+            try:
+                # 扣减应用统计中这些用户的绑定数和用户数
+                for app_id, counts in binding_counts_by_app(self.db, UserCard.user_id.in_(chunk)).items():
+                    apply_app_stats_delta(
+                        self.db, app_id,
+                        active_bindings=-counts["active_bindings"],
+                        registered_users=-counts["registered_users"]
+                    )
                 
-                # 最后删除用户
-                self.db.delete(user)
+                # 先删除 Token 和卡密绑定（避免外键约束问题），最后删除用户
+                self.db.query(UserToken).filter(UserToken.user_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(UserCard).filter(UserCard.user_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(User).filter(User.id.in_(chunk)).delete(synchronize_session=False)
                 self.db.commit()
                 
-                deleted_count += 1
-                logger.info(f"成功删除用户: {user.username} (ID: {user_id})")
+                # 吊销这些用户已签发的所有Token
+                for user_id in chunk:
+                    token_revocation.revoke_user(user_id)
+                    token_cache.invalidate_user(user_id)
+                    permission_cache.invalidate_user(user_id)
+                
+                deleted_count += len(chunk)
                 
             except Exception as e:
                 self.db.rollback()
-                logger.error(f"删除用户失败: ID {user_id}, 错误: {str(e)}")
-                failed_ids.append(user_id)
+                logger.error(f"删除用户失败: ID {chunk[0]}~{chunk[-1]}（{len(chunk)} 个）, 错误: {str(e)}")
+                failed_ids.extend(chunk)
         
+        logger.info(f"批量删除用户完成: 成功 {deleted_count} 个，失败 {len(failed_ids)} 个")
         return deleted_count, failed_ids, None
 
 
@@ -344,3 +475,62 @@ def get_auth_service(db: Session) -> AuthService:
         AuthService实例
     """
     return AuthService(db)
+
+
+class AsyncAuthService(AsyncServiceAdapter):
+    """
+    认证服务的异步版本
+    
+    与 AuthService 的方法一一对应，在 AsyncSession 上执行，不阻塞事件循环
+    """
+    
+    service_class = AuthService
+    
+    async def register(self, username: str, password: str) -> Tuple[Optional[User], Optional[str]]:
+        # bcrypt 在密码哈希线程池中计算，线程池已满时抛出 PasswordHasherBusy
+        password_hash = await password_hasher.hash(password)
+        return await self._run("register", username, password, password_hash)
+    
+    async def login(self, username: str, password: str, app_key: str, device_id: str) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
+        # bcrypt 在密码哈希线程池中校验，线程池已满时抛出 PasswordHasherBusy
+        password_hash = await self._run("get_password_hash", username)
+        password_verified = await password_hasher.verify(password, password_hash) if password_hash else False
+        new_password_hash = None
+        if password_verified and password_needs_rehash(password_hash):
+            new_password_hash = await password_hasher.hash(password)
+        # 应用查询（包括共享缓存后端的读写）在进入 run_sync 之前完成，不在事件循环线程上执行阻塞IO
+        from app.services.app_service import get_app_info_async
+        app_info = await get_app_info_async(app_key)
+        return await self._run("login", username, password, app_key, device_id, password_verified,
+                               new_password_hash, app_info, password_hash)
+    
+    async def get_password_hash(self, username: str) -> Optional[str]:
+        return await self._run("get_password_hash", username)
+    
+    async def verify_token(self, token: str) -> Tuple[Optional[dict], Optional[str]]:
+        return await self._run("verify_token", token)
+    
+    async def logout(self, token: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("logout", token)
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        return await self._run("get_user_by_id", user_id)
+    
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        return await self._run("get_user_by_username", username)
+    
+    async def batch_delete_users(self, user_ids: List[int]) -> Tuple[int, List[int], Optional[str]]:
+        return await self._run("batch_delete_users", user_ids)
+
+
+def get_async_auth_service(db: AsyncSession) -> AsyncAuthService:
+    """
+    获取异步认证服务实例
+    
+    Args:
+        db: 异步数据库会话
+        
+    Returns:
+        AsyncAuthService实例
+    """
+    return AsyncAuthService(db)
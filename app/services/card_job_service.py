@@ -0,0 +1,471 @@
+"""
+卡密生成任务服务
+大批量卡密在后台线程池中分块生成，管理员通过任务接口轮询进度并下载结果
+"""
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.core.config import settings
+from app.db.sqlalchemy_db import database
+from app.models.app import App
+from app.models.card import CardStatus
+from app.models.card_job import CardGenerateJob, CardJobStatus
+from app.utils.card_generator import iter_insert_unique_cards
+from app.services.permission_service import insert_card_permission_rows
+from app.services.app_stats_service import apply_app_stats_delta
+from app.services.async_service import AsyncServiceAdapter
+
+
+class CardJobService:
+    """卡密生成任务服务类"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(
+        self,
+        app_id: int,
+        count: int,
+        expire_time: datetime,
+        max_device_count: int,
+        permissions: Union[List[str], Dict],
+        remark: Optional[str] = None,
+        created_by: Optional[int] = None
+    ) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        创建卡密生成任务（只写入任务记录，由 card_job_worker 执行）
+
+        Args:
+            app_id: 应用ID
+            count: 生成数量
+            expire_time: 过期时间
+            max_device_count: 最大设备数
+            permissions: 权限配置
+            remark: 备注
+            created_by: 创建任务的管理员ID
+
+        Returns:
+            (任务信息, 错误信息)
+        """
+        try:
+            # 验证应用是否存在
+            app = self.db.query(App).filter(App.id == app_id).first()
+            if not app:
+                return None, "应用不存在"
+
+            if app.status != "normal":
+                return None, "应用已禁用"
+
+            job = CardGenerateJob(
+                app_id=app_id,
+                created_by=created_by,
+                count=count,
+                generated=0,
+                status=CardJobStatus.PENDING,
+                expire_time=expire_time,
+                max_device_count=max_device_count,
+                permissions=permissions,
+                remark=remark
+            )
+            self.db.add(job)
+            self.db.commit()
+            self.db.refresh(job)
+
+            logger.info(f"创建卡密生成任务: job_id={job.id}, app_id={app_id}, count={count}")
+            return job_info(job), None
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"创建卡密生成任务失败: {e}")
+            return None, f"创建卡密生成任务失败: {str(e)}"
+
+    def get_job(self, job_id: int) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        查询任务状态和进度
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            (任务信息, 错误信息)
+        """
+        try:
+            job = self.db.query(CardGenerateJob).filter(CardGenerateJob.id == job_id).first()
+            if not job:
+                return None, "任务不存在"
+            return job_info(job), None
+
+        except Exception as e:
+            logger.error(f"查询卡密生成任务失败: {e}")
+            return None, f"查询卡密生成任务失败: {str(e)}"
+
+    def get_jobs_list(
+        self,
+        page: int = 1,
+        size: int = 20,
+        app_id: Optional[int] = None,
+        status: Optional[str] = None
+    ) -> Tuple[List[Dict], int, Optional[str]]:
+        """
+        查询任务列表
+
+        Args:
+            page: 页码
+            size: 每页数量
+            app_id: 应用ID筛选
+            status: 状态筛选
+
+        Returns:
+            (任务列表, 总数, 错误信息)
+        """
+        try:
+            query = self.db.query(CardGenerateJob)
+
+            if app_id:
+                query = query.filter(CardGenerateJob.app_id == app_id)
+
+            if status:
+                query = query.filter(CardGenerateJob.status == status)
+
+            total = query.count()
+            jobs = query.order_by(CardGenerateJob.id.desc()).offset((page - 1) * size).limit(size).all()
+
+            return [job_info(job) for job in jobs], total, None
+
+        except Exception as e:
+            logger.error(f"查询卡密生成任务列表失败: {e}")
+            return [], 0, f"查询卡密生成任务列表失败: {str(e)}"
+
+
+def job_info(job: CardGenerateJob) -> Dict[str, Any]:
+    """
+    把任务记录转换为接口返回的字典
+
+    Args:
+        job: 任务记录
+
+    Returns:
+        任务信息（含进度百分比）
+    """
+    return {
+        "id": job.id,
+        "app_id": job.app_id,
+        "count": job.count,
+        "generated": job.generated,
+        "progress": round(job.generated * 100 / job.count, 2) if job.count else 0.0,
+        "status": job.status.value,
+        "expire_time": job.expire_time,
+        "max_device_count": job.max_device_count,
+        "permissions": job.permissions,
+        "remark": job.remark,
+        "error": job.error,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "created_at": job.created_at,
+    }
+
+
+class CardJobWorker:
+    """
+    卡密生成任务执行器
+
+    - 使用进程内线程池执行任务，不依赖外部消息队列
+    - 任务通过条件 UPDATE 领取：只有 pending 或租约已过期（heartbeat_at 超过 lease_seconds）的 running
+      任务能被领取，多个进程同时恢复同一任务时只有一个成功
+    - 每个分块的卡密、权限关联、generated 进度和心跳在同一事务中提交，进度按 owner 条件更新，
+      租约被其他进程接管后当前进程回滚该分块并退出，不会重复生成
+    - 应用关闭时当前分块提交后停止，任务退回 pending；启动时（CARD_JOB_RESUME_ON_STARTUP）
+      从已提交的进度处继续生成
+    """
+
+    def __init__(self, max_workers: int, chunk_size: int, lease_seconds: int = 60):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        # 进程标识：主机名 + 进程ID + 随机后缀（进程重启后 PID 可能复用）
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running_jobs: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.completed = 0
+        self.failed = 0
+
+    def start(self, resume: bool = True) -> None:
+        """
+        启动线程池，并恢复未完成的任务
+
+        Args:
+            resume: 是否恢复 pending 和租约已过期的 running 任务
+        """
+        with self._lock:
+            if self._executor is None:
+                self._stop_event.clear()
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="card-job"
+                )
+        logger.info(f"卡密生成任务线程池已启动，线程数 {self.max_workers}")
+
+        if resume:
+            self._resume_unfinished()
+
+    def submit(self, job_id: int) -> None:
+        """
+        提交任务到线程池（任务在线程中领取成功后才开始生成）
+
+        Args:
+            job_id: 任务ID
+        """
+        if self._executor is None:
+            self.start(resume=False)
+
+        with self._lock:
+            if job_id in self._running_jobs:
+                return
+            self._running_jobs.add(job_id)
+            future = self._executor.submit(self.run_job, job_id)
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(f, job_id))
+
+    def stop(self) -> None:
+        """停止线程池：未开始的任务取消，执行中的任务提交当前分块后退回 pending"""
+        self._stop_event.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取任务执行统计
+
+        Returns:
+            线程数、排队/执行中的任务数、完成与失败次数
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "chunk_size": self.chunk_size,
+                "lease_seconds": self.lease_seconds,
+                "active": len(self._running_jobs),
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def claim(self, db: Session, job_id: int) -> bool:
+        """
+        领取任务：条件 UPDATE 把 pending 或租约已过期的 running 任务改为由本进程执行
+
+        Args:
+            db: 数据库会话
+            job_id: 任务ID
+
+        Returns:
+            是否领取成功
+        """
+        now = datetime.now()
+        claimed = db.query(CardGenerateJob).filter(
+            CardGenerateJob.id == job_id,
+            self._claimable(now)
+        ).update({
+            CardGenerateJob.status: CardJobStatus.RUNNING,
+            CardGenerateJob.owner: self.owner,
+            CardGenerateJob.heartbeat_at: now,
+            CardGenerateJob.started_at: func.coalesce(CardGenerateJob.started_at, now),
+        }, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+
+    def _claimable(self, now: datetime):
+        """可领取的任务：pending，或 running 但租约已过期（执行进程已退出）或本来就由本进程持有"""
+        return or_(
+            CardGenerateJob.status == CardJobStatus.PENDING,
+            and_(
+                CardGenerateJob.status == CardJobStatus.RUNNING,
+                or_(
+                    CardGenerateJob.owner == self.owner,
+                    CardGenerateJob.heartbeat_at.is_(None),
+                    CardGenerateJob.heartbeat_at < now - timedelta(seconds=self.lease_seconds)
+                )
+            )
+        )
+
+    def run_job(self, job_id: int) -> None:
+        """
+        执行卡密生成任务
+
+        Args:
+            job_id: 任务ID
+        """
+        db = None
+        try:
+            db = database.create_session()
+            if not self.claim(db, job_id):
+                logger.info(f"卡密生成任务已由其他进程执行或已结束，跳过: job_id={job_id}")
+                return
+
+            job = db.query(CardGenerateJob).filter(CardGenerateJob.id == job_id).first()
+            logger.info(f"开始执行卡密生成任务: job_id={job_id}, 进度 {job.generated}/{job.count}")
+
+            card_values = {
+                "app_id": job.app_id,
+                "job_id": job.id,
+                "status": CardStatus.UNUSED,
+                "expire_time": job.expire_time,
+                "max_device_count": job.max_device_count,
+                "permissions": job.permissions,
+                "remark": job.remark,
+            }
+            count, generated = job.count, job.generated
+
+            while generated < count:
+                if self._stop_event.is_set():
+                    self._release(db, job_id)
+                    logger.info(f"卡密生成任务暂停，下次启动时继续: job_id={job_id}, 进度 {generated}/{count}")
+                    return
+
+                # 一个分块一个事务：卡密、权限关联、应用统计、进度和心跳一起提交
+                chunk_count = min(self.chunk_size, count - generated)
+                inserted = 0
+                for rows in iter_insert_unique_cards(db, chunk_count, card_values, chunk_size=chunk_count):
+                    insert_card_permission_rows(db, [card_id for card_id, _ in rows], job.permissions)
+                    apply_app_stats_delta(db, job.app_id, cards_unused=len(rows))
+                    inserted += len(rows)
+                if not self._advance(db, job_id, inserted):
+                    db.rollback()
+                    logger.warning(f"卡密生成任务已被其他进程接管，放弃当前分块: job_id={job_id}")
+                    return
+                db.commit()
+                generated += inserted
+
+            db.query(CardGenerateJob).filter(
+                CardGenerateJob.id == job_id, CardGenerateJob.owner == self.owner
+            ).update({
+                CardGenerateJob.status: CardJobStatus.COMPLETED,
+                CardGenerateJob.finished_at: datetime.now(),
+            }, synchronize_session=False)
+            db.commit()
+            with self._lock:
+                self.completed += 1
+            logger.info(f"卡密生成任务完成: job_id={job_id}, 共 {generated} 个")
+
+        except Exception as e:
+            logger.error(f"卡密生成任务失败: job_id={job_id}, 错误: {e}")
+            with self._lock:
+                self.failed += 1
+            if db is not None:
+                db.rollback()
+                self._mark_failed(db, job_id, str(e))
+        finally:
+            if db is not None:
+                db.close()
+
+    def _advance(self, db: Session, job_id: int, inserted: int) -> bool:
+        """在分块事务中累加进度并续约，只有仍持有任务时才更新（不提交事务）"""
+        updated = db.query(CardGenerateJob).filter(
+            CardGenerateJob.id == job_id,
+            CardGenerateJob.owner == self.owner,
+            CardGenerateJob.status == CardJobStatus.RUNNING
+        ).update({
+            CardGenerateJob.generated: CardGenerateJob.generated + inserted,
+            CardGenerateJob.heartbeat_at: datetime.now(),
+        }, synchronize_session=False)
+        return updated == 1
+
+    def _release(self, db: Session, job_id: int) -> None:
+        """停止时把本进程持有的任务退回 pending，下次启动时可以立即领取"""
+        db.query(CardGenerateJob).filter(
+            CardGenerateJob.id == job_id, CardGenerateJob.owner == self.owner
+        ).update({
+            CardGenerateJob.status: CardJobStatus.PENDING,
+            CardGenerateJob.owner: None,
+            CardGenerateJob.heartbeat_at: None,
+        }, synchronize_session=False)
+        db.commit()
+
+    def _mark_failed(self, db: Session, job_id: int, error: str) -> None:
+        """把本进程持有的任务标记为失败，已提交的分块保留"""
+        try:
+            db.query(CardGenerateJob).filter(
+                CardGenerateJob.id == job_id, CardGenerateJob.owner == self.owner
+            ).update({
+                CardGenerateJob.status: CardJobStatus.FAILED,
+                CardGenerateJob.error: error[:1000],
+                CardGenerateJob.finished_at: datetime.now(),
+            }, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"更新卡密生成任务状态失败: job_id={job_id}, 错误: {e}")
+
+    def _resume_unfinished(self) -> None:
+        """提交 pending 和租约已过期的 running 任务（是否能执行由 claim 决定）"""
+        db = None
+        try:
+            db = database.create_session()
+            job_ids = [
+                job_id for (job_id,) in db.query(CardGenerateJob.id).filter(
+                    self._claimable(datetime.now())
+                ).order_by(CardGenerateJob.id).all()
+            ]
+        except Exception as e:
+            logger.error(f"恢复卡密生成任务失败: {e}")
+            return
+        finally:
+            if db is not None:
+                db.close()
+
+        for job_id in job_ids:
+            self.submit(job_id)
+        if job_ids:
+            logger.info(f"恢复未完成的卡密生成任务: {job_ids}")
+
+    def _on_done(self, future: Future, job_id: int) -> None:
+        with self._lock:
+            self._running_jobs.discard(job_id)
+
+
+# 全局卡密生成任务执行器
+card_job_worker = CardJobWorker(
+    max_workers=settings.CARD_JOB_WORKERS,
+    chunk_size=settings.CARD_JOB_CHUNK_SIZE,
+    lease_seconds=settings.CARD_JOB_LEASE_SECONDS
+)
+
+
+class AsyncCardJobService(AsyncServiceAdapter):
+    """CardJobService 的异步版本"""
+
+    service_class = CardJobService
+
+    async def create_job(self, app_id: int, count: int, expire_time: datetime, max_device_count: int, permissions: Union[List[str], Dict], remark: Optional[str] = None, created_by: Optional[int] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        return await self._run("create_job", app_id, count, expire_time, max_device_count, permissions, remark, created_by)
+
+    async def get_job(self, job_id: int) -> Tuple[Optional[Dict], Optional[str]]:
+        return await self._run("get_job", job_id)
+
+    async def get_jobs_list(self, page: int = 1, size: int = 20, app_id: Optional[int] = None, status: Optional[str] = None) -> Tuple[List[Dict], int, Optional[str]]:
+        return await self._run("get_jobs_list", page, size, app_id, status)
+
+
+def get_async_card_job_service(db: AsyncSession) -> AsyncCardJobService:
+    """
+    获取异步卡密生成任务服务实例
+
+    Args:
+        db: 异步数据库会话
+
+    Returns:
+        AsyncCardJobService实例
+    """
+    return AsyncCardJobService(db)
@@ -5,13 +5,23 @@
 from datetime import datetime
 from typing import Optional, Tuple, List
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_, func
 
 from app.models.card import Card, CardStatus
 from app.models.user_card import UserCard, UserCardStatus
 from app.models.card_device import CardDevice, CardDeviceStatus
+from app.models.card_permission import CardPermission
 from app.models.app import App, AppStatus
 from app.core.logging_uru import logger
+from app.services.heartbeat_service import device_heartbeat
+from app.services.app_stats_service import (
+    apply_app_stats_delta, card_status_delta, user_has_active_binding,
+    remove_cards_from_app_stats, recount_registered_users
+)
+from app.utils.permission_cache import permission_cache
+from app.services.async_service import AsyncServiceAdapter
+from app.core.config import settings
 
 
 class CardService:
@@ -142,6 +152,13 @@ class CardService:
         if active_devices >= card.max_device_count:
             return None, f"设备数量已达上限（{card.max_device_count}个）"
         
+        # 应用统计增量：新设备绑定，首次绑定该卡密时增加绑定数，用户首次绑定该应用的卡密时增加用户数
+        stats_delta = {"active_devices": 1}
+        if not existing_binding:
+            stats_delta["active_bindings"] = 1
+            if not user_has_active_binding(self.db, user_id, card.app_id):
+                stats_delta["registered_users"] = 1
+        
         # 7. 创建用户-卡密绑定（如果不存在）
         if not existing_binding:
             user_card = UserCard(
@@ -165,10 +182,16 @@ class CardService:
         
         # 9. 更新卡密状态为已使用
         if card.status == CardStatus.UNUSED:
+            stats_delta.update(card_status_delta(card.status, CardStatus.USED))
             card.status = CardStatus.USED
         
+        apply_app_stats_delta(self.db, card.app_id, **stats_delta)
         self.db.commit()
         
+        # 新绑定的卡密可能改变该用户的有效权限
+        permission_cache.invalidate_user(user_id)
+        permission_cache.invalidate_cards([card.id])
+        
         logger.info(f"用户 {user_id} 成功绑定卡密 {card_key}，设备: {device_id}")
         
         # 10. 返回卡密信息
@@ -221,6 +244,11 @@ class CardService:
         if not device_binding:
             return False, "设备绑定不存在"
         
+        card = user_card.card
+        stats_delta = {}
+        if device_binding.status == CardDeviceStatus.ACTIVE:
+            stats_delta["active_devices"] = -1
+        
         # 3. 删除设备绑定
         self.db.delete(device_binding)
         
@@ -236,6 +264,9 @@ class CardService:
         # 5. 如果没有其他设备，解绑用户-卡密关系
         if remaining_devices == 0:
             user_card.status = UserCardStatus.UNBIND
+            stats_delta["active_bindings"] = -1
+            if not user_has_active_binding(self.db, user_id, card.app_id, exclude_card_id=card_id):
+                stats_delta["registered_users"] = -1
             
             # 检查是否还有其他用户绑定此卡密
             other_users = self.db.query(UserCard).filter(
@@ -248,11 +279,12 @@ class CardService:
             
             # 如果没有其他用户，将卡密状态改回未使用
             if other_users == 0:
-                card = self.db.query(Card).filter(Card.id == card_id).first()
-                if card:
-                    card.status = CardStatus.UNUSED
+                stats_delta.update(card_status_delta(card.status, CardStatus.UNUSED))
+                card.status = CardStatus.UNUSED
         
+        apply_app_stats_delta(self.db, card.app_id, **stats_delta)
         self.db.commit()
+        permission_cache.invalidate_cards([card_id])
         
         logger.info(f"用户 {user_id} 解绑设备 {device_id} from 卡密 {card_id}")
         
@@ -352,9 +384,8 @@ class CardService:
             ).first()
             
             if device_binding:
-                # 更新设备最后活跃时间
-                device_binding.last_active_at = datetime.now()
-                self.db.commit()
+                # 记录设备活跃时间，由心跳服务批量写回
+                device_heartbeat.record(card.id, device_id)
                 return card, None
         
         return None, "该设备未绑定有效卡密"
@@ -363,6 +394,9 @@ class CardService:
         """
         批量删除卡密
         
+        先用一条查询找出不存在的ID，再按 BATCH_DELETE_CHUNK_SIZE 分块，
+        每块用 IN (...) 删除设备绑定、用户绑定、权限关联和卡密，一个分块一个事务
+        
         Args:
             card_ids: 要删除的卡密ID列表
             
@@ -372,36 +406,42 @@ class CardService:
         if not card_ids:
             return 0, [], "卡密ID列表不能为空"
         
+        card_ids = list(dict.fromkeys(card_ids))
+        existing_ids = {
+            card_id for (card_id,) in self.db.query(Card.id).filter(Card.id.in_(card_ids)).all()
+        }
+        failed_ids = [card_id for card_id in card_ids if card_id not in existing_ids]
+        if failed_ids:
+            logger.warning(f"卡密不存在，跳过删除: {failed_ids}")
+        
+        ids_to_delete = [card_id for card_id in card_ids if card_id in existing_ids]
+        chunk_size = settings.BATCH_DELETE_CHUNK_SIZE
         deleted_count = 0
-        failed_ids = []
         
-        for card_id in card_ids:
+        for start in range(0, len(ids_to_delete), chunk_size):
+            chunk = ids_to_delete[start:start + chunk_size]
             try:
-                # 查询卡密是否存在
-                card = self.db.query(Card).filter(Card.id == card_id).first()
-                if not card:
-                    logger.warning(f"卡密不存在，跳过删除: ID {card_id}")
-                    failed_ids.append(card_id)
-                    continue
+                # 扣减应用统计中这些卡密的状态、绑定数和设备数
+                app_ids = remove_cards_from_app_stats(self.db, chunk)
                 
-                # 先删除卡密的设备绑定（避免外键约束问题）
-                self.db.query(CardDevice).filter(CardDevice.card_id == card_id).delete()
+                # 先删除子表记录（避免外键约束问题），最后删除卡密
+                self.db.query(CardDevice).filter(CardDevice.card_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(UserCard).filter(UserCard.card_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(CardPermission).filter(CardPermission.card_id.in_(chunk)).delete(synchronize_session=False)
+                self.db.query(Card).filter(Card.id.in_(chunk)).delete(synchronize_session=False)
                 
-                # 删除卡密的用户绑定
-                self.db.query(UserCard).filter(UserCard.card_id == card_id).delete()
-                
-                # 最后删除卡密
-                self.db.delete(card)
+                recount_registered_users(self.db, app_ids)
                 self.db.commit()
+                permission_cache.invalidate_cards(chunk)
                 
-                deleted_count += 1
-                logger.info(f"成功删除卡密: {card.card_key} (ID: {card_id})")
+                deleted_count += len(chunk)
                 
             except Exception as e:
                 self.db.rollback()
-                logger.error(f"删除卡密失败: ID {card_id}, 错误: {str(e)}")
-                failed_ids.append(card_id)
+                logger.error(f"删除卡密失败: ID {chunk[0]}~{chunk[-1]}（{len(chunk)} 个）, 错误: {str(e)}")
+                failed_ids.extend(chunk)
         
+        logger.info(f"批量删除卡密完成: 成功 {deleted_count} 个，失败 {len(failed_ids)} 个")
         return deleted_count, failed_ids, None
 
 
@@ -416,3 +456,44 @@ def get_card_service(db: Session) -> CardService:
         CardService实例
     """
     return CardService(db)
+
+
+class AsyncCardService(AsyncServiceAdapter):
+    """
+    卡密服务的异步版本
+    
+    与 CardService 的方法一一对应，在 AsyncSession 上执行，不阻塞事件循环
+    """
+    
+    service_class = CardService
+    
+    async def get_user_cards(self, user_id: int) -> List[dict]:
+        return await self._run("get_user_cards", user_id)
+    
+    async def bind_card(self, user_id: int, card_key: str, app_id: int, device_id: str, device_name: Optional[str] = None) -> Tuple[Optional[dict], Optional[str]]:
+        return await self._run("bind_card", user_id, card_key, app_id, device_id, device_name)
+    
+    async def unbind_device(self, user_id: int, card_id: int, device_id: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("unbind_device", user_id, card_id, device_id)
+    
+    async def get_card_detail(self, card_id: int) -> Optional[dict]:
+        return await self._run("get_card_detail", card_id)
+    
+    async def check_card_available(self, user_id: int, device_id: str) -> Tuple[Optional[Card], Optional[str]]:
+        return await self._run("check_card_available", user_id, device_id)
+    
+    async def batch_delete_cards(self, card_ids: List[int]) -> Tuple[int, List[int], Optional[str]]:
+        return await self._run("batch_delete_cards", card_ids)
+
+
+def get_async_card_service(db: AsyncSession) -> AsyncCardService:
+    """
+    获取异步卡密服务实例
+    
+    Args:
+        db: 异步数据库会话
+        
+    Returns:
+        AsyncCardService实例
+    """
+    return AsyncCardService(db)
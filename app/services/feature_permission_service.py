@@ -9,6 +9,9 @@ from loguru import logger
 
 from app.models.feature_permission import FeaturePermission, FeaturePermissionStatus
 from app.models.card import Card
+from app.models.card_permission import CardPermission
+from app.services.permission_service import sync_card_permission_rows
+from app.utils.permission_cache import permission_cache
 
 
 class FeaturePermissionService:
@@ -310,7 +313,9 @@ class FeaturePermissionService:
             
             # 更新卡密的权限配置
             card.permissions = permission_keys
+            sync_card_permission_rows(self.db, [card_id], permission_keys)
             self.db.commit()
+            permission_cache.invalidate_cards([card_id])
             
             logger.info(f"更新卡密功能权限成功: card_id={card_id}, permissions={permission_keys}")
             return True, None
@@ -339,8 +344,12 @@ class FeaturePermissionService:
             if not card:
                 return [], "卡密不存在"
             
-            # 从卡密的 permissions 字段获取权限标识
-            permissions = card.permissions if isinstance(card.permissions, list) else []
+            # 权限标识以 card_permissions 关联表为准（迁移 002 已回填全部卡密）
+            permissions = [
+                key for (key,) in self.db.query(CardPermission.permission_key).filter(
+                    CardPermission.card_id == card_id
+                ).order_by(CardPermission.id).all()
+            ]
             
             return permissions, None
             
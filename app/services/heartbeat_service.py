@@ -0,0 +1,182 @@
+"""
+设备心跳服务
+权限校验成功时只在内存中记录设备活跃时间，由后台线程定期批量写回 card_devices.last_active_at
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, or_, update
+from loguru import logger
+
+from app.core.config import settings
+from app.db.sqlalchemy_db import database
+from app.models.card_device import CardDevice
+
+
+class DeviceHeartbeatAggregator:
+    """
+    设备活跃时间的写后合并器
+
+    - 按 (card_id, device_id) 合并，同一设备在一个刷新周期内只保留最新时间
+    - 每个刷新周期用一条 UPDATE ... CASE 语句批量写回（按 batch_size 分块）
+    - 写回失败时把条目放回待写队列，下个周期重试
+    - 应用关闭时 stop() 会执行最后一次刷新
+
+    Note:
+        last_active_at 最多滞后一个刷新周期，进程异常退出时未刷新的心跳会丢失
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Dict[Tuple[int, str], datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failures = 0
+        self.last_flush_at: Optional[float] = None
+
+    def record(self, card_id: int, device_id: str, active_at: Optional[datetime] = None) -> None:
+        """
+        记录一次设备活跃
+
+        Args:
+            card_id: 卡密ID
+            device_id: 设备ID
+            active_at: 活跃时间，默认当前时间
+        """
+        active_at = active_at or datetime.now()
+        key = (card_id, device_id)
+        with self._lock:
+            current = self._pending.get(key)
+            if current is None or active_at > current:
+                self._pending[key] = active_at
+            self.recorded += 1
+
+    def flush(self) -> int:
+        """
+        把待写的活跃时间批量写回数据库
+
+        Returns:
+            写回的条目数量
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+
+            items = list(pending.items())
+            flushed = 0
+            db = None
+            try:
+                db = database.create_session()
+                for start in range(0, len(items), self.batch_size):
+                    chunk = items[start:start + self.batch_size]
+                    self._update_chunk(db, chunk)
+                    flushed += len(chunk)
+                db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                self.failures += 1
+                self._requeue(pending)
+                logger.error(f"设备心跳写回失败，{len(pending)} 条将在下次重试: {e}")
+                return 0
+            finally:
+                if db is not None:
+                    db.close()
+
+            self.flushes += 1
+            self.rows_flushed += flushed
+            self.last_flush_at = time.time()
+            logger.debug(f"设备心跳写回完成: {flushed} 条")
+            return flushed
+
+    @staticmethod
+    def _update_chunk(db, chunk) -> None:
+        """
+        用一条 UPDATE ... CASE 语句写回一批活跃时间
+
+        Args:
+            db: 数据库会话
+            chunk: [((card_id, device_id), active_at), ...]
+        """
+        conditions = [
+            and_(CardDevice.card_id == card_id, CardDevice.device_id == device_id)
+            for (card_id, device_id), _ in chunk
+        ]
+        active_at = case(
+            *[(condition, value) for condition, (_, value) in zip(conditions, chunk)],
+            else_=CardDevice.last_active_at
+        )
+        db.execute(
+            update(CardDevice)
+            .where(or_(*conditions))
+            .values(last_active_at=active_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    def start(self) -> None:
+        """启动后台刷新线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="device-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(f"设备心跳写回线程已启动，刷新间隔 {self.flush_interval} 秒")
+
+    def stop(self) -> None:
+        """停止后台线程并刷新剩余心跳"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取心跳合并统计
+
+        Returns:
+            待写条目数、记录次数、写回次数和条目数、失败次数
+        """
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "failures": self.failures,
+            "flush_interval": self.flush_interval,
+            "last_flush_at": self.last_flush_at,
+        }
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"设备心跳写回线程异常: {e}")
+
+    def _requeue(self, pending: Dict[Tuple[int, str], datetime]) -> None:
+        """把写回失败的条目放回队列，保留较新的时间"""
+        with self._lock:
+            for key, active_at in pending.items():
+                current = self._pending.get(key)
+                if current is None or active_at > current:
+                    self._pending[key] = active_at
+
+
+# 全局设备心跳实例
+device_heartbeat = DeviceHeartbeatAggregator(
+    flush_interval=settings.HEARTBEAT_FLUSH_INTERVAL,
+    batch_size=settings.HEARTBEAT_BATCH_SIZE
+)
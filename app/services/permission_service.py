@@ -2,16 +2,131 @@
 权限校验服务层
 处理权限验证的核心业务逻辑
 """
+import json
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union, Dict, FrozenSet, List, Iterable, Set
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, insert
 
 from app.models.user import User, UserStatus
 from app.models.card import Card, CardStatus
 from app.models.user_card import UserCard, UserCardStatus
 from app.models.card_device import CardDevice, CardDeviceStatus
+from app.models.card_permission import CardPermission
 from app.core.logging_uru import logger
+from app.services.heartbeat_service import device_heartbeat
+from app.utils.permission_cache import PermissionSnapshot, permission_cache
+from app.core.config import settings
+from app.services.async_service import AsyncServiceAdapter
+
+
+def parse_card_permissions(raw_permissions) -> Optional[Union[list, dict]]:
+    """
+    解析卡密的权限配置
+    
+    permissions 字段可能是 list、dict、None 或 JSON 字符串
+    
+    Args:
+        raw_permissions: Card.permissions 原始值
+        
+    Returns:
+        list 或 dict，无法解析或为空时返回 None
+    """
+    if raw_permissions is None:
+        return None
+    
+    if isinstance(raw_permissions, str):
+        try:
+            raw_permissions = json.loads(raw_permissions)
+        except json.JSONDecodeError:
+            logger.error(f"无法解析卡密权限配置: {raw_permissions}")
+            return None
+    
+    if isinstance(raw_permissions, (list, dict)):
+        return raw_permissions
+    return None
+
+
+def granted_permission_keys(raw_permissions) -> FrozenSet[str]:
+    """
+    计算卡密权限配置授予的全部权限标识
+    
+    - list: 列表中的权限标识全部授予
+    - dict: 值为 false 的权限标识不授予（例如 {"wechat": true, "ximalaya": false}）
+    
+    Args:
+        raw_permissions: Card.permissions 原始值
+        
+    Returns:
+        授予的权限标识集合
+    """
+    parsed = parse_card_permissions(raw_permissions)
+    if isinstance(parsed, list):
+        return frozenset(str(key) for key in parsed)
+    if isinstance(parsed, dict):
+        return frozenset(
+            key for key, value in parsed.items()
+            if not isinstance(value, bool) or value
+        )
+    return frozenset()
+
+
+def card_grants_permission(raw_permissions, permission: str) -> bool:
+    """
+    判断卡密权限配置是否授予指定权限
+    
+    Args:
+        raw_permissions: Card.permissions 原始值
+        permission: 权限标识
+        
+    Returns:
+        是否授予
+    """
+    return permission in granted_permission_keys(raw_permissions)
+
+
+def insert_card_permission_rows(db: Session, card_ids: Iterable[int], raw_permissions) -> int:
+    """
+    为卡密写入 card_permissions 关联行（不提交事务）
+    
+    Args:
+        db: 数据库会话
+        card_ids: 卡密ID列表（这些卡密使用同一份权限配置）
+        raw_permissions: Card.permissions 原始值
+        
+    Returns:
+        写入的行数
+    """
+    keys = sorted(granted_permission_keys(raw_permissions))
+    values = [
+        {"card_id": card_id, "permission_key": key}
+        for card_id in card_ids
+        for key in keys
+    ]
+    if values:
+        db.execute(insert(CardPermission), values)
+    return len(values)
+
+
+def sync_card_permission_rows(db: Session, card_ids: List[int], raw_permissions) -> int:
+    """
+    按新的权限配置重建卡密的 card_permissions 关联行（不提交事务）
+    
+    与 Card.permissions 在同一事务中写入，保证两者一致
+    
+    Args:
+        db: 数据库会话
+        card_ids: 卡密ID列表
+        raw_permissions: 新的 Card.permissions
+        
+    Returns:
+        写入的行数
+    """
+    db.query(CardPermission).filter(
+        CardPermission.card_id.in_(card_ids)
+    ).delete(synchronize_session=False)
+    return insert_card_permission_rows(db, card_ids, raw_permissions)
 
 
 class PermissionService:
@@ -29,7 +144,7 @@ class PermissionService:
         """
         检查用户在指定设备上是否有指定权限
         
-        这是核心的权限校验逻辑，执行9步验证流程：
+        这是核心的权限校验逻辑，执行9步验证流程（步骤1-8由有效权限快照完成）：
         1. 查询用户状态
         2. 验证用户是否被封禁
         3. 查询用户绑定的卡密
@@ -38,7 +153,7 @@ class PermissionService:
         6. 验证设备绑定
         7. 验证设备状态
         8. 验证权限配置
-        9. 更新设备活跃时间
+        9. 记录设备活跃时间
         
         Args:
             user_id: 用户ID
@@ -53,130 +168,25 @@ class PermissionService:
             >>> if allowed:
             >>>     print("权限验证通过")
         """
+        snapshot = self.get_permission_snapshot(user_id, device_id)
+        allowed, message, card_id, expire_time = snapshot.check(permission)
         
-        # 步骤 1: 查询用户状态
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user:
-            logger.warning(f"权限校验失败: 用户不存在 (user_id={user_id})")
-            return False, "用户不存在", None
-        
-        # 步骤 2: 验证用户是否被封禁
-        if user.status == UserStatus.BANNED:
-            logger.warning(f"权限校验失败: 用户已被封禁 (user_id={user_id}, username={user.username})")
-            return False, "用户已被封禁", None
-        
-        # 步骤 3: 查询用户绑定的卡密
-        user_cards = self.db.query(UserCard, Card).join(
-            Card, UserCard.card_id == Card.id
-        ).filter(
-            and_(
-                UserCard.user_id == user_id,
-                UserCard.status == UserCardStatus.ACTIVE
+        if not allowed:
+            logger.warning(
+                "权限校验失败: {} (user_id={}, device_id={}, permission={})",
+                message, user_id, device_id, permission
             )
-        ).all()
+            return False, message, None
         
-        if not user_cards:
-            logger.warning(f"权限校验失败: 用户未绑定卡密 (user_id={user_id}, username={user.username})")
-            return False, "未绑定卡密", None
+        # 步骤 9: 记录设备活跃时间（由心跳服务批量写回，不在请求中提交事务）
+        device_heartbeat.record(card_id, device_id)
         
-        # 遍历用户的所有卡密，寻找有效的卡密
-        for user_card, card in user_cards:
-            # 步骤 4: 验证卡密状态
-            if card.status == CardStatus.DISABLED:
-                logger.debug(f"跳过禁用的卡密: card_id={card.id}")
-                continue
-            
-            # 步骤 5: 验证卡密是否过期
-            if card.expire_time < datetime.now():
-                logger.debug(f"跳过已过期的卡密: card_id={card.id}, expire_time={card.expire_time}")
-                continue
-            
-            # 步骤 6: 验证设备绑定
-            device_binding = self.db.query(CardDevice).filter(
-                and_(
-                    CardDevice.card_id == card.id,
-                    CardDevice.device_id == device_id
-                )
-            ).first()
-            
-            if not device_binding:
-                logger.debug(f"跳过未绑定此设备的卡密: card_id={card.id}, device_id={device_id}")
-                continue
-            
-            # 步骤 7: 验证设备状态
-            if device_binding.status == CardDeviceStatus.DISABLED:
-                logger.warning(
-                    f"权限校验失败: 设备已被禁用 "
-                    f"(user_id={user_id}, card_id={card.id}, device_id={device_id})"
-                )
-                return False, "设备已被禁用", None
-            
-            # 步骤 8: 验证权限配置
-            # permissions 可能是 list 或 dict 或 None 或 str(JSON字符串)
-            card_permissions = card.permissions
-            
-            # 处理 None 的情况
-            if card_permissions is None:
-                logger.debug(f"卡密没有权限配置: card_id={card.id}")
-                continue
-            
-            # 如果是字符串，尝试解析为 JSON
-            if isinstance(card_permissions, str):
-                import json
-                try:
-                    card_permissions = json.loads(card_permissions)
-                    logger.debug(f"解析JSON字符串: card_id={card.id}, permissions={card_permissions}")
-                except json.JSONDecodeError:
-                    logger.error(f"无法解析卡密权限配置: {card_permissions}")
-                    continue
-            
-            # 处理 list 的情况
-            if isinstance(card_permissions, list):
-                if permission not in card_permissions:
-                    logger.debug(
-                        f"权限不在卡密权限列表中: "
-                        f"permission={permission}, card_permissions={card_permissions}"
-                    )
-                    continue
-            
-            # 处理 dict 的情况（例如 {"wechat": true, "ximalaya": false}）
-            elif isinstance(card_permissions, dict):
-                if permission not in card_permissions:
-                    logger.debug(
-                        f"权限不在卡密权限配置中: "
-                        f"permission={permission}, card_permissions={card_permissions}"
-                    )
-                    continue
-                
-                # 检查权限值（如果是 bool 类型）
-                if isinstance(card_permissions[permission], bool):
-                    if not card_permissions[permission]:
-                        logger.debug(
-                            f"权限被设置为 false: "
-                            f"permission={permission}, value={card_permissions[permission]}"
-                        )
-                        continue
-            
-            # 如果执行到这里，说明所有验证都通过了
-            
-            # 步骤 9: 更新设备最后活跃时间
-            device_binding.last_active_at = datetime.now()
-            self.db.commit()
-            
-            logger.info(
-                f"权限校验通过: user_id={user_id}, username={user.username}, "
-                f"device_id={device_id}, permission={permission}, "
-                f"card_id={card.id}, expire_time={card.expire_time}"
-            )
-            
-            return True, "权限验证通过", card.expire_time
-        
-        # 如果所有卡密都不满足条件
-        logger.warning(
-            f"权限校验失败: 没有有效的卡密满足条件 "
-            f"(user_id={user_id}, device_id={device_id}, permission={permission})"
+        logger.debug(
+            "权限校验通过: user_id={}, username={}, device_id={}, permission={}, card_id={}, expire_time={}",
+            user_id, snapshot.username, device_id, permission, card_id, expire_time
         )
-        return False, "没有有效的卡密或权限配置不匹配", None
+        
+        return True, message, expire_time
     
     def batch_check_permissions(
         self,
@@ -187,6 +197,8 @@ class PermissionService:
         """
         批量检查多个权限
         
+        有效权限快照只解析一次，再逐个匹配请求的权限，开销与单个权限相同
+        
         Args:
             user_id: 用户ID
             device_id: 设备ID
@@ -203,18 +215,16 @@ class PermissionService:
             ... )
             >>> # 返回: {"wechat": True, "ximalaya": True, "douyin": False}
         """
+        snapshot = self.get_permission_snapshot(user_id, device_id)
         results = {}
         
         for permission in permissions:
-            allowed, message, expire_time = self.check_permission(
-                user_id, device_id, permission
-            )
+            allowed, _, card_id, _ = snapshot.check(permission)
             results[permission] = allowed
+            if allowed:
+                device_heartbeat.record(card_id, device_id)
         
-        logger.info(
-            f"批量权限校验完成: user_id={user_id}, device_id={device_id}, "
-            f"results={results}"
-        )
+        logger.debug("批量权限校验完成: user_id={}, device_id={}, results={}", user_id, device_id, results)
         
         return results
     
@@ -238,94 +248,152 @@ class PermissionService:
             >>> if valid:
             >>>     print(f"用户拥有的权限: {permissions}")
         """
-        # 查询用户状态
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user or user.status == UserStatus.BANNED:
+        snapshot = self.get_permission_snapshot(user_id, device_id)
+        if snapshot.error:
             return False, [], None
         
-        # 查询用户绑定的卡密
-        user_cards = self.db.query(UserCard, Card).join(
-            Card, UserCard.card_id == Card.id
-        ).filter(
+        permissions_list = sorted(snapshot.permissions)
+        expire_time = snapshot.latest_expire_time
+        
+        logger.debug(
+            "获取用户权限: user_id={}, device_id={}, permissions={}, expire_time={}",
+            user_id, device_id, permissions_list, expire_time
+        )
+        
+        return len(permissions_list) > 0, permissions_list, expire_time
+    
+    def get_permission_snapshot(self, user_id: int, device_id: str) -> PermissionSnapshot:
+        """
+        获取用户在设备上的有效权限快照
+        
+        优先使用缓存，未命中时查询数据库并写入缓存
+        
+        Args:
+            user_id: 用户ID
+            device_id: 设备ID
+            
+        Returns:
+            有效权限快照
+        """
+        if not settings.PERMISSION_CACHE_ENABLED:
+            return self._build_snapshot(user_id, device_id)
+        
+        snapshot = permission_cache.get(user_id, device_id)
+        if snapshot is not None:
+            return snapshot
+        
+        generation = permission_cache.generation
+        snapshot = self._build_snapshot(user_id, device_id)
+        permission_cache.set(user_id, device_id, snapshot, generation)
+        return snapshot
+    
+    def _build_snapshot(self, user_id: int, device_id: str) -> PermissionSnapshot:
+        """
+        一次联表查询构建有效权限快照
+        
+        取出用户、有效绑定、卡密、当前设备的绑定记录以及 card_permissions 中的权限标识。卡密状态和过期时间放在 JOIN 条件中，
+        绑定了卡密但卡密无效时仍能区分“未绑定卡密”。卡密按绑定顺序处理：
+        check 使用的 grants 在遇到被禁用的设备绑定后不再收集后续卡密的权限；
+        权限列表使用的 active_permissions 收集所有启用的设备绑定上的权限
+        
+        Args:
+            user_id: 用户ID
+            device_id: 设备ID
+            
+        Returns:
+            有效权限快照
+        """
+        now = datetime.now()
+        rows = self.db.query(
+            User, UserCard.card_id, Card, CardDevice, CardPermission.permission_key
+        ).outerjoin(
+            UserCard,
             and_(
-                UserCard.user_id == user_id,
+                UserCard.user_id == User.id,
                 UserCard.status == UserCardStatus.ACTIVE
             )
-        ).all()
-        logger.info(f"用户绑定的卡密: {user_cards}")
-        all_permissions = set()
-        expire_time = None
+        ).outerjoin(
+            Card,
+            and_(
+                Card.id == UserCard.card_id,
+                Card.status != CardStatus.DISABLED,
+                Card.expire_time >= now
+            )
+        ).outerjoin(
+            CardDevice,
+            and_(
+                CardDevice.card_id == Card.id,
+                CardDevice.device_id == device_id
+            )
+        ).outerjoin(
+            CardPermission,
+            and_(
+                CardPermission.card_id == Card.id,
+                CardDevice.id.isnot(None)
+            )
+        ).filter(
+            User.id == user_id
+        ).order_by(UserCard.id, CardPermission.id).all()
         
-        for user_card, card in user_cards:
-            logger.info(f"处理卡密: card_id={card.id}, status={card.status}, expire_time={card.expire_time}")
-            
-            # 验证卡密有效性
-            if card.status == CardStatus.DISABLED:
-                logger.info(f"卡密已禁用: card_id={card.id}")
+        if not rows:
+            return PermissionSnapshot(error="用户不存在")
+        
+        user = rows[0][0]
+        card_ids = frozenset(row[1] for row in rows if row[1] is not None)
+        
+        if user.status == UserStatus.BANNED:
+            return PermissionSnapshot(error="用户已被封禁", username=user.username)
+        
+        if not card_ids:
+            return PermissionSnapshot(error="未绑定卡密", username=user.username)
+        
+        grants: Dict[str, Tuple[int, datetime]] = {}
+        active_permissions: Set[str] = set()
+        device_disabled = False
+        valid_until = None
+        latest_expire_time = None
+        
+        # 每张卡密的权限标识展开为多行，按卡密绑定顺序合并
+        device_cards: Dict[int, Tuple[Card, CardDevice, List[str]]] = {}
+        for _, card_id, card, device_binding, permission_key in rows:
+            if card is None:
+                logger.debug("跳过禁用或已过期的卡密: card_id={}", card_id)
                 continue
             
-            if card.expire_time < datetime.now():
-                logger.info(f"卡密已过期: card_id={card.id}, expire_time={card.expire_time}")
+            if device_binding is None:
+                logger.debug("跳过未绑定此设备的卡密: card_id={}, device_id={}", card.id, device_id)
                 continue
             
-            # 验证设备绑定
-            device_binding = self.db.query(CardDevice).filter(
-                and_(
-                    CardDevice.card_id == card.id,
-                    CardDevice.device_id == device_id,
-                    CardDevice.status == CardDeviceStatus.ACTIVE
-                )
-            ).first()
-            
-            logger.info(f"设备绑定: device_binding={device_binding}")
+            entry = device_cards.setdefault(card.id, (card, device_binding, []))
+            if permission_key is not None:
+                entry[2].append(permission_key)
+        
+        for card, device_binding, permission_keys in device_cards.values():
+            # 任何一张卡密过期都会改变结果
+            if valid_until is None or card.expire_time < valid_until:
+                valid_until = card.expire_time
             
-            if not device_binding:
-                logger.info(f"未找到设备绑定: card_id={card.id}, device_id={device_id}")
+            if device_binding.status == CardDeviceStatus.DISABLED:
+                logger.debug("设备已被禁用: card_id={}, device_id={}", card.id, device_id)
+                device_disabled = True
                 continue
             
-            # 收集权限
-            if card.permissions:
-                logger.debug(
-                    f"卡密权限配置: card_id={card.id}, "
-                    f"permissions={card.permissions}, "
-                    f"type={type(card.permissions)}"
-                )
-                
-                if isinstance(card.permissions, list):
-                    all_permissions.update(card.permissions)
-                elif isinstance(card.permissions, dict):
-                    # 只添加值为 True 的权限
-                    for perm, value in card.permissions.items():
-                        if value is True or value == "true":
-                            all_permissions.add(perm)
-                elif isinstance(card.permissions, str):
-                    # 如果是字符串，尝试解析为 JSON
-                    import json
-                    try:
-                        parsed = json.loads(card.permissions)
-                        if isinstance(parsed, list):
-                            all_permissions.update(parsed)
-                        elif isinstance(parsed, dict):
-                            for perm, value in parsed.items():
-                                if value is True or value == "true":
-                                    all_permissions.add(perm)
-                    except json.JSONDecodeError:
-                        logger.error(f"无法解析卡密权限配置: {card.permissions}")
-            else:
-                logger.debug(f"卡密没有权限配置: card_id={card.id}")
-            
-            # 记录最晚的过期时间
-            if expire_time is None or card.expire_time > expire_time:
-                expire_time = card.expire_time
-        
-        permissions_list = sorted(list(all_permissions))
+            active_permissions.update(permission_keys)
+            if not device_disabled:
+                for key in permission_keys:
+                    grants.setdefault(key, (card.id, card.expire_time))
+            if latest_expire_time is None or card.expire_time > latest_expire_time:
+                latest_expire_time = card.expire_time
         
-        logger.info(
-            f"获取用户权限: user_id={user_id}, device_id={device_id}, "
-            f"permissions={permissions_list}, expire_time={expire_time}"
+        return PermissionSnapshot(
+            username=user.username,
+            grants=grants,
+            device_disabled=device_disabled,
+            active_permissions=frozenset(active_permissions),
+            card_ids=card_ids,
+            valid_until=valid_until,
+            latest_expire_time=latest_expire_time
         )
-        
-        return len(permissions_list) > 0, permissions_list, expire_time
 
 
 def get_permission_service(db: Session) -> PermissionService:
@@ -339,3 +407,35 @@ def get_permission_service(db: Session) -> PermissionService:
         PermissionService实例
     """
     return PermissionService(db)
+
+
+class AsyncPermissionService(AsyncServiceAdapter):
+    """
+    权限服务的异步版本
+    
+    与 PermissionService 的方法一一对应，在 AsyncSession 上执行，不阻塞事件循环
+    """
+    
+    service_class = PermissionService
+    
+    async def check_permission(self, user_id: int, device_id: str, permission: str) -> Tuple[bool, str, Optional[datetime]]:
+        return await self._run("check_permission", user_id, device_id, permission)
+    
+    async def batch_check_permissions(self, user_id: int, device_id: str, permissions: list) -> dict:
+        return await self._run("batch_check_permissions", user_id, device_id, permissions)
+    
+    async def get_user_permissions(self, user_id: int, device_id: str) -> Tuple[bool, list, Optional[datetime]]:
+        return await self._run("get_user_permissions", user_id, device_id)
+
+
+def get_async_permission_service(db: AsyncSession) -> AsyncPermissionService:
+    """
+    获取异步权限服务实例
+    
+    Args:
+        db: 异步数据库会话
+        
+    Returns:
+        AsyncPermissionService实例
+    """
+    return AsyncPermissionService(db)
@@ -0,0 +1,211 @@
+"""
+统计数据服务
+每张表用一条 GROUP BY status 查询完成统计，结果作为快照短期缓存，过期后在后台线程中刷新
+"""
+import copy
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.core.config import settings
+from app.db.sqlalchemy_db import database
+from app.models.user import User, UserStatus
+from app.models.card import Card, CardStatus
+from app.models.card_device import CardDevice, CardDeviceStatus
+from app.models.app import App, AppStatus
+from app.utils.cache_backend import cache_backend, invalidation_bus
+
+# 共享缓存后端中保存快照的命名空间，以及跨 worker 通知的主题
+_SNAPSHOT_NAMESPACE = "statistics"
+_INVALIDATION_TOPIC = "statistics_snapshot"
+
+
+def _count_by_status(db: Session, status_column) -> Dict[str, int]:
+    """
+    按状态分组统计一张表
+
+    Args:
+        db: 数据库会话
+        status_column: 状态列
+
+    Returns:
+        {状态值: 数量}
+    """
+    rows = db.query(status_column, func.count()).group_by(status_column).all()
+    return {getattr(status, "value", status): count for status, count in rows}
+
+
+def compute_statistics(db: Session) -> Dict[str, Any]:
+    """
+    统计用户、卡密、设备、应用数量（每张表一条分组查询）
+
+    Args:
+        db: 数据库会话
+
+    Returns:
+        统计数据字典
+    """
+    users = _count_by_status(db, User.status)
+    cards = _count_by_status(db, Card.status)
+    devices = _count_by_status(db, CardDevice.status)
+    apps = _count_by_status(db, App.status)
+
+    return {
+        "users": {
+            "total": sum(users.values()),
+            "normal": users.get(UserStatus.NORMAL.value, 0),
+            "banned": users.get(UserStatus.BANNED.value, 0)
+        },
+        "cards": {
+            "total": sum(cards.values()),
+            "unused": cards.get(CardStatus.UNUSED.value, 0),
+            "used": cards.get(CardStatus.USED.value, 0),
+            "disabled": cards.get(CardStatus.DISABLED.value, 0)
+        },
+        "devices": {
+            "total": sum(devices.values()),
+            "active": devices.get(CardDeviceStatus.ACTIVE.value, 0),
+            "disabled": devices.get(CardDeviceStatus.DISABLED.value, 0)
+        },
+        "apps": {
+            "total": sum(apps.values()),
+            "active": apps.get(AppStatus.NORMAL.value, 0)
+        },
+        "updated_at": datetime.now()
+    }
+
+
+class StatisticsSnapshot:
+    """
+    统计数据快照
+
+    - 快照未过期时直接返回，不访问数据库
+    - 快照过期后仍先返回旧快照，同时启动一个后台线程重新统计（同一时间只有一个刷新线程）
+    - 没有快照时（进程刚启动）在当前会话上同步统计一次
+    - 使用共享缓存后端（CACHE_BACKEND=redis）时，快照同时写入共享后端；本地快照缺失或过期时
+      先读取其他 worker 写入的较新快照，多个 worker 不重复统计；强制刷新后通知其他 worker 丢弃本地快照
+
+    Note:
+        统计结果最多滞后 STATISTICS_CACHE_TTL 秒加一次统计耗时
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def get(self, db: Session, refresh: bool = False) -> Dict[str, Any]:
+        """
+        获取统计数据
+
+        Args:
+            db: 没有快照或强制刷新时用于同步统计的数据库会话
+            refresh: 是否跳过快照，立即重新统计
+
+        Returns:
+            统计数据字典（副本）
+        """
+        if refresh:
+            snapshot = compute_statistics(db)
+            self._store(snapshot)
+            invalidation_bus.publish(_INVALIDATION_TOPIC)
+            return copy.deepcopy(snapshot)
+
+        if self._local_stale():
+            self._load_shared()
+
+        with self._lock:
+            snapshot = self._snapshot
+            stale = time.monotonic() - self._loaded_at >= self.ttl
+            if snapshot is not None and stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, name="statistics-refresh", daemon=True).start()
+
+        if snapshot is None:
+            snapshot = compute_statistics(db)
+            self._store(snapshot)
+            return copy.deepcopy(snapshot)
+
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return copy.deepcopy(snapshot)
+
+    def clear(self) -> None:
+        """清空快照"""
+        with self._lock:
+            self._snapshot = None
+            self._loaded_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取快照统计
+
+        Returns:
+            命中次数、返回旧快照次数、刷新与失败次数
+        """
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+    def _store(self, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+        if cache_backend.shared:
+            cache_backend.set(_SNAPSHOT_NAMESPACE, "snapshot", (snapshot, time.time()), ttl=self.ttl * 10)
+
+    def _local_stale(self) -> bool:
+        with self._lock:
+            return self._snapshot is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def _load_shared(self) -> None:
+        """从共享后端读取其他 worker 统计的快照，比本地快照新时替换（保留原快照的年龄）"""
+        if not cache_backend.shared:
+            return
+        shared = cache_backend.get(_SNAPSHOT_NAMESPACE, "snapshot")
+        if not isinstance(shared, tuple):
+            return
+        snapshot, stored_at = shared
+        age = max(time.time() - stored_at, 0.0)
+        with self._lock:
+            if self._snapshot is None or time.monotonic() - self._loaded_at > age:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic() - age
+
+    def _refresh(self) -> None:
+        """后台线程：使用独立会话重新统计"""
+        db = None
+        try:
+            db = database.create_session()
+            self._store(compute_statistics(db))
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"刷新统计数据失败: {e}")
+        finally:
+            if db is not None:
+                db.close()
+            with self._lock:
+                self._refreshing = False
+
+
+# 全局统计数据快照实例
+statistics_snapshot = StatisticsSnapshot(ttl=settings.STATISTICS_CACHE_TTL)
+invalidation_bus.subscribe(_INVALIDATION_TOPIC, statistics_snapshot.clear)
@@ -12,6 +12,7 @@ from app.utils.security import (
 )
 from app.utils.dependencies import (
     get_db,
+    get_async_db,
     get_current_user,
     get_current_admin,
     get_optional_current_user
@@ -35,6 +36,7 @@ __all__ = [
     
     # 依赖注入
     "get_db",
+    "get_async_db",
     "get_current_user",
     "get_current_admin",
     "get_optional_current_user",
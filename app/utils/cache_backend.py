@@ -0,0 +1,428 @@
+"""
+缓存后端与跨 worker 失效通知
+cache_decorator 中的缓存装饰器通过后端读写缓存：
+- memory：进程内 TTLCache/LRUCache（默认，每个 worker 独立）
+- redis：Redis 兼容协议的共享缓存（redis-py 客户端接口，也可以传入 fakeredis 等替身），所有 worker 共用
+
+进程内缓存（权限快照、Token 缓存、统计快照以及 memory 后端）在一个 worker 中失效后，
+通过 CacheInvalidationBus 经 Redis PUBLISH 通知其他 worker 失效本地副本
+"""
+import hashlib
+import json
+import os
+import pickle
+import queue
+import threading
+import uuid
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from cachetools import LRUCache, TTLCache
+from loguru import logger
+
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # redis 为可选依赖，只在 CACHE_BACKEND=redis 时需要
+    redis = None
+
+# 缓存未命中的标记（缓存值本身可能为 None）
+MISSING = object()
+
+# 超过该长度的缓存键在 Redis 中使用 SHA-1 摘要
+_MAX_KEY_LENGTH = 200
+
+
+class CacheBackend:
+    """
+    缓存后端接口
+
+    缓存按命名空间（装饰器的 cache_name）隔离，键为装饰器生成的可哈希元组
+    """
+
+    # 读写是否为阻塞的网络调用（异步函数的缓存读写需要放到线程中执行）
+    blocking = False
+    # 是否所有 worker 共用（共用时失效不需要通知其他 worker）
+    shared = False
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        """
+        读取缓存
+
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+
+        Returns:
+            缓存值，未命中返回 MISSING
+        """
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None,
+            maxsize: Optional[int] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None 表示不过期（只受容量淘汰）
+            maxsize: 命名空间的最大条目数（只对进程内后端生效）
+        """
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        """删除单个缓存键"""
+        raise NotImplementedError
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """清空指定命名空间，namespace 为 None 时清空全部"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """后端统计"""
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    进程内缓存后端
+
+    每个命名空间一个 TTLCache（ttl 为 None 时为 LRUCache），容量和 TTL 以第一次创建时为准
+    """
+
+    def __init__(self, default_maxsize: int = 128):
+        self.default_maxsize = default_maxsize
+        self.caches: Dict[str, Union[TTLCache, LRUCache]] = {}
+        self._lock = threading.RLock()
+
+    def namespace(self, namespace: str, maxsize: Optional[int] = None,
+                  ttl: Optional[float] = None) -> Union[TTLCache, LRUCache]:
+        """
+        获取或创建命名空间对应的缓存
+
+        Args:
+            namespace: 命名空间
+            maxsize: 最大条目数
+            ttl: 过期时间（秒），None 时使用 LRUCache
+
+        Returns:
+            缓存实例
+        """
+        cache = self.caches.get(namespace)
+        if cache is None:
+            with self._lock:
+                cache = self.caches.get(namespace)
+                if cache is None:
+                    maxsize = maxsize or self.default_maxsize
+                    cache = TTLCache(maxsize=maxsize, ttl=ttl) if ttl else LRUCache(maxsize=maxsize)
+                    self.caches[namespace] = cache
+        return cache
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        cache = self.caches.get(namespace)
+        if cache is None:
+            return MISSING
+        with self._lock:
+            return cache.get(key, MISSING)
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None,
+            maxsize: Optional[int] = None) -> None:
+        cache = self.namespace(namespace, maxsize, ttl)
+        with self._lock:
+            try:
+                cache[key] = value
+            except ValueError:
+                # 值超过缓存容量（getsizeof）时不缓存
+                pass
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        cache = self.caches.get(namespace)
+        if cache is not None:
+            with self._lock:
+                cache.pop(key, None)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                for cache in self.caches.values():
+                    cache.clear()
+            elif namespace in self.caches:
+                self.caches[namespace].clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "namespaces": {name: len(cache) for name, cache in self.caches.items()},
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis 兼容的共享缓存后端
+
+    - 键为 "{prefix}:{namespace}:{key}"，同一 Redis 可以被多个项目/环境共用
+    - 值使用 pickle 序列化（只应连接受信任的 Redis）
+    - 清空命名空间时按前缀 SCAN 后分批删除
+    - Redis 不可用时读取视为未命中、写入忽略，不影响接口
+    """
+
+    blocking = True
+    shared = True
+
+    def __init__(self, client: Any, prefix: str):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    def make_key(self, namespace: str, key: Hashable) -> str:
+        """
+        生成带命名空间的 Redis 键
+
+        Args:
+            namespace: 命名空间
+            key: 装饰器生成的缓存键
+
+        Returns:
+            Redis 键
+        """
+        key_str = repr(tuple(key)) if isinstance(key, tuple) else repr(key)
+        if len(key_str) > _MAX_KEY_LENGTH:
+            key_str = hashlib.sha1(key_str.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{namespace}:{key_str}"
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        try:
+            raw = self.client.get(self.make_key(namespace, key))
+        except Exception as e:
+            self._on_error("读取", e)
+            return MISSING
+        return MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None,
+            maxsize: Optional[int] = None) -> None:
+        try:
+            # SET 的 EX 参数为整数秒，不足 1 秒按 1 秒
+            self.client.set(self.make_key(namespace, key), pickle.dumps(value),
+                            ex=max(int(ttl), 1) if ttl else None)
+        except Exception as e:
+            self._on_error("写入", e)
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        try:
+            self.client.delete(self.make_key(namespace, key))
+        except Exception as e:
+            self._on_error("删除", e)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        pattern = f"{self.prefix}:*" if namespace is None else f"{self.prefix}:{namespace}:*"
+        try:
+            batch: List[Any] = []
+            for key in self.client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    self.client.delete(*batch)
+                    batch = []
+            if batch:
+                self.client.delete(*batch)
+        except Exception as e:
+            self._on_error("清空", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "prefix": self.prefix, "errors": self.errors}
+
+    def _on_error(self, action: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Redis 缓存{action}失败: {error}")
+
+
+class CacheInvalidationBus:
+    """
+    跨 worker 的缓存失效通知
+
+    - publish(topic, *args)：本 worker 已经失效本地缓存后调用，消息经 Redis PUBLISH 发给其他 worker；
+      发送在后台线程中完成，不阻塞请求
+    - subscribe(topic, handler)：注册本地失效处理函数，收到其他 worker 的消息时以 handler(*args) 调用
+    - 消息带 worker 标识，自己发出的消息不会重复处理
+    - 没有配置 Redis（单进程部署）时 publish 不做任何事
+    """
+
+    def __init__(self, client: Any = None, channel: str = "cache:invalidate"):
+        self.client = client
+        self.channel = channel
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, List[Callable[..., Any]]] = {}
+        self._outbox: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._publisher: Optional[threading.Thread] = None
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.published = 0
+        self.received = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了跨 worker 通知"""
+        return self.client is not None
+
+    def subscribe(self, topic: str, handler: Callable[..., Any]) -> None:
+        """
+        注册失效处理函数
+
+        Args:
+            topic: 消息主题，如 "permission_cache"
+            handler: 处理函数，参数为 publish 时的 args
+        """
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, *args: Any) -> None:
+        """
+        通知其他 worker 失效缓存
+
+        Args:
+            topic: 消息主题
+            args: 传给处理函数的参数（需可 JSON 序列化）
+        """
+        if not self.enabled:
+            return
+        self.start()
+        self._outbox.put(json.dumps({"origin": self.origin, "topic": topic, "args": list(args)}))
+
+    def start(self) -> None:
+        """启动发送和监听线程（首次 publish 时也会自动启动）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._publisher is not None and self._publisher.is_alive():
+                return
+            self._stop_event.clear()
+            self._publisher = threading.Thread(target=self._publish_loop, name="cache-invalidate-pub", daemon=True)
+            self._listener = threading.Thread(target=self._listen_loop, name="cache-invalidate-sub", daemon=True)
+            self._publisher.start()
+            self._listener.start()
+        logger.info(f"缓存失效通知已启动，频道 {self.channel}")
+
+    def stop(self) -> None:
+        """停止后台线程，发送完队列中剩余的消息"""
+        with self._lock:
+            publisher, listener = self._publisher, self._listener
+            self._publisher = self._listener = None
+        if publisher is None:
+            return
+        self._stop_event.set()
+        self._outbox.put(None)
+        publisher.join(timeout=5)
+        if listener is not None:
+            listener.join(timeout=5)
+
+    def dispatch(self, message: Union[str, bytes]) -> bool:
+        """
+        处理一条失效消息
+
+        Args:
+            message: publish 发出的 JSON 消息
+
+        Returns:
+            是否已处理（自己发出的消息和无法解析的消息返回 False）
+        """
+        try:
+            payload = json.loads(message)
+        except (TypeError, ValueError):
+            return False
+        if payload.get("origin") == self.origin:
+            return False
+        self.received += 1
+        for handler in self._handlers.get(payload.get("topic"), ()):
+            try:
+                handler(*payload.get("args", ()))
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"处理缓存失效消息失败: {payload.get('topic')} - {e}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取通知统计
+
+        Returns:
+            是否启用、发送和接收的消息数、失败次数
+        """
+        return {
+            "enabled": self.enabled,
+            "channel": self.channel,
+            "published": self.published,
+            "received": self.received,
+            "failures": self.failures,
+        }
+
+    def _publish_loop(self) -> None:
+        while True:
+            message = self._outbox.get()
+            if message is None:
+                return
+            try:
+                self.client.publish(self.channel, message)
+                self.published += 1
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"发送缓存失效消息失败: {e}")
+
+    def _listen_loop(self) -> None:
+        while not self._stop_event.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not self._stop_event.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.dispatch(message["data"])
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"缓存失效消息订阅中断，稍后重连: {e}")
+                self._stop_event.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+def create_redis_client() -> Any:
+    """
+    按 CACHE_REDIS_URL 创建 Redis 客户端
+
+    Returns:
+        Redis 客户端，未配置或未安装 redis 时返回 None
+    """
+    if settings.CACHE_BACKEND != "redis":
+        return None
+    if redis is None:
+        logger.warning("CACHE_BACKEND=redis 但未安装 redis，使用进程内缓存")
+        return None
+    return redis.Redis.from_url(settings.CACHE_REDIS_URL)
+
+
+def create_cache_backend(client: Any = None) -> CacheBackend:
+    """
+    创建缓存后端
+
+    Args:
+        client: Redis 兼容客户端，None 时使用进程内后端
+
+    Returns:
+        缓存后端
+    """
+    if client is None:
+        return MemoryCacheBackend()
+    return RedisCacheBackend(client, prefix=settings.CACHE_KEY_PREFIX)
+
+
+# 全局缓存后端和失效通知实例
+_redis_client = create_redis_client()
+cache_backend = create_cache_backend(_redis_client)
+invalidation_bus = CacheInvalidationBus(_redis_client, channel=f"{settings.CACHE_KEY_PREFIX}:invalidate")
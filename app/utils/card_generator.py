@@ -2,15 +2,21 @@
 卡密生成工具
 提供卡密生成和验证功能
 """
-import random
+import secrets
 import string
 import re
-from typing import List, Set
+from typing import Any, Dict, Iterator, List, Set, Tuple
 from sqlalchemy.orm import Session
 
 # 定义卡密字符集：A-Z + 2-9（去除容易混淆的字符：0/O/1/I）
 CARD_KEY_CHARSET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
 
+# 批量插入时单条 INSERT 语句包含的最大卡密数量
+CARD_INSERT_CHUNK_SIZE = 1000
+
+# 单个分块因卡密冲突重试的最大次数
+CARD_INSERT_MAX_RETRIES = 5
+
 
 def generate_card_key() -> str:
     """
@@ -28,7 +34,7 @@ def generate_card_key() -> str:
     """
     segments = []
     for _ in range(4):  # 4段
-        segment = ''.join(random.choices(CARD_KEY_CHARSET, k=4))
+        segment = ''.join(secrets.choice(CARD_KEY_CHARSET) for _ in range(4))
         segments.append(segment)
     
     return '-'.join(segments)
@@ -46,8 +52,8 @@ def generate_batch_cards(count: int, db: Session = None) -> List[str]:
         生成的卡密列表
         
     Note:
-        如果提供了 db 参数，会检查数据库中是否已存在相同的卡密
-        如果未提供 db，只保证本次批量生成中的唯一性
+        如果提供了 db 参数，会按候选卡密查询数据库中是否已存在（走 card_key 唯一索引，
+        不加载已有卡密），如果未提供 db，只保证本次批量生成中的唯一性
         
     Example:
         >>> cards = generate_batch_cards(100)
@@ -59,26 +65,24 @@ def generate_batch_cards(count: int, db: Session = None) -> List[str]:
     generated_cards: Set[str] = set()
     cards: List[str] = []
     
-    # 如果提供了数据库会话，导入模型
-    existing_keys: Set[str] = set()
-    if db:
-        from app.models.card import Card
-        # 查询数据库中已存在的卡密
-        existing_cards = db.query(Card.card_key).all()
-        existing_keys = {card.card_key for card in existing_cards}
-    
     # 生成卡密直到达到所需数量
     max_attempts = count * 10  # 最大尝试次数，避免无限循环
     attempts = 0
     
     while len(cards) < count and attempts < max_attempts:
-        card_key = generate_card_key()
-        attempts += 1
+        candidates: List[str] = []
+        while len(cards) + len(candidates) < count and attempts < max_attempts:
+            card_key = generate_card_key()
+            attempts += 1
+            
+            # 检查本批次内是否重复
+            if card_key not in generated_cards:
+                generated_cards.add(card_key)
+                candidates.append(card_key)
         
-        # 检查是否重复
-        if card_key not in generated_cards and card_key not in existing_keys:
-            generated_cards.add(card_key)
-            cards.append(card_key)
+        # 只查询候选卡密中已存在于数据库的部分
+        existing_keys = _find_existing_keys(db, candidates) if db else set()
+        cards.extend(key for key in candidates if key not in existing_keys)
     
     if len(cards) < count:
         raise ValueError(f"生成卡密失败：在 {max_attempts} 次尝试后只生成了 {len(cards)} 个唯一卡密")
@@ -171,6 +175,127 @@ def normalize_card_key(card_key: str) -> str:
     return '-'.join(segments)
 
 
+def _find_existing_keys(db: Session, card_keys: List[str]) -> Set[str]:
+    """
+    查询一批卡密中已存在于数据库的部分
+    
+    Args:
+        db: 数据库会话
+        card_keys: 候选卡密列表
+        
+    Returns:
+        已存在的卡密集合
+    """
+    from app.models.card import Card
+    
+    existing_keys: Set[str] = set()
+    for start in range(0, len(card_keys), CARD_INSERT_CHUNK_SIZE):
+        chunk = card_keys[start:start + CARD_INSERT_CHUNK_SIZE]
+        existing_keys.update(
+            key for (key,) in db.query(Card.card_key).filter(Card.card_key.in_(chunk)).all()
+        )
+    return existing_keys
+
+
+def _insert_cards(
+    db: Session,
+    card_values: Dict[str, Any],
+    card_keys: List[str]
+) -> Tuple[List[Tuple[int, str]], Set[str]]:
+    """
+    用一条多行 INSERT 插入卡密，card_key 冲突的行跳过，其他错误照常抛出
+    
+    - PostgreSQL / SQLite: INSERT ... ON CONFLICT (card_key) DO NOTHING RETURNING id, card_key
+    - MySQL: INSERT ... ON DUPLICATE KEY UPDATE id = id（不用 INSERT IGNORE，避免截断等错误被降级为警告），
+      MySQL 不支持 RETURNING，插入后按卡密查询一次ID；冲突的已有卡密在本语句分配自增ID之前就已存在，
+      ID 小于本语句插入的第一行
+    
+    Args:
+        db: 数据库会话
+        card_values: 除 card_key 之外的卡密字段
+        card_keys: 候选卡密列表
+        
+    Returns:
+        (插入成功的 [(卡密ID, 卡密), ...], 与已有卡密冲突的卡密集合)
+    """
+    from app.models.card import Card
+    
+    rows = [{**card_values, "card_key": key} for key in card_keys]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(Card).values(rows).on_conflict_do_nothing(
+            index_elements=["card_key"]
+        ).returning(Card.id, Card.card_key)
+        inserted = [(card_id, card_key) for card_id, card_key in db.execute(stmt).all()]
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(Card).values(rows)
+        first_id = db.execute(stmt.on_duplicate_key_update(id=Card.id)).lastrowid
+        if not first_id:
+            # 没有插入任何行（全部冲突）
+            return [], set(card_keys)
+        inserted = [
+            (card_id, card_key) for card_id, card_key in db.query(Card.id, Card.card_key).filter(
+                Card.card_key.in_(card_keys), Card.id >= first_id
+            ).all()
+        ]
+    else:
+        raise ValueError(f"不支持的数据库类型: {dialect}")
+    
+    inserted_keys = {card_key for _, card_key in inserted}
+    return inserted, {key for key in card_keys if key not in inserted_keys}
+
+
+def iter_insert_unique_cards(
+    db: Session,
+    count: int,
+    card_values: Dict[str, Any],
+    chunk_size: int = CARD_INSERT_CHUNK_SIZE,
+    max_retries: int = CARD_INSERT_MAX_RETRIES
+) -> Iterator[List[Tuple[int, str]]]:
+    """
+    分块插入指定数量的新卡密，依赖 card_key 唯一索引保证唯一性
+    
+    每个分块先用 secrets 生成候选卡密，再用一条多行 INSERT 插入，冲突的行被跳过。
+    已插入的行保留，只为冲突的卡密生成替换并插入。
+    内存占用只与分块大小有关，与卡密表的规模无关。不提交事务，由调用方决定提交时机。
+    
+    Args:
+        db: 数据库会话
+        count: 要生成的数量
+        card_values: 除 card_key 之外的卡密字段（app_id、expire_time 等）
+        chunk_size: 每条 INSERT 语句包含的卡密数量
+        max_retries: 单个分块冲突重试的最大次数
+        
+    Yields:
+        每个分块插入成功的 [(卡密ID, 卡密), ...]
+        
+    Raises:
+        ValueError: 分块在 max_retries 次重试后仍有冲突
+    """
+    remaining = count
+    while remaining > 0:
+        card_keys = generate_batch_cards(min(chunk_size, remaining))
+        chunk_rows: List[Tuple[int, str]] = []
+        
+        for attempt in range(max_retries + 1):
+            inserted, collided = _insert_cards(db, card_values, card_keys)
+            chunk_rows.extend(inserted)
+            if not collided:
+                break
+            # 只替换与已有卡密冲突的部分
+            card_keys = generate_batch_cards(len(collided))
+        else:
+            raise ValueError(f"生成卡密失败：分块在 {max_retries} 次重试后仍存在冲突")
+        
+        remaining -= len(chunk_rows)
+        yield chunk_rows
+
+
 def generate_unique_card_keys(count: int, db: Session) -> List[str]:
     """
     生成保证数据库唯一的卡密列表
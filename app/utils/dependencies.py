@@ -2,33 +2,51 @@
 API 依赖函数
 提供通用的依赖注入功能，如获取当前用户、验证权限等
 """
-from typing import Optional
+from typing import Optional, AsyncGenerator, Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.sqlalchemy_db import get_sqlalchemy_db
-from app.services.auth_service import AuthService
+from app.db.sqlalchemy_db import get_sqlalchemy_db, get_async_sqlalchemy_db
+from app.services.auth_service import AsyncAuthService
 from app.models.user import UserRole
-import colorama
+from app.utils.token_cache import token_cache
+from app.core.config import settings
+from app.core.logging_uru import mask_token
 from loguru import logger
 # HTTP Bearer Token 认证方案
 security = HTTPBearer()
 
 
-def get_db() -> Session:
+def get_db() -> Generator[Session, None, None]:
     """
     获取数据库会话
     
+    每个请求一个会话，响应结束后关闭并归还连接
+    
     Returns:
         数据库会话
     """
-    return get_sqlalchemy_db()
+    yield from get_sqlalchemy_db()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取异步数据库会话
+    
+    会话在首次查询时才从连接池获取连接，请求结束后归还
+    
+    Returns:
+        异步数据库会话
+    """
+    async for session in get_async_sqlalchemy_db():
+        yield session
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> dict:
     """
     获取当前登录用户信息
@@ -44,22 +62,30 @@ async def get_current_user(
         HTTPException: 认证失败
     """
     token = credentials.credentials
-    print(colorama.Fore.YELLOW + f" 获取当前登录用户信息Token: {token}")
+    
+    # 优先使用缓存的校验结果
+    if settings.TOKEN_CACHE_ENABLED:
+        cached_user = token_cache.get(token)
+        if cached_user is not None:
+            return cached_user
+        # 在校验前读取失效代数，校验期间发生的登出、封禁不会被缓存覆盖
+        generation = token_cache.generation
     
     # 验证Token
-    auth_service = AuthService(db)
-    user_info, error = auth_service.verify_token(token)
-    logger.info(f" Token验证结果 用户信息: {user_info}")
+    auth_service = AsyncAuthService(db)
+    user_info, error = await auth_service.verify_token(token)
     
     if error:
-        print(colorama.Fore.RED + f" Token验证失败: {error}")
+        logger.opt(lazy=True).debug("Token验证失败: {} {}", lambda: mask_token(token), lambda: error)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=error,
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    print(colorama.Fore.GREEN + f" Token验证成功: {user_info}")
+    logger.opt(lazy=True).debug("Token验证成功: {} user_id={}", lambda: mask_token(token), lambda: user_info["user_id"])
+    if settings.TOKEN_CACHE_ENABLED:
+        token_cache.set(token, user_info, generation)
     return user_info
 
 
@@ -87,9 +113,9 @@ async def get_current_admin(
     return current_user
 
 
-def get_optional_current_user(
+async def get_optional_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[dict]:
     """
     获取当前用户信息（可选）
@@ -107,11 +133,20 @@ def get_optional_current_user(
     
     token = credentials.credentials
     
+    if settings.TOKEN_CACHE_ENABLED:
+        cached_user = token_cache.get(token)
+        if cached_user is not None:
+            return cached_user
+        # 在校验前读取失效代数，校验期间发生的登出、封禁不会被缓存覆盖
+        generation = token_cache.generation
+    
     # 验证Token
-    auth_service = AuthService(db)
-    user_info, error = auth_service.verify_token(token)
+    auth_service = AsyncAuthService(db)
+    user_info, error = await auth_service.verify_token(token)
     
     if error:
         return None
     
+    if settings.TOKEN_CACHE_ENABLED:
+        token_cache.set(token, user_info, generation)
     return user_info
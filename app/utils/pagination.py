@@ -0,0 +1,138 @@
+"""
+游标分页工具
+管理后台列表按 (排序时间, id) 做键集分页，游标对客户端不透明；总数按筛选条件短期缓存
+"""
+import base64
+import json
+import threading
+from datetime import datetime
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """
+    把最后一行的 (排序时间, id) 编码为游标
+
+    Args:
+        sort_value: 排序字段的值（created_at / bind_time）
+        row_id: 行ID
+
+    Returns:
+        URL 安全的 base64 字符串
+    """
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析游标
+
+    Args:
+        cursor: encode_cursor 生成的游标
+
+    Returns:
+        (排序时间, id)
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def keyset_page(
+    query: Query,
+    sort_column,
+    id_column,
+    size: int,
+    cursor: Optional[str] = None,
+    sort_key: Optional[Callable[[Any], Tuple[datetime, int]]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (sort_column DESC, id_column DESC) 取一页数据
+
+    从游标位置继续向后读取，不使用 OFFSET，翻到任意深度的代价都相同；
+    多取一行用于判断是否还有下一页。
+
+    Args:
+        query: 已添加筛选条件的查询
+        sort_column: 排序时间列
+        id_column: 主键列（排序时间相同时的次序）
+        size: 每页数量
+        cursor: 上一页返回的游标，None 表示第一页
+        sort_key: 从结果行取出 (排序时间, id) 的函数
+
+    Returns:
+        (本页数据, 下一页游标)，没有下一页时游标为 None
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    return rows, encode_cursor(*sort_key(rows[-1]))
+
+
+class ListTotalCache:
+    """
+    列表总数缓存
+
+    游标分页时按 (列表名称, 筛选条件) 缓存 COUNT 结果，翻页时不再重复统计；
+    总数最多滞后 ADMIN_LIST_TOTAL_CACHE_TTL 秒
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key: Hashable, count: Callable[[], int]) -> int:
+        """
+        获取缓存的总数，未命中时执行 count() 并缓存
+
+        Args:
+            key: 列表名称和筛选条件
+            count: 统计总数的函数
+
+        Returns:
+            总数
+        """
+        with self._lock:
+            total = self._cache.get(key)
+        if total is None:
+            total = count()
+            with self._lock:
+                self._cache[key] = total
+        return total
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._cache.clear()
+
+
+# 全局列表总数缓存实例
+list_total_cache = ListTotalCache(
+    maxsize=1000,
+    ttl=settings.ADMIN_LIST_TOTAL_CACHE_TTL
+)
@@ -0,0 +1,175 @@
+"""
+密码哈希线程池
+把 bcrypt 哈希/校验放到独立线程池中执行，登录高峰时不阻塞事件循环；排队超过上限时直接拒绝
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.utils.security import hash_password, verify_password
+
+
+class PasswordHasherBusy(Exception):
+    """密码哈希线程池已满（接口层应返回 503）"""
+
+
+class PasswordHasher:
+    """
+    密码哈希执行器
+
+    - 使用线程池而不是进程池：bcrypt 计算期间释放 GIL，线程即可利用多核，且不需要序列化参数
+    - 正在执行和排队的任务总数超过 max_workers + queue_limit 时立即抛出 PasswordHasherBusy，
+      不让请求在队列中无限等待
+    - 记录最近的排队等待时间和哈希耗时，用于调整线程数和 bcrypt 轮数
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int, latency_window: int = 1000):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._wait_times = deque(maxlen=latency_window)
+        self._hash_times = deque(maxlen=latency_window)
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """启动线程池（首次提交任务时也会自动启动）"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+                logger.info(f"密码哈希线程池已启动，线程数 {self.max_workers}，排队上限 {self.queue_limit}")
+
+    def stop(self) -> None:
+        """停止线程池，等待执行中的任务完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def hash(self, password: str) -> str:
+        """
+        在线程池中生成密码哈希
+
+        Args:
+            password: 明文密码
+
+        Returns:
+            密码哈希值
+
+        Raises:
+            PasswordHasherBusy: 线程池已满
+        """
+        return await self._submit(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        在线程池中校验密码
+
+        Args:
+            plain_password: 明文密码
+            hashed_password: 哈希密码
+
+        Returns:
+            校验结果
+
+        Raises:
+            PasswordHasherBusy: 线程池已满
+        """
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取线程池统计
+
+        Returns:
+            线程数、排队深度、拒绝次数、排队等待时间和哈希耗时（毫秒）
+        """
+        with self._lock:
+            wait_times = list(self._wait_times)
+            hash_times = list(self._hash_times)
+            return {
+                "max_workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self._running, 0),
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms": _latency_summary(wait_times),
+                "hash_ms": _latency_summary(hash_times),
+            }
+
+    def clear(self) -> None:
+        """重置统计"""
+        with self._lock:
+            self._wait_times.clear()
+            self._hash_times.clear()
+            self.max_queue_depth = 0
+            self.completed = 0
+            self.rejected = 0
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._executor is None:
+            self.start()
+
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.queue_limit:
+                self.rejected += 1
+                raise PasswordHasherBusy("登录请求过多，请稍后重试")
+            self._in_flight += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._in_flight - self.max_workers)
+            executor = self._executor
+
+        try:
+            future = executor.submit(self._timed, func, time.perf_counter(), *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _timed(self, func: Callable[..., Any], submitted_at: float, *args: Any) -> Any:
+        """线程池中执行：记录排队等待时间和执行耗时"""
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._wait_times.append(started_at - submitted_at)
+                self._hash_times.append(finished_at - started_at)
+
+
+def _latency_summary(samples: list) -> Dict[str, float]:
+    """最近样本的平均值、P95 和最大值（毫秒）"""
+    if not samples:
+        return {"avg": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "avg": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p95": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+# 全局密码哈希执行器实例
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT
+)
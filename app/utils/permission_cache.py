@@ -0,0 +1,285 @@
+"""
+有效权限快照缓存
+按 (user_id, device_id) 缓存用户在设备上的有效权限，权限校验接口直接从快照判断
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.utils.token_cache import _CountingTTLCache
+from app.utils.cache_backend import invalidation_bus
+
+# 跨 worker 失效通知的主题
+_INVALIDATION_TOPIC = "permission_cache"
+
+
+@dataclass(frozen=True)
+class PermissionSnapshot:
+    """
+    用户在某个设备上的有效权限快照
+
+    Attributes:
+        error: 用户不存在、被封禁、未绑定卡密时的错误信息，正常为 None
+        username: 用户名（用于日志）
+        grants: 权限标识 -> (授予该权限的卡密ID, 卡密过期时间)，按卡密绑定顺序取第一张
+        device_disabled: 是否在授予权限的卡密之前遇到了被禁用的设备绑定
+        active_permissions: 所有启用的设备绑定上的卡密授予的权限标识，不受前面被禁用的绑定影响
+        card_ids: 用户所有有效绑定的卡密ID，卡密变更时据此失效
+        valid_until: 最早过期的卡密的过期时间，过期后快照不再可信
+        latest_expire_time: 设备绑定启用的有效卡密中最晚的过期时间
+    """
+    error: Optional[str] = None
+    username: Optional[str] = None
+    grants: Dict[str, Tuple[int, datetime]] = field(default_factory=dict)
+    device_disabled: bool = False
+    active_permissions: FrozenSet[str] = frozenset()
+    card_ids: FrozenSet[int] = frozenset()
+    valid_until: Optional[datetime] = None
+    latest_expire_time: Optional[datetime] = None
+
+    @property
+    def permissions(self) -> FrozenSet[str]:
+        """用户在该设备上拥有的权限标识集合（所有启用的设备绑定）"""
+        return self.active_permissions
+
+    def check(self, permission: str) -> Tuple[bool, str, Optional[int], Optional[datetime]]:
+        """
+        判断快照是否授予指定权限
+
+        Args:
+            permission: 权限标识
+
+        Returns:
+            (是否允许, 提示信息, 卡密ID, 卡密过期时间)
+        """
+        if self.error:
+            return False, self.error, None, None
+        grant = self.grants.get(permission)
+        if grant is not None:
+            return True, "权限验证通过", grant[0], grant[1]
+        if self.device_disabled:
+            return False, "设备已被禁用", None, None
+        return False, "没有有效的卡密或权限配置不匹配", None, None
+
+
+class PermissionSnapshotCache:
+    """
+    有界的权限快照缓存
+
+    - 键为 (user_id, device_id)，条目在 PERMISSION_CACHE_TTL 秒后过期，
+      且不会超过快照中最早过期的卡密的过期时间
+    - 维护用户ID、卡密ID -> 缓存键的索引，绑定/解绑、卡密/设备/用户状态变更时按索引失效
+
+    Note:
+        缓存是进程内的，配置 CACHE_BACKEND=redis 时主动失效会通过 invalidation_bus 通知其他 worker，
+        否则其他 worker 中的条目最多在 PERMISSION_CACHE_TTL 秒后失效
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache: TTLCache = _CountingTTLCache(maxsize, ttl, self._on_evict)
+        self._user_keys: Dict[int, Set[Tuple[int, str]]] = {}
+        self._card_keys: Dict[int, Set[Tuple[int, str]]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # 每次失效递增，用于丢弃在失效之前开始构建的快照
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """当前失效代数，构建快照前读取，写入时传给 set()"""
+        return self._generation
+
+    def get(self, user_id: int, device_id: str) -> Optional[PermissionSnapshot]:
+        """
+        获取权限快照
+
+        Args:
+            user_id: 用户ID
+            device_id: 设备ID
+
+        Returns:
+            权限快照，未命中或已过期返回 None
+        """
+        key = (user_id, device_id)
+        with self._lock:
+            snapshot: Optional[PermissionSnapshot] = self._cache.get(key)
+            if snapshot is None:
+                self.misses += 1
+                return None
+            if snapshot.valid_until is not None and snapshot.valid_until < datetime.now():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return snapshot
+
+    def set(
+        self,
+        user_id: int,
+        device_id: str,
+        snapshot: PermissionSnapshot,
+        generation: Optional[int] = None
+    ) -> bool:
+        """
+        缓存权限快照
+
+        Args:
+            user_id: 用户ID
+            device_id: 设备ID
+            snapshot: 权限快照
+            generation: 开始构建快照时的失效代数，期间发生过失效则不缓存
+
+        Returns:
+            是否已缓存
+        """
+        key = (user_id, device_id)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._remove(key)
+            self._cache[key] = snapshot
+            self._user_keys.setdefault(user_id, set()).add(key)
+            for card_id in snapshot.card_ids:
+                self._card_keys.setdefault(card_id, set()).add(key)
+        return True
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        失效某个用户的全部快照（绑定卡密、用户状态变更时调用）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            失效的条目数量
+        """
+        return self.invalidate_users([user_id])
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> int:
+        """
+        失效一批用户的全部快照（批量修改用户状态时调用，只加一次锁）
+
+        Args:
+            user_ids: 用户ID列表
+
+        Returns:
+            失效的条目数量
+        """
+        user_ids = list(user_ids)
+        removed = self._invalidate_index(self._user_keys, user_ids)
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "users", user_ids)
+        return removed
+
+    def invalidate_cards(self, card_ids: Iterable[int]) -> int:
+        """
+        失效包含这些卡密的全部快照（卡密状态、权限、设备绑定变更时调用）
+
+        Args:
+            card_ids: 卡密ID列表
+
+        Returns:
+            失效的条目数量
+        """
+        card_ids = list(card_ids)
+        removed = self._invalidate_index(self._card_keys, card_ids)
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "cards", card_ids)
+        return removed
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._clear()
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "clear")
+
+    def apply_invalidation(self, action: str, ids: Optional[list] = None) -> None:
+        """
+        处理其他 worker 的失效通知（只失效本进程，不再转发）
+
+        Args:
+            action: users-按用户ID失效，cards-按卡密ID失效，clear-清空
+            ids: 用户ID或卡密ID列表
+        """
+        if action == "users":
+            self._invalidate_index(self._user_keys, ids)
+        elif action == "cards":
+            self._invalidate_index(self._card_keys, ids)
+        elif action == "clear":
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            命中、未命中、主动失效次数以及当前容量
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _invalidate_index(self, index: Dict[int, Set[Tuple[int, str]]], ids: Iterable[int]) -> int:
+        """按用户ID或卡密ID索引失效条目"""
+        with self._lock:
+            self._generation += 1
+            keys: Set[Tuple[int, str]] = set()
+            for index_key in ids:
+                keys.update(index.get(index_key, ()))
+            return self._invalidate_keys(keys)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            self._user_keys.clear()
+            self._card_keys.clear()
+
+    def _invalidate_keys(self, keys: Iterable[Tuple[int, str]]) -> int:
+        """删除一组条目并计数，调用方需持有锁"""
+        removed = sum(1 for key in list(keys) if self._remove(key))
+        self.invalidations += removed
+        return removed
+
+    def _remove(self, key: Tuple[int, str]) -> bool:
+        """删除条目并维护索引，调用方需持有锁"""
+        snapshot = self._cache.pop(key, None)
+        if snapshot is None:
+            return False
+        self._on_evict(key, snapshot)
+        return True
+
+    def _on_evict(self, key: Tuple[int, str], snapshot: PermissionSnapshot) -> None:
+        """删除、容量淘汰或过期清理时维护索引"""
+        self._discard(self._user_keys, key[0], key)
+        for card_id in snapshot.card_ids:
+            self._discard(self._card_keys, card_id, key)
+
+    @staticmethod
+    def _discard(index: Dict[int, Set[Tuple[int, str]]], index_key: int, key: Tuple[int, str]) -> None:
+        keys = index.get(index_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[index_key]
+
+
+# 全局权限快照缓存实例
+permission_cache = PermissionSnapshotCache(
+    maxsize=settings.PERMISSION_CACHE_MAXSIZE,
+    ttl=settings.PERMISSION_CACHE_TTL
+)
+invalidation_bus.subscribe(_INVALIDATION_TOPIC, permission_cache.apply_invalidation)
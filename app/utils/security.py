@@ -3,13 +3,52 @@
 提供密码加密和JWT Token相关功能
 """
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
+
+def build_password_context(
+    scheme: Optional[str] = None,
+    rounds: Optional[int] = None,
+    legacy_schemes: Optional[List[str]] = None
+) -> CryptContext:
+    """
+    按配置构建密码加密上下文
+    
+    Args:
+        scheme: 新密码使用的算法，默认 PASSWORD_HASH_SCHEME
+        rounds: 哈希轮数，默认 PASSWORD_HASH_ROUNDS
+        legacy_schemes: 仅用于校验的旧算法，默认 PASSWORD_LEGACY_SCHEMES
+        
+    Returns:
+        CryptContext 实例
+        
+    Note:
+        指定轮数时把最小、最大轮数都设为该值，轮数更高或更低的哈希都会被 needs_update 判定为需要更新
+    """
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    rounds = settings.PASSWORD_HASH_ROUNDS if rounds is None else rounds
+    legacy_schemes = settings.PASSWORD_LEGACY_SCHEMES if legacy_schemes is None else legacy_schemes
+    
+    options = {}
+    if rounds is not None:
+        options = {
+            f"{scheme}__default_rounds": rounds,
+            f"{scheme}__min_rounds": rounds,
+            f"{scheme}__max_rounds": rounds,
+        }
+    return CryptContext(
+        schemes=[scheme] + [name for name in legacy_schemes if name != scheme],
+        default=scheme,
+        deprecated="auto",
+        **options
+    )
+
+
 # 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context()
 
 
 def hash_password(password: str) -> str:
@@ -49,6 +88,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    判断密码哈希是否需要按当前配置重新生成（算法已弃用或轮数与配置不一致）
+    
+    Args:
+        hashed_password: 哈希密码
+        
+    Returns:
+        是否需要重新哈希
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
 def create_access_token(
     data: Dict[str, Any],
     expires_delta: Optional[timedelta] = None
@@ -76,7 +128,8 @@ def create_access_token(
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # iat 用于无状态校验模式下判断Token是否签发于用户被吊销之前
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
     
     # 生成JWT
     encoded_jwt = jwt.encode(
@@ -0,0 +1,250 @@
+"""
+Token 校验结果缓存
+在 get_current_user 中缓存 Token -> 用户信息，避免同一客户端的高频请求重复校验Token
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.utils.security import get_token_expire_time
+from app.utils.token_revocation import hash_token
+from app.utils.cache_backend import invalidation_bus
+
+# 跨 worker 失效通知的主题
+_INVALIDATION_TOPIC = "token_cache"
+
+
+class _CountingTTLCache(TTLCache):
+    """在容量淘汰和过期清理时回调的 TTLCache"""
+
+    def __init__(self, maxsize: int, ttl: int, on_evict):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key, value)
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired or ():
+            self._on_evict(key, value)
+        return expired
+
+
+class TokenCache:
+    """
+    有界的 LRU/TTL Token 缓存
+
+    - 键为 Token 的 SHA-256 摘要，值为 verify_token 返回的用户信息
+    - 条目在 TOKEN_CACHE_TTL 秒后过期，且不会超过 Token 本身的过期时间
+    - 维护用户ID -> 缓存键的索引，登出、封禁、删除用户时可以按用户立即失效
+
+    Note:
+        缓存是进程内的，配置 CACHE_BACKEND=redis 时主动失效会通过 invalidation_bus 通知其他 worker，
+        否则其他 worker 中的条目最多在 TOKEN_CACHE_TTL 秒后失效
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache: TTLCache = _CountingTTLCache(maxsize, ttl, self._on_evict)
+        self._user_keys: Dict[Any, Set[str]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # 每次失效递增，用于丢弃在失效之前开始校验的结果
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """当前失效代数，校验 Token 前读取，写入时传给 set()"""
+        return self._generation
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        获取缓存的用户信息
+
+        Args:
+            token: JWT Token
+
+        Returns:
+            用户信息字典，未命中返回 None
+        """
+        key = hash_token(token)
+        with self._lock:
+            entry: Optional[Tuple[dict, float]] = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            user_info, expires_at = entry
+            if expires_at <= time.time():
+                # Token 本身已过期，交给 verify_token 返回准确的错误信息
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return dict(user_info)
+
+    def set(self, token: str, user_info: dict, generation: Optional[int] = None) -> bool:
+        """
+        缓存校验通过的用户信息
+
+        Args:
+            token: JWT Token
+            user_info: verify_token 返回的用户信息
+            generation: 开始校验时的失效代数，期间发生过登出、封禁等失效则不缓存
+
+        Returns:
+            是否已缓存
+        """
+        expire_time = get_token_expire_time(token)
+        if expire_time is None:
+            return False
+
+        key = hash_token(token)
+        user_id = user_info.get("user_id")
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._cache[key] = (dict(user_info), expire_time.timestamp())
+            self._user_keys.setdefault(user_id, set()).add(key)
+        return True
+
+    def invalidate_token(self, token: str) -> None:
+        """
+        失效单个 Token 的缓存（登出、Token 被替换时调用）
+
+        Args:
+            token: JWT Token
+        """
+        key = hash_token(token)
+        self._invalidate_keys([key])
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "keys", [key])
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        失效某个用户的全部缓存（封禁、删除用户时调用）
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            失效的条目数量
+        """
+        return self.invalidate_users([user_id])
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> int:
+        """
+        失效一批用户的全部缓存（批量修改用户状态时调用，只加一次锁）
+
+        Args:
+            user_ids: 用户ID列表
+
+        Returns:
+            失效的条目数量
+        """
+        user_ids = list(user_ids)
+        removed = self._invalidate_users(user_ids)
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "users", user_ids)
+        return removed
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._clear()
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "clear")
+
+    def apply_invalidation(self, action: str, ids: Optional[list] = None) -> None:
+        """
+        处理其他 worker 的失效通知（只失效本进程，不再转发）
+
+        Args:
+            action: keys-按 Token 摘要失效，users-按用户ID失效，clear-清空
+            ids: Token 摘要或用户ID列表
+        """
+        if action == "keys":
+            self._invalidate_keys(ids)
+        elif action == "users":
+            self._invalidate_users(ids)
+        elif action == "clear":
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计，用于评估容量和TTL配置
+
+        Returns:
+            命中、未命中、淘汰、主动失效次数以及当前容量
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _invalidate_keys(self, keys: Iterable[str]) -> int:
+        with self._lock:
+            self._generation += 1
+            removed = sum(1 for key in keys if self._remove(key))
+            self.invalidations += removed
+        return removed
+
+    def _invalidate_users(self, user_ids: Iterable[int]) -> int:
+        removed = 0
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                keys = list(self._user_keys.get(user_id, ()))
+                removed += sum(1 for key in keys if self._remove(key))
+                self._user_keys.pop(user_id, None)
+            self.invalidations += removed
+        return removed
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            self._user_keys.clear()
+
+    def _remove(self, key: str) -> bool:
+        """删除条目并维护用户索引，调用方需持有锁"""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self._discard_user_key(entry[0].get("user_id"), key)
+        return True
+
+    def _on_evict(self, key: str, entry: Tuple[dict, float]) -> None:
+        """容量淘汰或过期清理时维护用户索引"""
+        self.evictions += 1
+        self._discard_user_key(entry[0].get("user_id"), key)
+
+    def _discard_user_key(self, user_id: Any, key: str) -> None:
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+
+# 全局Token缓存实例
+token_cache = TokenCache(
+    maxsize=settings.TOKEN_CACHE_MAXSIZE,
+    ttl=settings.TOKEN_CACHE_TTL
+)
+invalidation_bus.subscribe(_INVALIDATION_TOPIC, token_cache.apply_invalidation)
@@ -0,0 +1,225 @@
+"""
+Token 吊销列表
+为无状态 Token 校验模式提供进程内的吊销集合，由登出、封禁、Token 替换等事件写入
+"""
+import hashlib
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.utils.cache_backend import invalidation_bus
+
+# 跨 worker 吊销通知的主题
+_INVALIDATION_TOPIC = "token_revocation"
+
+
+def hash_token(token: str) -> str:
+    """
+    计算 Token 摘要
+
+    吊销集合和缓存中只保存摘要，避免长期持有完整的 Token 字符串
+
+    Args:
+        token: JWT Token
+
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenRevocationList:
+    """
+    进程内 Token 吊销列表
+
+    - Token 级吊销：保存 Token 摘要 -> Token 过期时间，Token 过期后条目自动清理
+    - 用户级吊销：保存用户ID -> 吊销时间，在此时间之前签发的 Token 全部失效，
+      条目在 ACCESS_TOKEN_EXPIRE_MINUTES 之后清理（届时旧 Token 已全部过期）
+
+    Note:
+        配置 CACHE_BACKEND=redis 时吊销事件通过 invalidation_bus 通知其他 worker；
+        未配置时吊销只在当前进程内可见，多 worker 部署应使用 strict 校验模式。
+        吊销列表不持久化，进程启动之前的吊销事件不可见：签发时间早于 started_at 的 Token
+        不由吊销列表判断（见 covers），调用方应回退到数据库校验
+    """
+
+    # 清理过期条目的最小间隔（秒）
+    PURGE_INTERVAL = 60
+
+    def __init__(self):
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge_at = 0.0
+        # 本进程开始接收吊销事件的时间
+        self.started_at = time.time()
+
+    def revoke_token(self, token: str, expires_at: Optional[float] = None) -> None:
+        """
+        吊销单个 Token
+
+        Args:
+            token: JWT Token
+            expires_at: Token 过期时间戳，未提供时按最长有效期保留
+        """
+        if expires_at is None:
+            expires_at = time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        token_hash = hash_token(token)
+        with self._lock:
+            self._tokens[token_hash] = expires_at
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "token", token_hash, expires_at)
+        self._maybe_purge()
+
+    def revoke_user(self, user_id: int, revoked_at: Optional[float] = None) -> None:
+        """
+        吊销用户在此刻之前签发的所有 Token（封禁、删除用户时调用）
+
+        Args:
+            user_id: 用户ID
+            revoked_at: 吊销时间戳，默认当前时间
+        """
+        self.revoke_users([user_id], revoked_at)
+
+    def restore_user(self, user_id: int) -> None:
+        """
+        撤销用户级吊销（解封用户时调用）
+
+        Args:
+            user_id: 用户ID
+        """
+        self.restore_users([user_id])
+
+    def revoke_users(self, user_ids: Iterable[int], revoked_at: Optional[float] = None) -> None:
+        """
+        批量吊销用户在此刻之前签发的所有 Token（批量封禁时调用）
+
+        Args:
+            user_ids: 用户ID列表
+            revoked_at: 吊销时间戳，默认当前时间
+        """
+        revoked_at = revoked_at if revoked_at is not None else time.time()
+        user_ids = list(user_ids)
+        with self._lock:
+            for user_id in user_ids:
+                self._users[user_id] = revoked_at
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "users", user_ids, revoked_at)
+        self._maybe_purge()
+
+    def restore_users(self, user_ids: Iterable[int]) -> None:
+        """
+        批量撤销用户级吊销（批量解封时调用）
+
+        Args:
+            user_ids: 用户ID列表
+        """
+        user_ids = list(user_ids)
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+        invalidation_bus.publish(_INVALIDATION_TOPIC, "restore", user_ids)
+
+    def apply_invalidation(self, action: str, *args) -> None:
+        """
+        处理其他 worker 的吊销通知（只更新本进程，不再转发）
+
+        Args:
+            action: token-吊销单个 Token（摘要, 过期时间），users-吊销用户（用户ID列表, 吊销时间），
+                    restore-撤销用户级吊销（用户ID列表）
+            args: 通知参数
+        """
+        with self._lock:
+            if action == "token":
+                token_hash, expires_at = args
+                self._tokens[token_hash] = expires_at
+            elif action == "users":
+                user_ids, revoked_at = args
+                for user_id in user_ids:
+                    self._users[user_id] = revoked_at
+            elif action == "restore":
+                for user_id in args[0]:
+                    self._users.pop(user_id, None)
+
+    def covers(self, issued_at: Optional[float]) -> bool:
+        """
+        判断吊销列表能否对该 Token 做出判断
+
+        Token 在本进程启动之后签发时，针对它的吊销（登出、替换、封禁）都发生在启动之后，已记录在列表中；
+        更早签发的 Token 可能在重启之前已被吊销，需要回退到数据库校验
+
+        Args:
+            issued_at: Token 签发时间戳（iat），缺失时视为最早签发
+
+        Returns:
+            是否由吊销列表判断
+        """
+        return issued_at is not None and issued_at >= self.started_at
+
+    def is_revoked(self, token: str, user_id: int, issued_at: Optional[float]) -> bool:
+        """
+        判断 Token 是否已被吊销
+
+        Args:
+            token: JWT Token
+            user_id: Token 中的用户ID
+            issued_at: Token 签发时间戳（iat），缺失时视为最早签发
+
+        Returns:
+            是否已吊销
+        """
+        self._maybe_purge()
+        with self._lock:
+            if hash_token(token) in self._tokens:
+                return True
+            revoked_at = self._users.get(user_id)
+        if revoked_at is None:
+            return False
+        return (issued_at or 0) <= revoked_at
+
+    def purge_expired(self) -> int:
+        """
+        清理已经没有意义的吊销条目
+
+        Returns:
+            清理的条目数量
+        """
+        now = time.time()
+        user_ttl = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        with self._lock:
+            expired_tokens = [k for k, exp in self._tokens.items() if exp < now]
+            for key in expired_tokens:
+                del self._tokens[key]
+            expired_users = [k for k, ts in self._users.items() if ts + user_ttl < now]
+            for key in expired_users:
+                del self._users[key]
+            self._next_purge_at = now + self.PURGE_INTERVAL
+        return len(expired_tokens) + len(expired_users)
+
+    def clear(self) -> None:
+        """清空吊销列表"""
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取吊销列表的规模
+
+        Returns:
+            {"revoked_tokens": Token 条目数, "revoked_users": 用户条目数}
+        """
+        with self._lock:
+            return {
+                "revoked_tokens": len(self._tokens),
+                "revoked_users": len(self._users),
+            }
+
+    def _maybe_purge(self) -> None:
+        """按最小间隔触发清理，避免每次调用都遍历"""
+        if time.time() >= self._next_purge_at:
+            self.purge_expired()
+
+
+# 全局吊销列表实例
+token_revocation = TokenRevocationList()
+invalidation_bus.subscribe(_INVALIDATION_TOPIC, token_revocation.apply_invalidation)
@@ -37,6 +37,12 @@ def override_get_db():
 @pytest.fixture(scope="function")
 def db_session():
     """数据库会话夹具"""
+    from app.utils.permission_cache import permission_cache
+    from app.utils.token_cache import token_cache
+    from app.utils.pagination import list_total_cache
+    from app.services.statistics_service import statistics_snapshot
+    from app.decorators.cache_decorator import clear_cache
+    
     # 创建所有表
     Base.metadata.create_all(bind=engine)
     
@@ -47,6 +53,12 @@ def db_session():
         db.close()
         # 测试结束后删除所有表
         Base.metadata.drop_all(bind=engine)
+        # 每个测试重建的数据库会复用相同的ID，清空进程内缓存避免串用
+        permission_cache.clear()
+        token_cache.clear()
+        list_total_cache.clear()
+        statistics_snapshot.clear()
+        clear_cache()
 
 
 @pytest.fixture(scope="function")
@@ -59,12 +71,11 @@ def client(db_session):
 
 
 @pytest.fixture(scope="function")
-def test_app():
+def test_app(db_session):
     """获取应用实例"""
     from app.models.app import App, AppStatus
-    from app.db.sqlalchemy_db import get_sqlalchemy_db
     
-    db = get_sqlalchemy_db()
+    db = db_session
     
     # 检查是否已存在测试应用
     existing_app = db.query(App).filter(App.app_key == "test_app").first()
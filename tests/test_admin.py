@@ -0,0 +1,240 @@
+"""
+管理员模块测试
+"""
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+
+@contextmanager
+def count_queries(db_session):
+    """统计代码块内执行的 SQL 语句数量"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def create_bound_cards(db_session, app_id, user_count):
+    """为每个用户创建一张已绑定一个设备的卡密"""
+    from app.models.user import User, UserStatus, UserRole
+    from app.models.card import Card, CardStatus
+    from app.models.user_card import UserCard, UserCardStatus
+    from app.models.card_device import CardDevice, CardDeviceStatus
+
+    for i in range(user_count):
+        user = User(username=f"list_user_{i}", password_hash="x", status=UserStatus.NORMAL, role=UserRole.USER)
+        card = Card(
+            app_id=app_id,
+            card_key=f"LIST-CARD-0000-{i:04d}",
+            status=CardStatus.USED,
+            expire_time=datetime.now() + timedelta(days=30),
+            permissions=["wechat"]
+        )
+        db_session.add_all([user, card])
+        db_session.flush()
+        db_session.add(UserCard(user_id=user.id, card_id=card.id, status=UserCardStatus.ACTIVE))
+        db_session.add(CardDevice(card_id=card.id, device_id=f"list_device_{i}", status=CardDeviceStatus.ACTIVE))
+    db_session.commit()
+
+
+class TestAdminListQueries:
+    """管理后台列表查询次数测试"""
+
+    @pytest.mark.parametrize("method", ["get_users_list", "get_cards_list", "get_devices_list"])
+    def test_query_count_independent_of_page_size(self, db_session, test_app, method):
+        """测试每页的查询次数不随行数增长"""
+        from app.services.admin_service import AdminService
+
+        create_bound_cards(db_session, test_app.id, 12)
+        admin_service = AdminService(db_session)
+
+        with count_queries(db_session) as small_page:
+            rows, total, error = getattr(admin_service, method)(page=1, size=2)
+        assert error is None and len(rows) == 2
+
+        with count_queries(db_session) as large_page:
+            rows, total, error = getattr(admin_service, method)(page=1, size=12)
+        assert error is None and len(rows) == 12
+
+        assert len(large_page) == len(small_page)
+        assert len(large_page) <= 4
+
+    def test_cards_list_counts(self, db_session, test_app):
+        """测试卡密列表的绑定用户数、设备数和应用名称"""
+        from app.services.admin_service import AdminService
+
+        create_bound_cards(db_session, test_app.id, 3)
+
+        cards, total, error = AdminService(db_session).get_cards_list(page=1, size=10)
+
+        assert error is None
+        assert total == 3
+        assert all(card["bind_user_count"] == 1 for card in cards)
+        assert all(card["bind_device_count"] == 1 for card in cards)
+        assert all(card["app_name"] == test_app.app_name for card in cards)
+
+
+class TestAdminCursorPagination:
+    """管理后台游标分页测试"""
+
+    def test_cursor_walks_all_rows_once(self, db_session, test_app):
+        """测试游标翻页覆盖全部数据且不重复（created_at 相同时按 id 排序）"""
+        from app.services.admin_service import AdminService
+        from app.models.card import Card
+
+        create_bound_cards(db_session, test_app.id, 7)
+        same_time = datetime.now().replace(microsecond=0)
+        db_session.query(Card).update({Card.created_at: same_time})
+        db_session.commit()
+
+        admin_service = AdminService(db_session)
+        seen, cursor = [], None
+        while True:
+            cards, cursor, total, error = admin_service.get_cards_list_by_cursor(size=3, cursor=cursor, with_total=True)
+            assert error is None and total == 7
+            seen.extend(card["id"] for card in cards)
+            if cursor is None:
+                break
+
+        assert seen == sorted(seen, reverse=True)
+        assert len(seen) == len(set(seen)) == 7
+
+    def test_invalid_cursor(self, db_session):
+        """测试无效游标返回错误信息"""
+        from app.services.admin_service import AdminService
+
+        users, cursor, total, error = AdminService(db_session).get_users_list_by_cursor(cursor="not-a-cursor")
+
+        assert users == [] and cursor is None
+        assert error == "无效的分页游标"
+
+
+class TestAdminStatistics:
+    """管理后台统计数据测试"""
+
+    def test_statistics_grouped_and_cached(self, db_session, test_app):
+        """测试统计数据按表分组查询，快照未过期时不访问数据库"""
+        from app.services.admin_service import AdminService
+        from app.models.card import Card, CardStatus
+
+        create_bound_cards(db_session, test_app.id, 3)
+        db_session.query(Card).filter(Card.card_key == "LIST-CARD-0000-0000").update({Card.status: CardStatus.DISABLED})
+        db_session.commit()
+        admin_service = AdminService(db_session)
+
+        with count_queries(db_session) as first_load:
+            statistics, error = admin_service.get_statistics()
+        assert error is None
+        assert len(first_load) == 4
+        assert statistics["users"] == {"total": 3, "normal": 3, "banned": 0}
+        assert statistics["cards"] == {"total": 3, "unused": 0, "used": 2, "disabled": 1}
+        assert statistics["devices"]["total"] == 3
+        assert statistics["apps"] == {"total": 1, "active": 1}
+
+        with count_queries(db_session) as cached_load:
+            cached, error = admin_service.get_statistics()
+        assert error is None and cached == statistics
+        assert cached_load == []
+
+
+class TestAppStats:
+    """应用统计汇总测试"""
+
+    def test_counters_match_reconcile(self, db_session, test_app, test_user):
+        """测试写路径增量维护的计数与重新统计的结果一致"""
+        from app.services.admin_service import AdminService
+        from app.services.card_service import CardService
+        from app.services.app_stats_service import APP_STATS_COUNTERS, reconcile_app_stats
+        from app.models.app_stats import AppStats
+        from app.models.card import Card
+        from app.models.card_device import CardDevice
+
+        admin_service = AdminService(db_session)
+        card_service = CardService(db_session)
+
+        card_keys, error = admin_service.generate_cards(
+            app_id=test_app.id, count=3, expire_time=datetime.now() + timedelta(days=30),
+            max_device_count=2, permissions=["wechat"]
+        )
+        assert error is None
+        cards = [db_session.query(Card).filter(Card.card_key == key).one() for key in card_keys]
+
+        for card, device_id in ((cards[0], "stats_device_1"), (cards[0], "stats_device_2"), (cards[1], "stats_device_3")):
+            _, error = card_service.bind_card(test_user.id, card.card_key, test_app.id, device_id)
+            assert error is None
+
+        admin_service.update_card_status(cards[2].id, "disabled")
+        card_service.unbind_device(test_user.id, cards[0].id, "stats_device_1")
+        device = db_session.query(CardDevice).filter(CardDevice.device_id == "stats_device_2").one()
+        admin_service.update_device_status(device.id, "disabled")
+        card_service.batch_delete_cards([cards[1].id])
+
+        def counters():
+            db_session.expire_all()
+            stats = db_session.query(AppStats).filter(AppStats.app_id == test_app.id).one()
+            return {column: getattr(stats, column) for column in APP_STATS_COUNTERS}
+
+        maintained = counters()
+        assert maintained == {
+            "cards_unused": 0, "cards_used": 1, "cards_disabled": 1,
+            "active_bindings": 1, "active_devices": 0, "registered_users": 1
+        }
+
+        reconcile_app_stats(db_session)
+        db_session.commit()
+        assert counters() == maintained
+
+
+class TestBulkStatusUpdate:
+    """批量更新状态测试"""
+
+    def test_bulk_disable_cards_by_filter(self, db_session, test_app, monkeypatch):
+        """测试按筛选条件分块禁用卡密，计数器同步调整"""
+        from app.core.config import settings
+        from app.services.admin_service import AdminService
+        from app.services.app_stats_service import APP_STATS_COUNTERS, reconcile_app_stats
+        from app.models.app_stats import AppStats
+        from app.models.card import Card, CardStatus
+
+        monkeypatch.setattr(settings, "BULK_UPDATE_CHUNK_SIZE", 2)
+        admin_service = AdminService(db_session)
+        for remark, count in (("leaked", 5), ("kept", 2)):
+            _, error = admin_service.generate_cards(
+                app_id=test_app.id, count=count, expire_time=datetime.now() + timedelta(days=30),
+                max_device_count=1, permissions=["wechat"], remark=remark
+            )
+            assert error is None
+        leaked = db_session.query(Card).filter(Card.remark == "leaked").order_by(Card.id).all()
+        admin_service.update_card_status(leaked[0].id, "disabled")
+
+        affected, error = admin_service.bulk_update_card_status("disabled", app_id=test_app.id, remark="leaked")
+        assert error is None
+        assert affected == 4
+
+        affected, error = admin_service.bulk_update_card_status("disabled")
+        assert affected == 0 and error == "请提供ID列表或筛选条件"
+
+        db_session.expire_all()
+        statuses = dict(db_session.query(Card.remark, Card.status).distinct().all())
+        assert statuses == {"leaked": CardStatus.DISABLED, "kept": CardStatus.UNUSED}
+
+        def counters():
+            db_session.expire_all()
+            stats = db_session.query(AppStats).filter(AppStats.app_id == test_app.id).one()
+            return {column: getattr(stats, column) for column in APP_STATS_COUNTERS}
+
+        maintained = counters()
+        assert maintained["cards_disabled"] == 5 and maintained["cards_unused"] == 2
+        reconcile_app_stats(db_session)
+        db_session.commit()
+        assert counters() == maintained
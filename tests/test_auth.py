@@ -132,3 +132,226 @@ class TestAuthService:
         assert decoded is not None
         assert decoded["user_id"] == 1
         assert decoded["username"] == "testuser"
+
+
+class TestTokenRevocation:
+    """Token 吊销列表测试"""
+    
+    def test_revoke_token(self):
+        """测试单个Token吊销"""
+        import time
+        from app.utils.token_revocation import TokenRevocationList
+        
+        revocation = TokenRevocationList()
+        revocation.revoke_token("token-a", time.time() + 60)
+        
+        assert revocation.is_revoked("token-a", 1, time.time())
+        assert not revocation.is_revoked("token-b", 1, time.time())
+    
+    def test_revoke_user(self):
+        """测试用户级吊销只影响吊销之前签发的Token"""
+        import time
+        from app.utils.token_revocation import TokenRevocationList
+        
+        revocation = TokenRevocationList()
+        revoked_at = time.time()
+        revocation.revoke_user(1, revoked_at)
+        
+        assert revocation.is_revoked("token-a", 1, revoked_at - 10)
+        assert revocation.is_revoked("token-a", 1, None)
+        assert not revocation.is_revoked("token-a", 1, revoked_at + 10)
+        assert not revocation.is_revoked("token-a", 2, revoked_at - 10)
+        
+        # 解封后恢复
+        revocation.restore_user(1)
+        assert not revocation.is_revoked("token-a", 1, revoked_at - 10)
+    
+    def test_purge_expired(self):
+        """测试过期条目清理"""
+        import time
+        from app.utils.token_revocation import TokenRevocationList
+        
+        revocation = TokenRevocationList()
+        revocation.revoke_token("token-a", time.time() - 1)
+        revocation.revoke_token("token-b", time.time() + 60)
+        revocation.purge_expired()
+        
+        assert revocation.stats()["revoked_tokens"] == 1
+        assert not revocation.is_revoked("token-a", 1, time.time())
+
+    def test_logout_survives_restart(self, db_session, test_user, test_app, monkeypatch):
+        """测试无状态模式下重启（吊销列表清空）后，重启前登出的Token回退到数据库校验并被拒绝"""
+        import time
+        from app.core.config import settings
+        from app.services import auth_service
+        from app.services.auth_service import AuthService
+        from app.utils.token_revocation import TokenRevocationList
+
+        monkeypatch.setattr(settings, "TOKEN_VERIFY_MODE", "stateless")
+        service = AuthService(db_session)
+        token, _, error = service.login("testuser", "testpass123", test_app.app_key, "restart_device")
+        assert error is None
+        assert service.verify_token(token)[1] is None
+        assert service.logout(token) == (True, None)
+
+        # 模拟重启：新进程的吊销列表为空，启动时间晚于Token签发时间
+        restarted = TokenRevocationList()
+        restarted.started_at = time.time() + 1
+        monkeypatch.setattr(auth_service, "token_revocation", restarted)
+        assert not restarted.covers(time.time())
+        assert service.verify_token(token) == (None, "Token无效")
+
+        # 启动之后签发的Token由吊销列表判断
+        token, _, error = service.login("testuser", "testpass123", test_app.app_key, "restart_device")
+        restarted.started_at = 0
+        assert service.verify_token(token)[1] is None
+
+
+class TestTokenCache:
+    """Token 校验缓存测试"""
+    
+    def test_hit_and_miss(self):
+        """测试缓存命中与未命中计数"""
+        from app.utils.token_cache import TokenCache
+        from app.utils.security import create_access_token
+        
+        cache = TokenCache(maxsize=10, ttl=60)
+        token = create_access_token({"user_id": 1})
+        
+        assert cache.get(token) is None
+        cache.set(token, {"user_id": 1, "username": "testuser"})
+        assert cache.get(token)["username"] == "testuser"
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+    
+    def test_invalidate_user(self):
+        """测试按用户失效缓存"""
+        from app.utils.token_cache import TokenCache
+        from app.utils.security import create_access_token
+        
+        cache = TokenCache(maxsize=10, ttl=60)
+        token_a = create_access_token({"user_id": 1, "device_id": "a"})
+        token_b = create_access_token({"user_id": 1, "device_id": "b"})
+        token_c = create_access_token({"user_id": 2})
+        cache.set(token_a, {"user_id": 1})
+        cache.set(token_b, {"user_id": 1})
+        cache.set(token_c, {"user_id": 2})
+        
+        assert cache.invalidate_user(1) == 2
+        assert cache.get(token_a) is None
+        assert cache.get(token_b) is None
+        assert cache.get(token_c) is not None
+    
+    def test_capacity_eviction(self):
+        """测试超出容量时的淘汰计数"""
+        from app.utils.token_cache import TokenCache
+        from app.utils.security import create_access_token
+        
+        cache = TokenCache(maxsize=2, ttl=60)
+        for user_id in range(3):
+            cache.set(create_access_token({"user_id": user_id}), {"user_id": user_id})
+        
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 2
+
+    def test_set_skipped_after_invalidation(self):
+        """测试校验期间发生失效（登出、封禁）时，校验结果不再写入缓存"""
+        from app.utils.token_cache import TokenCache
+        from app.utils.security import create_access_token
+
+        cache = TokenCache(maxsize=10, ttl=60)
+        token = create_access_token({"user_id": 1})
+
+        generation = cache.generation
+        cache.invalidate_user(1)
+        assert cache.set(token, {"user_id": 1}, generation) is False
+        assert cache.get(token) is None
+
+        assert cache.set(token, {"user_id": 1}, cache.generation) is True
+        assert cache.get(token) is not None
+
+
+class TestPasswordRehash:
+    """登录时按当前配置重新哈希测试"""
+
+    def test_login_rehashes_with_configured_rounds(self, db_session, test_user, test_app, monkeypatch):
+        """测试轮数配置变化后，登录成功时密码哈希迁移到新轮数"""
+        from app.utils import security
+        from app.services.auth_service import AuthService
+
+        monkeypatch.setattr(security, "pwd_context", security.build_password_context(scheme="bcrypt", rounds=5))
+        assert security.password_needs_rehash(test_user.password_hash)
+
+        auth_service = AuthService(db_session)
+        _, _, error = auth_service.login("testuser", "wrong_password", test_app.app_key, "rehash_device")
+        assert error == "用户名或密码错误"
+        db_session.refresh(test_user)
+        assert security.password_needs_rehash(test_user.password_hash)
+
+        token, _, error = auth_service.login("testuser", "testpass123", test_app.app_key, "rehash_device")
+        assert error is None and token
+        db_session.refresh(test_user)
+        assert test_user.password_hash.startswith("$2b$05$")
+        assert not security.password_needs_rehash(test_user.password_hash)
+        assert security.verify_password("testpass123", test_user.password_hash)
+
+    def test_login_rejects_hash_changed_after_verification(self, db_session, test_user, test_app, monkeypatch):
+        """测试线程池校验之后密码被修改时，登录失败且重新哈希不覆盖新密码"""
+        from app.utils import security
+        from app.services.auth_service import AuthService
+
+        monkeypatch.setattr(security, "pwd_context", security.build_password_context(scheme="bcrypt", rounds=5))
+        verified_hash = test_user.password_hash
+        new_password_hash = security.hash_password("testpass123")
+
+        # 校验完成后，管理员修改了密码
+        changed_hash = security.build_password_context(scheme="bcrypt", rounds=4).hash("changed123")
+        test_user.password_hash = changed_hash
+        db_session.commit()
+
+        auth_service = AuthService(db_session)
+        _, _, error = auth_service.login("testuser", "testpass123", test_app.app_key, "rehash_device",
+                                         True, new_password_hash, None, verified_hash)
+        assert error == "用户名或密码错误"
+        db_session.refresh(test_user)
+        assert test_user.password_hash == changed_hash
+
+        # 哈希未变化时接受校验结果并更新为新哈希
+        new_password_hash = security.hash_password("changed123")
+        token, _, error = auth_service.login("testuser", "changed123", test_app.app_key, "rehash_device",
+                                             True, new_password_hash, None, changed_hash)
+        assert error is None and token
+        db_session.refresh(test_user)
+        assert test_user.password_hash == new_password_hash
+
+
+class TestPasswordHasher:
+    """密码哈希线程池测试"""
+
+    def test_verify_and_reject_when_saturated(self):
+        """测试线程池中校验密码，排队超过上限时拒绝"""
+        import asyncio
+        from app.utils.password_hasher import PasswordHasher, PasswordHasherBusy
+        from app.utils.security import hash_password
+
+        hashed = hash_password("test_password_123")
+        hasher = PasswordHasher(max_workers=1, queue_limit=1)
+
+        async def run():
+            return await asyncio.gather(
+                *[hasher.verify("test_password_123", hashed) for _ in range(3)],
+                return_exceptions=True
+            )
+
+        try:
+            results = asyncio.run(run())
+        finally:
+            hasher.stop()
+
+        assert results[:2] == [True, True]
+        assert isinstance(results[2], PasswordHasherBusy)
+        stats = hasher.stats()
+        assert stats["completed"] == 2 and stats["rejected"] == 1
+        assert stats["in_flight"] == 0 and stats["max_queue_depth"] == 1
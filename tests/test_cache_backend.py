@@ -0,0 +1,147 @@
+"""
+缓存后端与跨 worker 失效通知测试
+使用进程内的 Redis 替身（实现 redis-py 客户端用到的命令），两个后端/通知实例模拟两个 worker
+"""
+import fnmatch
+import queue
+import threading
+import time
+
+
+class FakeRedis:
+    """Redis 替身：GET/SET EX/DELETE/SCAN/PUBLISH/SUBSCRIBE"""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None or (value[1] is not None and value[1] <= time.time()):
+            return None
+        return value[0]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match="*", count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for pubsub in subscribers:
+            if channel in pubsub.channels:
+                pubsub.messages.put({"type": "message", "channel": channel, "data": message})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+        with self.client.lock:
+            self.client.subscribers.append(self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self.client.lock:
+            if self in self.client.subscribers:
+                self.client.subscribers.remove(self)
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestCacheBackend:
+    """缓存后端测试"""
+
+    def test_shared_backend_across_workers(self):
+        """测试两个 worker 共用 Redis 后端：一个 worker 计算的结果另一个直接命中，失效对双方可见，键带前缀和命名空间"""
+        from app.decorators.cache_decorator import ttl_cache
+        from app.utils.cache_backend import RedisCacheBackend
+
+        client = FakeRedis()
+        calls = []
+
+        def make_worker():
+            backend = RedisCacheBackend(client, prefix="test_km")
+
+            @ttl_cache(ttl=60, cache_name="app_by_key", key_func=lambda app_key: app_key, backend=backend)
+            def lookup(app_key):
+                calls.append(app_key)
+                return {"app_key": app_key, "status": "normal"}
+
+            return lookup
+
+        worker_a, worker_b = make_worker(), make_worker()
+        assert worker_a("k1") == {"app_key": "k1", "status": "normal"}
+        assert worker_b("k1") == {"app_key": "k1", "status": "normal"}
+        assert calls == ["k1"]
+        assert list(client.data) == ["test_km:app_by_key:'k1'"]
+
+        worker_b.invalidate("k1")
+        worker_a("k1")
+        assert calls == ["k1", "k1"]
+
+        worker_a.clear_cache()
+        assert client.data == {}
+
+    def test_invalidation_bus_between_workers(self):
+        """测试进程内缓存的失效通过 Redis 频道通知到其他 worker，自己发出的消息不重复处理"""
+        from app.utils.cache_backend import CacheInvalidationBus
+
+        client = FakeRedis()
+        bus_a = CacheInvalidationBus(client, channel="test_km:invalidate")
+        bus_b = CacheInvalidationBus(client, channel="test_km:invalidate")
+        received_a, received_b = [], []
+        bus_a.subscribe("permission_cache", lambda action, ids: received_a.append((action, ids)))
+        bus_b.subscribe("permission_cache", lambda action, ids: received_b.append((action, ids)))
+        try:
+            bus_a.start()
+            bus_b.start()
+            assert wait_until(lambda: len(client.subscribers) == 2)
+
+            bus_a.publish("permission_cache", "users", [1, 2])
+            assert wait_until(lambda: received_b == [("users", [1, 2])])
+            assert received_a == []
+        finally:
+            bus_a.stop()
+            bus_b.stop()
+
+    def test_permission_cache_applies_remote_invalidation(self):
+        """测试收到其他 worker 的通知时按用户/卡密失效本地权限快照"""
+        from app.utils.permission_cache import PermissionSnapshot, PermissionSnapshotCache
+
+        cache = PermissionSnapshotCache(maxsize=10, ttl=60)
+        cache.set(1, "d1", PermissionSnapshot(card_ids=frozenset({10})))
+        cache.set(2, "d2", PermissionSnapshot(card_ids=frozenset({20})))
+
+        cache.apply_invalidation("cards", [10])
+        assert cache.get(1, "d1") is None
+        assert cache.get(2, "d2") is not None
+
+        cache.apply_invalidation("users", [2])
+        assert cache.get(2, "d2") is None
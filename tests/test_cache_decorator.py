@@ -0,0 +1,215 @@
+"""
+缓存装饰器测试：单飞、负缓存、stale-while-revalidate
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestCacheDecorator:
+    """缓存装饰器测试"""
+
+    def test_sync_single_flight(self):
+        """测试同一键的并发未命中只执行一次函数，所有线程得到同一结果"""
+        from app.decorators.cache_decorator import ttl_cache
+
+        calls = []
+        release = threading.Event()
+
+        @ttl_cache(ttl=60, cache_name="test_sync_single_flight")
+        def lookup(app_key):
+            calls.append(app_key)
+            release.wait(3)
+            return {"app_key": app_key}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(lookup("k1"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        assert wait_until(lambda: lookup.cache_info()["coalesced"] == 7)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ["k1"]
+        assert results == [{"app_key": "k1"}] * 8
+        lookup.clear_cache()
+
+    def test_async_single_flight(self):
+        """测试异步函数的并发未命中共用一个任务，异常传给所有等待者且不缓存"""
+        from app.decorators.cache_decorator import ttl_cache
+
+        calls = []
+
+        @ttl_cache(ttl=60, cache_name="test_async_single_flight")
+        async def lookup(app_key):
+            calls.append(app_key)
+            await asyncio.sleep(0.05)
+            if app_key == "bad":
+                raise ValueError("查询失败")
+            return app_key.upper()
+
+        async def run():
+            assert await asyncio.gather(*[lookup("k1") for _ in range(5)]) == ["K1"] * 5
+            errors = await asyncio.gather(*[lookup("bad") for _ in range(3)], return_exceptions=True)
+            assert all(isinstance(error, ValueError) for error in errors)
+
+        asyncio.run(run())
+        assert calls == ["k1", "bad"]
+        lookup.clear_cache()
+
+    def test_negative_cache_and_invalidate(self):
+        """测试返回 None 的结果按 negative_ttl 缓存，过期或失效后重新查询"""
+        from app.decorators.cache_decorator import ttl_cache
+
+        calls = []
+        apps = {}
+
+        @ttl_cache(ttl=60, cache_name="test_negative_cache", negative_ttl=0.2)
+        def lookup(app_key):
+            calls.append(app_key)
+            return apps.get(app_key)
+
+        assert lookup("new_app") is None
+        assert lookup("new_app") is None
+        assert calls == ["new_app"]
+
+        time.sleep(0.25)
+        assert lookup("new_app") is None
+        assert calls == ["new_app", "new_app"]
+
+        apps["new_app"] = {"id": 1}
+        lookup.invalidate("new_app")
+        assert lookup("new_app") == {"id": 1}
+        assert len(calls) == 3
+        lookup.clear_cache()
+
+    def test_remote_invalidation_during_compute(self):
+        """测试计算过程中收到其他 worker 的失效通知时，计算结果不写回缓存"""
+        from app.decorators.cache_decorator import _apply_invalidation, ttl_cache
+
+        started, release = threading.Event(), threading.Event()
+        versions = iter(range(1, 100))
+
+        @ttl_cache(ttl=60, cache_name="test_remote_invalidation", key_func=lambda app_key: app_key)
+        def lookup(app_key):
+            version = next(versions)
+            if version == 1:
+                started.set()
+                release.wait(3)
+            return version
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(lookup("k1")))
+        thread.start()
+        assert started.wait(3)
+        _apply_invalidation("test_remote_invalidation", "k1")
+        release.set()
+        thread.join()
+
+        assert results == [1]
+        assert lookup("k1") == 2
+        assert lookup("k1") == 2
+        lookup.clear_cache()
+
+    def test_stale_while_revalidate(self):
+        """测试过期后在 stale_ttl 内先返回旧数据，后台由 refresh_loader 按缓存键刷新一次后返回新数据"""
+        from app.decorators.cache_decorator import ttl_cache
+
+        versions = iter(range(1, 100))
+        calls = []
+
+        def load(app_key):
+            version = next(versions)
+            calls.append((app_key, version))
+            return version
+
+        @ttl_cache(ttl=0.2, cache_name="test_stale_cache", key_func=lambda session, app_key: app_key,
+                   stale_ttl=5, refresh_loader=load)
+        def lookup(session, app_key):
+            return load(app_key)
+
+        assert lookup("request-session", "k1") == 1
+        time.sleep(0.25)
+        assert lookup("request-session", "k1") == 1
+        assert wait_until(lambda: calls == [("k1", 1), ("k1", 2)])
+        assert wait_until(lambda: lookup("request-session", "k1") == 2)
+        assert lookup.cache_info()["stale_hits"] >= 1
+        lookup.clear_cache()
+
+        # 同步函数的后台刷新在其他线程执行，不提供 refresh_loader 时拒绝启用 stale_ttl
+        with pytest.raises(ValueError):
+            ttl_cache(ttl=60, cache_name="test_stale_no_loader", stale_ttl=5)(load)
+
+    def test_concurrent_calls_through_run_sync(self, tmp_path):
+        """测试通过 AsyncSession.run_sync 并发调用同步缓存方法（greenlet 运行在事件循环线程上）不会死锁"""
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+        from app.db.sqlalchemy_db import Base
+        from app.models.app import App, AppStatus
+        from app.services.app_service import AppService
+
+        async def run():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'run_sync.db'}")
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                async with AsyncSession(engine) as session:
+                    session.add(App(app_key="k1", app_name="应用", status=AppStatus.NORMAL))
+                    await session.commit()
+
+                async def lookup():
+                    async with AsyncSession(engine) as session:
+                        return await session.run_sync(lambda db: AppService(db).get_app_info_by_key("k1"))
+
+                return await asyncio.gather(*[lookup() for _ in range(4)])
+            finally:
+                await engine.dispose()
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(asyncio.run(run())), daemon=True)
+        thread.start()
+        thread.join(10)
+        assert not thread.is_alive(), "并发 run_sync 调用死锁"
+        assert [info["app_key"] for info in results[0]] == ["k1"] * 4
+
+    def test_async_app_lookup_shares_namespace(self, tmp_path, monkeypatch):
+        """测试异步登录路径的应用查询使用独立异步会话，并与同步方法共用失效通知"""
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+        from app.db.sqlalchemy_db import Base, database
+        from app.models.app import App, AppStatus
+        from app.services.app_service import AppService, get_app_info_async
+
+        async def run():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'app_lookup.db'}")
+            monkeypatch.setattr(database, "_async_session_factory", async_sessionmaker(bind=engine))
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                assert await get_app_info_async("k_async") is None
+
+                async with AsyncSession(engine) as session:
+                    session.add(App(app_key="k_async", app_name="应用", status=AppStatus.NORMAL))
+                    await session.commit()
+                # 负缓存命中，同步方法的失效同样作用于异步查询
+                assert await get_app_info_async("k_async") is None
+                AppService.get_app_info_by_key.invalidate(None, "k_async")
+                info = await get_app_info_async("k_async")
+                assert info["app_key"] == "k_async" and info["status"] == AppStatus.NORMAL
+            finally:
+                await engine.dispose()
+
+        asyncio.run(run())
+        get_app_info_async.clear_cache()
@@ -60,6 +60,37 @@ class TestCardGenerator:
         # 混合
         assert normalize_card_key("abcdefghjklmnpqr") == "ABCD-EFGH-JKLM-NPQR"
 
+    def test_insert_unique_cards_retries_collisions(self, db_session, test_app, monkeypatch):
+        """测试分块插入卡密时保留已插入的行，只替换冲突的卡密"""
+        from app.models.card import Card
+        from app.utils import card_generator
+
+        existing = Card(
+            app_id=test_app.id,
+            card_key="AAAA-BBBB-CCCC-DDDD",
+            expire_time=datetime.now() + timedelta(days=30)
+        )
+        db_session.add(existing)
+        db_session.commit()
+
+        # 第一个候选与已有卡密冲突
+        generate = card_generator.generate_card_key
+        candidates = iter(["AAAA-BBBB-CCCC-DDDD", "EEEE-FFFF-GGGG-HHHH"])
+        monkeypatch.setattr(card_generator, "generate_card_key", lambda: next(candidates, None) or generate())
+
+        card_values = {"app_id": test_app.id, "expire_time": datetime.now() + timedelta(days=30)}
+        rows = [
+            row for chunk in card_generator.iter_insert_unique_cards(db_session, 5, card_values, chunk_size=2)
+            for row in chunk
+        ]
+        db_session.commit()
+
+        assert len(rows) == 5
+        assert "AAAA-BBBB-CCCC-DDDD" not in {card_key for _, card_key in rows}
+        # 同一分块中未冲突的卡密保留，不随冲突重新生成
+        assert "EEEE-FFFF-GGGG-HHHH" in {card_key for _, card_key in rows}
+        assert db_session.query(Card).count() == 6
+
 
 class TestCardAPI:
     """卡密API测试"""
@@ -120,3 +151,59 @@ class TestCardService:
         # 验证绑定成功
         assert error is None
         assert result is not None
+    
+    def test_export_cards_streams_in_batches(self, db_session, test_app):
+        """测试卡密按批流式导出"""
+        import json
+        from app.services.admin_service import AdminService
+        from app.models.card import Card
+        
+        for i in range(5):
+            db_session.add(Card(
+                app_id=test_app.id,
+                card_key=f"EXPO-RTCA-RD00-000{i}",
+                expire_time=datetime.now() + timedelta(days=30),
+                permissions=["wechat"]
+            ))
+        db_session.commit()
+        
+        admin_service = AdminService(db_session)
+        
+        chunks = list(admin_service.iter_cards_export("ndjson", app_id=test_app.id, batch_size=2))
+        rows = [json.loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+        assert len(chunks) == 3
+        assert [row["card_key"] for row in rows] == [f"EXPO-RTCA-RD00-000{i}" for i in range(5)]
+        assert rows[0]["permissions"] == ["wechat"]
+        
+        csv_lines = b"".join(admin_service.iter_cards_export("csv", batch_size=2)).decode("utf-8-sig").splitlines()
+        assert csv_lines[0].startswith("id,app_id,card_key")
+        assert len(csv_lines) == 6
+    
+    def test_batch_delete_cards_in_chunks(self, db_session, test_app, monkeypatch):
+        """测试批量删除卡密按分块执行，不存在的ID通过一次预查询报告"""
+        from app.core.config import settings
+        from app.services.card_service import CardService
+        from app.models.card import Card
+        from app.models.card_device import CardDevice, CardDeviceStatus
+        
+        cards = [
+            Card(app_id=test_app.id, card_key=f"DELE-TECA-RD00-000{i}", expire_time=datetime.now() + timedelta(days=30))
+            for i in range(5)
+        ]
+        db_session.add_all(cards)
+        db_session.flush()
+        db_session.add_all([
+            CardDevice(card_id=card.id, device_id=f"delete_device_{card.id}", status=CardDeviceStatus.ACTIVE)
+            for card in cards
+        ])
+        db_session.commit()
+        card_ids = [card.id for card in cards]
+        
+        monkeypatch.setattr(settings, "BATCH_DELETE_CHUNK_SIZE", 2)
+        deleted_count, failed_ids, error = CardService(db_session).batch_delete_cards(card_ids + [999999])
+        
+        assert error is None
+        assert deleted_count == 5
+        assert failed_ids == [999999]
+        assert db_session.query(Card).count() == 0
+        assert db_session.query(CardDevice).count() == 0
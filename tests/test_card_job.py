@@ -0,0 +1,197 @@
+"""
+卡密生成任务测试
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture(scope="function")
+def job_database(db_session, monkeypatch):
+    """任务执行器和流式导出使用 database.create_session()，指向测试数据库"""
+    from app.db.sqlalchemy_db import database
+
+    monkeypatch.setattr(database, "_session_factory", sessionmaker(
+        autocommit=False, autoflush=False, bind=db_session.get_bind()
+    ))
+    return db_session
+
+
+def create_job(db_session, app_id, count):
+    from app.services.card_job_service import CardJobService
+
+    job, error = CardJobService(db_session).create_job(
+        app_id=app_id,
+        count=count,
+        expire_time=datetime.now() + timedelta(days=30),
+        max_device_count=2,
+        permissions=["wechat", "douyin"],
+        remark="任务测试"
+    )
+    assert error is None
+    return job
+
+
+def load_job(db_session, job_id):
+    from app.models.card_job import CardGenerateJob
+
+    db_session.expire_all()
+    return db_session.query(CardGenerateJob).filter(CardGenerateJob.id == job_id).first()
+
+
+class TestCardJob:
+    """卡密生成任务测试"""
+
+    def test_create_job(self, db_session, test_app):
+        """测试创建任务只写入 pending 记录，应用禁用时拒绝"""
+        from app.models.app import AppStatus
+        from app.services.card_job_service import CardJobService
+
+        job = create_job(db_session, test_app.id, 10)
+        assert job["status"] == "pending"
+        assert job["generated"] == 0
+        assert job["progress"] == 0.0
+
+        test_app.status = AppStatus.DISABLED
+        db_session.commit()
+        job, error = CardJobService(db_session).create_job(
+            app_id=test_app.id, count=10, expire_time=datetime.now() + timedelta(days=30),
+            max_device_count=1, permissions=[]
+        )
+        assert job is None
+        assert error == "应用已禁用"
+
+    def test_run_job_in_chunks(self, job_database, test_app, monkeypatch):
+        """测试任务按分块生成，卡密、权限关联和进度全部写入"""
+        from app.models.card import Card
+        from app.models.card_permission import CardPermission
+        from app.services import card_job_service
+        from app.services.card_job_service import CardJobWorker
+
+        chunk_counts = []
+        iter_insert = card_job_service.iter_insert_unique_cards
+
+        def recording_iter_insert(db, count, card_values, chunk_size):
+            chunk_counts.append(count)
+            return iter_insert(db, count, card_values, chunk_size=chunk_size)
+
+        monkeypatch.setattr(card_job_service, "iter_insert_unique_cards", recording_iter_insert)
+
+        db_session = job_database
+        job = create_job(db_session, test_app.id, 7)
+        worker = CardJobWorker(max_workers=1, chunk_size=3)
+        worker.run_job(job["id"])
+
+        assert chunk_counts == [3, 3, 1]
+        job_row = load_job(db_session, job["id"])
+        assert job_row.status.value == "completed"
+        assert job_row.generated == 7
+        assert job_row.finished_at is not None
+        assert db_session.query(Card).filter(Card.job_id == job["id"]).count() == 7
+        assert db_session.query(CardPermission).count() == 14
+        assert worker.stats()["completed"] == 1
+
+    def test_resume_does_not_double_generate(self, job_database, test_app, monkeypatch):
+        """测试停止后恢复从已提交进度继续；租约未过期的任务不能被其他进程领取，同一任务只生成一次"""
+        from app.models.card import Card
+        from app.models.card_job import CardJobStatus
+        from app.services import card_job_service
+        from app.services.card_job_service import CardJobWorker
+
+        db_session = job_database
+        job = create_job(db_session, test_app.id, 7)
+
+        # 第一个进程生成一个分块后停止（模拟应用关闭），任务退回 pending
+        worker_a = CardJobWorker(max_workers=1, chunk_size=3)
+        iter_insert = card_job_service.iter_insert_unique_cards
+
+        def stop_after_chunk(db, count, card_values, chunk_size):
+            yield from iter_insert(db, count, card_values, chunk_size=chunk_size)
+            worker_a._stop_event.set()
+
+        monkeypatch.setattr(card_job_service, "iter_insert_unique_cards", stop_after_chunk)
+        worker_a.run_job(job["id"])
+        monkeypatch.setattr(card_job_service, "iter_insert_unique_cards", iter_insert)
+
+        job_row = load_job(db_session, job["id"])
+        assert job_row.status == CardJobStatus.PENDING
+        assert job_row.generated == 3
+
+        # 两个进程同时恢复：只有一个能领取
+        worker_b = CardJobWorker(max_workers=1, chunk_size=3, lease_seconds=60)
+        worker_c = CardJobWorker(max_workers=1, chunk_size=3, lease_seconds=60)
+        assert worker_b.claim(db_session, job["id"]) is True
+        assert worker_c.claim(db_session, job["id"]) is False
+        worker_c.run_job(job["id"])
+        assert db_session.query(Card).filter(Card.job_id == job["id"]).count() == 3
+
+        # 持有租约的进程异常退出：租约过期后才能被接管
+        job_row = load_job(db_session, job["id"])
+        job_row.heartbeat_at = datetime.now() - timedelta(seconds=120)
+        db_session.commit()
+        worker_c.run_job(job["id"])
+        worker_b.run_job(job["id"])
+
+        job_row = load_job(db_session, job["id"])
+        assert job_row.status == CardJobStatus.COMPLETED
+        assert job_row.owner == worker_c.owner
+        assert job_row.generated == 7
+        assert db_session.query(Card).filter(Card.job_id == job["id"]).count() == 7
+
+    def test_failed_job(self, job_database, test_app, monkeypatch):
+        """测试生成出错时任务标记为失败并记录原因，已提交的分块保留"""
+        from app.models.card import Card
+        from app.services import card_job_service
+        from app.services.card_job_service import CardJobWorker
+
+        iter_insert = card_job_service.iter_insert_unique_cards
+        calls = []
+
+        def fail_on_second_chunk(db, count, card_values, chunk_size):
+            calls.append(count)
+            if len(calls) == 2:
+                raise RuntimeError("数据库写入失败")
+            return iter_insert(db, count, card_values, chunk_size=chunk_size)
+
+        monkeypatch.setattr(card_job_service, "iter_insert_unique_cards", fail_on_second_chunk)
+
+        db_session = job_database
+        job = create_job(db_session, test_app.id, 5)
+        worker = CardJobWorker(max_workers=1, chunk_size=3)
+        worker.run_job(job["id"])
+
+        job_row = load_job(db_session, job["id"])
+        assert job_row.status.value == "failed"
+        assert "数据库写入失败" in job_row.error
+        assert job_row.generated == 3
+        assert db_session.query(Card).filter(Card.job_id == job["id"]).count() == 3
+        assert worker.stats()["failed"] == 1
+
+    def test_download_job_output(self, job_database, test_app):
+        """测试按任务ID流式导出生成结果，只包含该任务的卡密"""
+        from app.models.card import Card
+        from app.services.admin_service import stream_cards_export
+        from app.services.card_job_service import CardJobWorker
+
+        db_session = job_database
+        db_session.add(Card(
+            app_id=test_app.id, card_key="OTHE-RCAR-DKEY-2345",
+            expire_time=datetime.now() + timedelta(days=30)
+        ))
+        db_session.commit()
+
+        job = create_job(db_session, test_app.id, 4)
+        CardJobWorker(max_workers=1, chunk_size=3).run_job(job["id"])
+
+        csv_lines = b"".join(stream_cards_export("csv", job_id=job["id"])).decode("utf-8").splitlines()
+        assert len(csv_lines) == 5
+        assert "OTHE-RCAR-DKEY-2345" not in "\n".join(csv_lines)
+
+        ndjson_rows = [
+            json.loads(line)
+            for line in b"".join(stream_cards_export("ndjson", job_id=job["id"])).decode("utf-8").splitlines()
+        ]
+        job_keys = {key for (key,) in db_session.query(Card.card_key).filter(Card.job_id == job["id"]).all()}
+        assert {row["card_key"] for row in ndjson_rows} == job_keys
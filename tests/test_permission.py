@@ -28,7 +28,7 @@ class TestPermissionService:
     
     def test_permission_check_with_valid_card(self, db_session, test_user, test_app):
         """测试有效卡密的权限校验"""
-        from app.services.permission_service import PermissionService
+        from app.services.permission_service import PermissionService, insert_card_permission_rows
         from app.models.card import Card, CardStatus
         from app.models.user_card import UserCard, UserCardStatus
         from app.models.card_device import CardDevice, CardDeviceStatus
@@ -43,6 +43,8 @@ class TestPermissionService:
             permissions=["test_permission", "another_permission"]
         )
         db_session.add(card)
+        db_session.flush()
+        insert_card_permission_rows(db_session, [card.id], card.permissions)
         db_session.commit()
         db_session.refresh(card)
         
@@ -138,6 +140,123 @@ class TestPermissionService:
         assert "已过期" in message or "没有有效的卡密" in message
         assert expire_time is None
 
+    def test_user_permissions_skip_disabled_binding(self, db_session, test_user, test_app):
+        """测试权限列表包含被禁用的设备绑定之后的卡密权限，单个权限校验仍在被禁用的绑定处拒绝"""
+        from app.services.permission_service import PermissionService, insert_card_permission_rows
+        from app.models.card import Card, CardStatus
+        from app.models.user_card import UserCard, UserCardStatus
+        from app.models.card_device import CardDevice, CardDeviceStatus
+
+        expire_times = [datetime.now() + timedelta(days=30), datetime.now() + timedelta(days=60)]
+        device_statuses = [CardDeviceStatus.DISABLED, CardDeviceStatus.ACTIVE]
+        for index, (expire_time, device_status) in enumerate(zip(expire_times, device_statuses)):
+            card = Card(
+                app_id=test_app.id,
+                card_key=f"TEST-BIND-CARD-000{index}",
+                status=CardStatus.USED,
+                expire_time=expire_time,
+                max_device_count=2,
+                permissions=["wechat"] if index == 0 else ["douyin"]
+            )
+            db_session.add(card)
+            db_session.flush()
+            insert_card_permission_rows(db_session, [card.id], card.permissions)
+            db_session.add(UserCard(
+                user_id=test_user.id, card_id=card.id, bind_time=datetime.now(), status=UserCardStatus.ACTIVE
+            ))
+            db_session.add(CardDevice(
+                card_id=card.id, device_id="test_device_001", bind_time=datetime.now(), status=device_status
+            ))
+            db_session.flush()
+        db_session.commit()
+
+        permission_service = PermissionService(db_session)
+        valid, permissions, expire_time = permission_service.get_user_permissions(test_user.id, "test_device_001")
+        assert valid is True
+        assert permissions == ["douyin"]
+        assert expire_time == expire_times[1]
+
+        allowed, message, _ = permission_service.check_permission(test_user.id, "test_device_001", "douyin")
+        assert allowed is False
+        assert message == "设备已被禁用"
+
+
+class TestCardPermissionParsing:
+    """卡密权限配置解析测试"""
+
+    def test_card_grants_permission(self):
+        """测试 list / dict / JSON 字符串三种权限配置"""
+        from app.services.permission_service import card_grants_permission
+
+        assert card_grants_permission(["wechat"], "wechat") is True
+        assert card_grants_permission(["wechat"], "douyin") is False
+        assert card_grants_permission({"wechat": True, "douyin": False}, "wechat") is True
+        assert card_grants_permission({"wechat": True, "douyin": False}, "douyin") is False
+        assert card_grants_permission('["wechat"]', "wechat") is True
+        assert card_grants_permission("not-json", "wechat") is False
+        assert card_grants_permission(None, "wechat") is False
+
+
+class TestDeviceHeartbeat:
+    """设备心跳合并测试"""
+
+    def test_record_coalesces_by_device(self):
+        """测试同一设备多次活跃只保留最新时间"""
+        from app.services.heartbeat_service import DeviceHeartbeatAggregator
+
+        heartbeat = DeviceHeartbeatAggregator(flush_interval=60, batch_size=100)
+        earlier = datetime.now() - timedelta(minutes=1)
+        later = datetime.now()
+
+        heartbeat.record(1, "device-001", later)
+        heartbeat.record(1, "device-001", earlier)
+        heartbeat.record(2, "device-001", earlier)
+
+        stats = heartbeat.stats()
+        assert stats["pending"] == 2
+        assert stats["recorded"] == 3
+        assert heartbeat._pending[(1, "device-001")] == later
+
+
+class TestPermissionSnapshotCache:
+    """有效权限快照缓存测试"""
+
+    def test_snapshot_check(self):
+        """测试快照的授予、设备禁用和错误信息"""
+        from app.utils.permission_cache import PermissionSnapshot
+
+        expire = datetime.now() + timedelta(days=1)
+        snapshot = PermissionSnapshot(grants={"wechat": (1, expire)}, device_disabled=True, card_ids=frozenset({1}))
+
+        assert snapshot.check("wechat") == (True, "权限验证通过", 1, expire)
+        assert snapshot.check("douyin")[:2] == (False, "设备已被禁用")
+        assert PermissionSnapshot(error="未绑定卡密").check("wechat")[:2] == (False, "未绑定卡密")
+
+    def test_invalidate_by_card_and_user(self):
+        """测试按卡密和用户失效"""
+        from app.utils.permission_cache import PermissionSnapshotCache, PermissionSnapshot
+
+        cache = PermissionSnapshotCache(maxsize=10, ttl=60)
+        cache.set(1, "device-001", PermissionSnapshot(card_ids=frozenset({10, 11})))
+        cache.set(1, "device-002", PermissionSnapshot(card_ids=frozenset({11})))
+        cache.set(2, "device-001", PermissionSnapshot(card_ids=frozenset({20})))
+
+        assert cache.invalidate_cards([10]) == 1
+        assert cache.get(1, "device-002") is not None
+        assert cache.invalidate_user(1) == 1
+        assert cache.get(2, "device-001") is not None
+
+    def test_stale_build_not_cached(self):
+        """测试构建期间发生失效时不缓存旧快照"""
+        from app.utils.permission_cache import PermissionSnapshotCache, PermissionSnapshot
+
+        cache = PermissionSnapshotCache(maxsize=10, ttl=60)
+        generation = cache.generation
+        cache.invalidate_user(1)
+
+        assert cache.set(1, "device-001", PermissionSnapshot(), generation) is False
+        assert cache.get(1, "device-001") is None
+
 
 class TestPermissionAPI:
     """权限API测试"""
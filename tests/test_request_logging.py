@@ -0,0 +1,76 @@
+"""
+请求日志采样测试
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+
+
+def build_client(monkeypatch, sample_rates):
+    """构建使用 RequestLoggingMiddleware 的最小应用，并收集输出的日志记录"""
+    from app.core import logging_uru
+    from app.middleware.request_logging import RequestLoggingMiddleware
+
+    monkeypatch.setattr(logging_uru, "_route_sample_rates", sorted(
+        sample_rates.items(), key=lambda item: len(item[0]), reverse=True
+    ))
+    logging_uru.route_sample_rate.cache_clear()
+
+    app = FastAPI()
+
+    @app.get("/api/v1/permission/check")
+    async def check():
+        logger.info("权限校验")
+        return {"ok": True}
+
+    @app.get("/api/v1/admin/fail")
+    async def fail():
+        logger.error("接口出错")
+        return {"ok": False}
+
+    app.add_middleware(RequestLoggingMiddleware)
+    records = []
+
+    def own_records(record):
+        # 只收集应用和本测试模块的日志；标准库日志被 InterceptHandler 转发进来时（asyncio、httpx）
+        # 不在请求的采样上下文中，不属于被测范围
+        return (record["name"] == __name__ or record["name"].startswith("app.")) and logging_uru._sampled(record)
+
+    handler_id = logger.add(lambda message: records.append(message.record), filter=own_records)
+    return TestClient(app), records, handler_id
+
+
+class TestRequestLogging:
+    """请求日志采样测试"""
+
+    def test_route_sampling(self, monkeypatch):
+        """测试采样率为 0 的路径不输出 INFO 日志，WARNING 及以上始终输出；其他路径输出结构化访问日志"""
+        from app.core import logging_uru
+
+        client, records, handler_id = build_client(monkeypatch, {"/api/v1/permission": 0.0})
+        try:
+            client.get("/api/v1/permission/check")
+            assert records == []
+
+            client.get("/api/v1/admin/fail")
+            messages = [record["message"] for record in records]
+            assert "接口出错" in messages
+            access_log = records[-1]
+            assert access_log["extra"]["path"] == "/api/v1/admin/fail"
+            assert access_log["extra"]["status"] == 200
+            assert access_log["level"].name == "INFO"
+        finally:
+            logger.remove(handler_id)
+            logging_uru.route_sample_rate.cache_clear()
+
+    def test_mask_token(self, monkeypatch):
+        """测试日志中的 Token 脱敏，全量调试模式下输出完整 Token"""
+        from app.core.logging_uru import mask_token
+        from app.core.config import settings
+
+        token = "eyJhbGciOiJIUzI1NiJ9.payload.signature"
+        assert mask_token(token) == "eyJhbGci...(38)"
+        assert mask_token(None) == ""
+
+        monkeypatch.setattr(settings, "LOG_DEBUG_VERBOSE", True)
+        assert mask_token(token) == token
@@ -0,0 +1,76 @@
+"""
+响应格式包装测试
+"""
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+
+def build_client():
+    """构建使用 ApiResponseRoute 和 ResponseValidatorMiddleware 的最小应用"""
+    from app.schemas.common_data import ApiResponseData
+    from app.schemas.permission import UserPermissionsResponse
+    from app.middleware.response_validator import ApiResponseRoute, ResponseValidatorMiddleware
+
+    router = APIRouter(route_class=ApiResponseRoute)
+
+    @router.get("/api/v1/card/info", response_model=ApiResponseData)
+    async def card_info():
+        return {"card_key": "TEST-0001", "headers": {"X-Test": "1"}}
+
+    @router.get("/api/v1/permission/my-permissions", response_model=ApiResponseData)
+    async def my_permissions():
+        return UserPermissionsResponse(has_permission=True, permissions=["wechat"])
+
+    @router.get("/api/v1/admin/card/export")
+    async def export():
+        return StreamingResponse(iter([b"id\r\n", b"1\r\n"]), media_type="text/csv")
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ResponseValidatorMiddleware)
+    return TestClient(app)
+
+
+class TestResponseValidator:
+    """响应格式包装测试"""
+
+    def test_route_wraps_response(self):
+        """测试路由层包装为 ApiResponseData 格式，并设置原始返回值中的响应头"""
+        response = build_client().get("/api/v1/card/info")
+
+        assert response.status_code == 200
+        assert response.headers["X-Test"] == "1"
+        assert response.json() == {
+            "platform": "LICENSE",
+            "api": "api/v1/card/info",
+            "ret": ["SUCCESS::请求成功"],
+            "v": response.json()["v"],
+            "data": {"card_key": "TEST-0001"},
+        }
+
+    def test_streaming_and_unmatched_paths(self):
+        """测试流式响应原样透传，未经路由包装的 JSON 响应由中间件兜底包装"""
+        client = build_client()
+
+        response = client.get("/api/v1/admin/card/export")
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.content == b"id\r\n1\r\n"
+
+        response = client.get("/api/v1/unknown")
+        assert response.status_code == 404
+        assert response.json()["data"] == {"detail": "Not Found"}
+        assert response.json()["api"] == "api/v1/unknown"
+
+    def test_pydantic_model_and_json_renderers(self):
+        """测试直接返回 Pydantic 模型时按 exclude_none 转换；orjson 与标准库 json 输出的响应体一致"""
+        from fastapi.responses import JSONResponse
+        from app.middleware.response_validator import ORJSONResponse, format_api_response, orjson
+
+        response = build_client().get("/api/v1/permission/my-permissions")
+        assert response.json()["data"] == {"has_permission": True, "permissions": ["wechat"]}
+
+        if orjson is None:
+            return
+        content, _ = format_api_response("/api/v1/card/my", {"cards": [{"card_key": "卡密-0001", "count": 1.5}], "1": None})
+        assert ORJSONResponse(content=content).body == JSONResponse(content=content).body